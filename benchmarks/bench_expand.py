@@ -0,0 +1,54 @@
+"""
+Benchmarks LocalKnowledge.expand on LocalInformation layers of up to 10k structures, to check that expansion scales linearly.
+Run from the repository root with: python -m benchmarks.bench_expand
+"""
+import time
+from framework.data_types.information_structure import InformationStructure, Node
+from framework.local_information import LocalInformation
+from framework.local_knowledge import LocalKnowledge
+
+def build_layer(num_structures, fan_out=3, leaves=5):
+    """
+    Builds a LocalInformation layer whose structures form a tree: structure S{i} holds the roots of its fan_out children
+    and a few leaf nodes of its own.
+    Args:
+        num_structures (int): Number of structures in the layer.
+        fan_out (int): Number of child structures of each structure.
+        leaves (int): Number of leaf nodes in each structure.
+    Returns:
+        LocalInformation: The layer.
+    """
+    structures = []
+    for i in range(num_structures):
+        root = Node(f'S{i}')
+        children = [Node(f'S{c}') for c in range(fan_out * i + 1, fan_out * i + fan_out + 1) if c < num_structures]
+        own = [Node(f'S{i}_{j}', value=j) for j in range(leaves)]
+        edges = [(root.id, n.id) for n in children + own]
+        structures.append(InformationStructure(node_list=[root] + children + own, edges=edges, root=root))
+    return LocalInformation(structure_list=structures)
+
+def bench(num_structures):
+    """
+    Times one expansion from the root of the tree, which reaches every structure of the layer.
+    Returns:
+        tuple(float, int): Time taken in seconds, and the number of nodes in the expanded structure.
+    """
+    layer = build_layer(num_structures)
+    knowledge = LocalKnowledge()
+    start = time.perf_counter()
+    knowledge.expand(agent=layer, root=Node('S0'))
+    seconds = time.perf_counter() - start
+    assert len(knowledge.roots) == num_structures
+    return seconds, len(knowledge.structure.node_list)
+
+def main():
+    """
+    Runs the benchmark for increasing layer sizes and prints the time per structure, which stays flat if expansion is linear.
+    """
+    print(f"{'structures':>12} {'nodes':>10} {'seconds':>10} {'us/structure':>14}")
+    for num_structures in [1250, 2500, 5000, 10000]:
+        seconds, num_nodes = bench(num_structures)
+        print(f"{num_structures:>12} {num_nodes:>10} {seconds:>10.3f} {1e6 * seconds / num_structures:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmarks GlobalInformation.grow_global on synthetic inputs of increasing size, to check that growth scales linearly.
+Run from the repository root with: python -m benchmarks.bench_grow_global
+"""
+import time
+from framework.data_types.information_structure import InformationStructure, Node
+from framework.local_knowledge import LocalKnowledge
+from framework.global_information import GlobalInformation
+
+def build_inputs(num_init, nodes_per_agent=100, unreached_ratio=0.1):
+    """
+    Builds the inputs of a GlobalInformation layer with num_init init nodes.
+    Agents form a binary tree of roots R0, R1, ..., each structure also holds a chunk of known init nodes and a local node.
+    A fraction of the init nodes is not part of any agent, so each of them grows its own single node structure.
+    Args:
+        num_init (int): Number of init nodes.
+        nodes_per_agent (int): Number of known init nodes in each agent's structure.
+        unreached_ratio (float): Fraction of the init nodes that are not part of any agent.
+    Returns:
+        tuple(list[Node], list[LocalKnowledge]): The init nodes and the agents.
+    """
+    num_reached = int(num_init * (1 - unreached_ratio))
+    num_agents = max(1, num_reached // nodes_per_agent)
+    leaves = [Node(f'X{i}', value=1) for i in range(num_init)]
+    agents = []
+    for i in range(num_agents):
+        children = [Node(f'R{c}') for c in (2 * i + 1, 2 * i + 2) if c < num_agents]
+        chunk = leaves[i * nodes_per_agent:(i + 1) * nodes_per_agent]
+        local = Node(f'v{i}')
+        root = Node(f'R{i}')
+        node_list = [root, local] + children + [Node(n.id, value=n.value) for n in chunk]
+        edges = [(root.id, local.id)] + [(root.id, n.id) for n in children] + [(local.id, n.id) for n in chunk]
+        structure = InformationStructure(node_list=node_list, edges=edges, root=root)
+        agents.append(LocalKnowledge(structure=structure, root=root))
+    return [Node('R0')] + leaves, agents
+
+def bench(num_init):
+    """
+    Times grow_global and simulate_growth (including compiling the dependency graph) for one input size.
+    Returns:
+        tuple(float, float, int): Time taken by grow_global and simulate_growth in seconds, and the number of structures grown.
+    """
+    init_nodes, agents = build_inputs(num_init)
+    global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agents)
+    start = time.perf_counter()
+    result = global_info.simulate_growth()
+    simulate_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    global_info.grow_global()
+    grow_seconds = time.perf_counter() - start
+    assert len(result.roots) == len(global_info.structures)
+    return grow_seconds, simulate_seconds, len(global_info.structures)
+
+def main():
+    """
+    Runs the benchmark for increasing input sizes and prints the time per init node, which stays flat if growth is linear.
+    """
+    print(f"{'init nodes':>12} {'structures':>12} {'grow s':>10} {'us/node':>10} {'simulate s':>12} {'us/node':>10}")
+    for num_init in [12500, 25000, 50000, 100000]:
+        grow_seconds, simulate_seconds, num_structures = bench(num_init)
+        print(f"{num_init:>12} {num_structures:>12} {grow_seconds:>10.3f} {1e6 * grow_seconds / num_init:>10.2f}"
+              f" {simulate_seconds:>12.3f} {1e6 * simulate_seconds / num_init:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmarks the import time of the framework modules in fresh interpreters, and checks that importing them does not import matplotlib.
+Run from the repository root with: python -m benchmarks.bench_import
+"""
+import statistics
+import subprocess
+import sys
+
+MODULES = [
+    'framework.data_types.information_structure',
+    'framework.local_information',
+    'framework.local_knowledge',
+    'framework.global_information',
+    'framework.global_knowledge',
+]
+
+def time_import(statement, repeat=5):
+    """
+    Times an import statement in fresh interpreters.
+    Args:
+        statement (str): The import statement to time.
+        repeat (int): Number of interpreters to start.
+    Returns:
+        tuple(float, bool): Median import time in seconds, and whether matplotlib was imported.
+    """
+    code = ("import sys, time\n"
+            "start = time.perf_counter()\n"
+            f"{statement}\n"
+            "print(time.perf_counter() - start, 'matplotlib' in sys.modules)")
+    times = []
+    loaded = False
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(output[0]))
+        loaded = loaded or output[1] == 'True'
+    return statistics.median(times), loaded
+
+def main():
+    """
+    Prints the median import time of every framework module, and of matplotlib.pyplot for reference.
+    """
+    print(f"{'module':<48} {'ms':>8} {'matplotlib':>12}")
+    for module in MODULES + ['matplotlib.pyplot']:
+        seconds, loaded = time_import(f"import {module}")
+        print(f"{module:<48} {1000 * seconds:>8.1f} {str(loaded):>12}")
+
+if __name__ == "__main__":
+    main()
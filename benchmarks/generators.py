@@ -0,0 +1,115 @@
+"""
+Synthetic generators of information structures and layers used by the benchmarks. Every generator is seeded, so the same
+arguments always build the same inputs.
+"""
+import random
+from framework.data_types.information_structure import InformationStructure, Node
+from framework.local_information import LocalInformation
+from framework.local_knowledge import LocalKnowledge
+
+def tree_records(root_id, depth=2, fan_out=3, known_ratio=0.5, rng=None):
+    """
+    Builds the nodes and edges of a tree shaped structure, without building the structure itself.
+    Node ids are the root id followed by the path from the root, e.g. 'R0.1.2'.
+    Args:
+        root_id (str): Id of the root node.
+        depth (int): Number of levels below the root.
+        fan_out (int): Number of children of each node above the last level.
+        known_ratio (float): Probability that a node other than the root is known, known nodes get a random value.
+        rng (random.Random): (Optional) Random generator, defaults to one seeded with 0.
+    Returns:
+        tuple(list[Node], list[tuple], list[Node]): The nodes with the root first, the edges, and the nodes of the last level.
+    """
+    rng = random.Random(0) if rng is None else rng
+    nodes = [Node(root_id)]
+    edges = []
+    level = [root_id]
+    leaves = nodes
+    for _ in range(depth):
+        next_level = []
+        leaves = []
+        for parent in level:
+            for k in range(fan_out):
+                node = Node(f'{parent}.{k}', value=rng.random() if rng.random() < known_ratio else None)
+                nodes.append(node)
+                leaves.append(node)
+                edges.append((parent, node.id))
+                next_level.append(node.id)
+        level = next_level
+    return nodes, edges, leaves
+
+def generate_structure(num_nodes, fan_out=3, known_ratio=0.5, seed=0, backend='networkx'):
+    """
+    Builds a single tree shaped InformationStructure with about num_nodes nodes.
+    Args:
+        num_nodes (int): Minimum number of nodes, the depth is chosen so the tree has at least that many.
+        fan_out (int): Number of children of each node above the last level.
+        known_ratio (float): Probability that a node other than the root is known.
+        seed (int): Seed of the random generator.
+        backend (str): Graph engine of the structure.
+    Returns:
+        InformationStructure: The structure.
+    """
+    depth, size = 0, 1
+    while size < num_nodes:
+        depth += 1
+        size += fan_out ** depth
+    nodes, edges, _ = tree_records('T', depth, fan_out, known_ratio, random.Random(seed))
+    return InformationStructure(node_list=nodes, edges=edges, root=nodes[0], backend=backend)
+
+def generate_local_information(num_structures, depth=2, fan_out=3, known_ratio=0.5, seed=0):
+    """
+    Builds a LocalInformation layer of tree shaped structures S0, S1, ..., where the structure of Si also holds the roots of
+    structures S(fan_out * i + 1) to S(fan_out * i + fan_out), so expanding S0 reaches every structure.
+    Args:
+        num_structures (int): Number of structures in the layer.
+        depth (int): Depth of each structure's own tree.
+        fan_out (int): Fan-out of each tree, and number of child structures of each structure.
+        known_ratio (float): Probability that a node other than a root is known.
+        seed (int): Seed of the random generator.
+    Returns:
+        LocalInformation: The layer.
+    """
+    rng = random.Random(seed)
+    structures = []
+    for i in range(num_structures):
+        nodes, edges, _ = tree_records(f'S{i}', depth, fan_out, known_ratio, rng)
+        children = [Node(f'S{c}') for c in range(fan_out * i + 1, fan_out * i + fan_out + 1) if c < num_structures]
+        edges += [(nodes[0].id, child.id) for child in children]
+        structures.append(InformationStructure(node_list=nodes + children, edges=edges, root=nodes[0]))
+    return LocalInformation(structure_list=structures)
+
+def generate_design(num_agents, depth=2, fan_out=3, known_ratio=0.5, seed=0, link_ratio=1.0):
+    """
+    Builds the init nodes and agents of a GlobalInformation layer. Agents R0, R1, ... form a tree: the structure of agent
+    Ri is a tree shaped structure whose leaves are init nodes, and holds the root of each of the agents
+    R(fan_out * i + 1) to R(fan_out * i + fan_out) with probability link_ratio.
+    The init nodes are the agent roots, which are unknown, and the leaves, which are known.
+    With a link_ratio of 1 every agent grows into the structure of R0, lower ratios split the design into smaller structures.
+    Args:
+        num_agents (int): Number of agents.
+        depth (int): Depth of each agent's structure.
+        fan_out (int): Fan-out of each structure, and number of child agents of each agent.
+        known_ratio (float): Probability that a node of an agent's structure, other than a root or a leaf, is known.
+        seed (int): Seed of the random generator.
+        link_ratio (float): Probability that an agent's structure holds the root of each of its child agents.
+    Returns:
+        tuple(list[Node], list[LocalKnowledge]): The init nodes and the agents.
+    """
+    rng = random.Random(seed)
+    init_nodes = [Node(f'R{i}') for i in range(num_agents)]
+    agents = []
+    for i in range(num_agents):
+        nodes, edges, leaves = tree_records(f'R{i}', depth, fan_out, known_ratio, rng)
+        # Leaves are the inputs of the design, so they are known in the agent's structure as well as in the init nodes
+        for leaf in leaves:
+            if leaf.value is None:
+                leaf.value = 1.0
+                leaf.data_status = True
+        children = [Node(f'R{c}') for c in range(fan_out * i + 1, fan_out * i + fan_out + 1)
+                    if c < num_agents and rng.random() < link_ratio]
+        edges += [(nodes[0].id, child.id) for child in children]
+        structure = InformationStructure(node_list=nodes + children, edges=edges, root=nodes[0])
+        agents.append(LocalKnowledge(structure=structure, root=nodes[0]))
+        init_nodes += [Node(leaf.id, value=leaf.value) for leaf in leaves]
+    return init_nodes, agents
@@ -0,0 +1,215 @@
+"""
+Benchmark suite covering every layer of the K-I pipeline on synthetic inputs from benchmarks.generators.
+Each case is timed at increasing sizes, and the suite reports the time per unit, the scaling exponent (the slope of
+log time against log size, close to 1 for linear cases) and the peak memory traced while the case runs.
+Results can be stored as a JSON baseline, and later runs compared with it to detect regressions. Nothing is drawn.
+Run from the repository root with: python -m benchmarks.suite [--quick] [--save-baseline PATH] [--baseline PATH]
+"""
+import argparse
+import gc
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+from framework.data_types.information_structure import InformationStructure
+from framework.local_knowledge import LocalKnowledge
+from framework.global_information import GlobalInformation
+from framework.global_knowledge import GlobalKnowledge
+from benchmarks.generators import generate_local_information, generate_design, tree_records
+
+# Generator settings shared by every case, stored with the baseline so that results are only compared on the same inputs.
+# Knowledge nodes in one structure are all connected to each other, so the design is split into small structures with
+# link_ratio to keep the GlobalKnowledge layer sparse.
+CONFIG = {'depth': 2, 'fan_out': 3, 'known_ratio': 0.5, 'link_ratio': 0.25, 'seed': 0}
+
+def _construction_setup(size):
+    nodes, edges, _ = tree_records('T', depth=1, fan_out=size, known_ratio=CONFIG['known_ratio'])
+    return nodes, edges
+
+def _construction_run(state):
+    nodes, edges = state
+    InformationStructure(node_list=nodes, edges=edges, root=nodes[0])
+
+def _compose_setup(size):
+    layer = generate_local_information(size, CONFIG['depth'], CONFIG['fan_out'], CONFIG['known_ratio'], CONFIG['seed'])
+    return list(layer.structures.values())
+
+def _compose_run(structures):
+    composed = structures[0].copy()
+    for structure in structures[1:]:
+        composed.compose(structure)
+
+def _expand_setup(size):
+    return generate_local_information(size, CONFIG['depth'], CONFIG['fan_out'], CONFIG['known_ratio'], CONFIG['seed'])
+
+def _expand_run(layer):
+    knowledge = LocalKnowledge()
+    knowledge.expand(agent=layer, root=layer.structures['S0'].root)
+
+def _design(size):
+    return generate_design(size, CONFIG['depth'], CONFIG['fan_out'], CONFIG['known_ratio'], CONFIG['seed'], CONFIG['link_ratio'])
+
+def _grow_global_setup(size):
+    return _design(size)
+
+def _grow_global_run(state):
+    init_nodes, agents = state
+    GlobalInformation(init_nodes=init_nodes, agent_list=agents).grow_global()
+
+def _add_edges_setup(size):
+    init_nodes, agents = _design(size)
+    global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agents)
+    global_info.structures = dict(global_info.simulate_growth().structures)
+    return init_nodes, global_info
+
+def _add_edges_run(state):
+    init_nodes, global_info = state
+    GlobalKnowledge(init_nodes=init_nodes).add_edges(global_info)
+
+def _scenarios_setup(size):
+    init_nodes, agents = _design(625)
+    global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agents)
+    graph = global_info.compile()
+    # Each scenario also knows a random tenth of the nodes
+    rng = np.random.default_rng(CONFIG['seed'])
+    masks = graph.known | (rng.random((size, len(graph.node_ids))) < 0.1)
+    return global_info, masks
+
+def _scenarios_run(state):
+    global_info, masks = state
+    global_info.simulate_scenarios(masks)
+
+# Case name -> (unit of size, sizes, setup, run). setup builds the inputs of each run outside of the timed section.
+CASES = {
+    'construction': ('nodes', [25000, 50000, 100000, 200000], _construction_setup, _construction_run),
+    'compose': ('structures', [1250, 2500, 5000, 10000], _compose_setup, _compose_run),
+    'expand': ('structures', [1250, 2500, 5000, 10000], _expand_setup, _expand_run),
+    'grow_global': ('agents', [625, 1250, 2500, 5000], _grow_global_setup, _grow_global_run),
+    'add_edges': ('agents', [625, 1250, 2500, 5000], _add_edges_setup, _add_edges_run),
+    'scenarios': ('scenarios', [25, 50, 100, 200], _scenarios_setup, _scenarios_run),
+}
+
+def measure(setup, run, size, repeat=3):
+    """
+    Times one case at one size, and traces its peak memory in a separate run since tracing slows the code down.
+    The inputs are built again before every run, so cases can change them.
+    Args:
+        setup (callable): Builds the inputs for a size.
+        run (callable): The code to time, given the inputs.
+        size (int): The input size.
+        repeat (int): Number of timed runs, the fastest is kept.
+    Returns:
+        tuple(float, float): The time in seconds and the peak traced memory in MB.
+    """
+    times = []
+    for _ in range(repeat):
+        state = setup(size)
+        gc.collect()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    state = setup(size)
+    gc.collect()
+    tracemalloc.start()
+    run(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak / 1e6
+
+def scaling_exponent(sizes, times):
+    """
+    Returns the least squares slope of log(time) against log(size).
+    """
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(t, 1e-9)) for t in times]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    if denominator == 0:
+        return float('nan')
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator
+
+def run_suite(cases=None, quick=False, repeat=3):
+    """
+    Runs the benchmark cases and prints a table per case.
+    Args:
+        cases (list[str]): (Optional) Names of the cases to run, defaults to all of CASES.
+        quick (bool): If True, only the two smallest sizes of each case are run.
+        repeat (int): Number of timed runs per size.
+    Returns:
+        dict: Case name -> {'unit', 'exponent', 'results': {size: {'seconds', 'peak_mb'}}}, sizes as strings for JSON.
+    """
+    report = {}
+    for name in (cases or list(CASES)):
+        if name not in CASES:
+            raise ValueError(f"Unknown benchmark case: {name}, must be one of {list(CASES)}.")
+        unit, sizes, setup, run = CASES[name]
+        sizes = sizes[:2] if quick else sizes
+        print(f"\n{name}")
+        print(f"{unit:>12} {'seconds':>10} {'us/' + unit:>16} {'peak MB':>10}")
+        results = {}
+        for size in sizes:
+            seconds, peak_mb = measure(setup, run, size, repeat)
+            results[str(size)] = {'seconds': seconds, 'peak_mb': peak_mb}
+            print(f"{size:>12} {seconds:>10.4f} {1e6 * seconds / size:>16.2f} {peak_mb:>10.1f}")
+        exponent = scaling_exponent(sizes, [results[str(size)]['seconds'] for size in sizes])
+        print(f"{'scaling exponent':>23} {exponent:.2f}")
+        report[name] = {'unit': unit, 'exponent': exponent, 'results': results}
+    return report
+
+def save_baseline(report, path):
+    """
+    Stores a report as a JSON baseline, together with the generator settings and the Python version used.
+    """
+    with open(path, 'w') as f:
+        json.dump({'config': CONFIG, 'python': platform.python_version(), 'cases': report}, f, indent=2)
+
+def compare(report, baseline, tolerance=0.25):
+    """
+    Compares a report with a baseline, a result regresses if its time or peak memory is more than tolerance above the baseline.
+    Args:
+        report (dict): The report of run_suite.
+        baseline (dict): A baseline stored with save_baseline.
+        tolerance (float): Allowed relative increase.
+    Returns:
+        list[str]: One message per regression.
+    """
+    if baseline.get('config') != CONFIG:
+        raise ValueError("The baseline was recorded with different generator settings.")
+    regressions = []
+    for name, case in report.items():
+        for size, result in case['results'].items():
+            expected = baseline['cases'].get(name, {}).get('results', {}).get(size)
+            if expected is None:
+                continue
+            for metric in ['seconds', 'peak_mb']:
+                if result[metric] > expected[metric] * (1 + tolerance):
+                    regressions.append(f"{name} at {size}: {metric} {result[metric]:.4g} > baseline {expected[metric]:.4g}")
+    return regressions
+
+def main(argv=None):
+    """
+    Runs the suite from the command line. Exits with status 1 if a result regresses compared to the given baseline.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark suite of the K-I pipeline.")
+    parser.add_argument('cases', nargs='*', help=f"Cases to run, any of {list(CASES)}, defaults to all.")
+    parser.add_argument('--quick', action='store_true', help="Only run the two smallest sizes of each case.")
+    parser.add_argument('--repeat', type=int, default=3, help="Number of timed runs per size.")
+    parser.add_argument('--save-baseline', metavar='PATH', help="Store the results as a JSON baseline.")
+    parser.add_argument('--baseline', metavar='PATH', help="Compare the results with a JSON baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative increase over the baseline.")
+    args = parser.parse_args(argv)
+    report = run_suite(args.cases, args.quick, args.repeat)
+    if args.save_baseline:
+        save_baseline(report, args.save_baseline)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        print("\nNo regressions." if not regressions else "\nRegressions:\n" + "\n".join(regressions))
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Defines the ChangeLog of an InformationStructure and the StructureSnapshot class, used to track design changes over time
+without copying structures.
+"""
+
+class ChangeLog:
+    NODE_ADDED = 0
+    NODE_REMOVED = 1
+    EDGE_ADDED = 2
+    EDGE_REMOVED = 3
+
+    def __init__(self):
+        """
+        Initializes an empty, append only log of the node and edge changes of an InformationStructure.
+        The version of the structure is the number of entries in the log, so version 0 is the empty structure.
+        Member variables:
+            - kinds (bytearray): Entry -> kind of change, one of the constants above.
+            - keys (list): Entry -> node id, or edge set key for edge changes. Keys are shared with the structure. Structures
+              that keep no edge set (see InformationStructure) log edges as (u, v) tuples, normalized to edge set keys
+              when the log is read.
+        """
+        self.kinds = bytearray()
+        self.keys = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def record(self, kind:int, key):
+        """
+        Appends a change to the log.
+        Args:
+            kind (int): The kind of change.
+            key: The node id or edge set key that changed.
+        """
+        self.kinds.append(kind)
+        self.keys.append(key)
+
+    def record_many(self, kind:int, keys:list):
+        """
+        Appends a batch of changes of the same kind to the log.
+        """
+        self.kinds.extend(bytes([kind]) * len(keys))
+        self.keys.extend(keys)
+
+    def _check_version(self, version:int):
+        if not 0 <= version <= len(self.keys):
+            raise ValueError(f"Version {version} is out of range, the log has versions 0 to {len(self.keys)}.")
+
+    def net_changes(self, start:int, end:int):
+        """
+        Returns the net change of each node and edge between two versions, changes that cancel out are dropped.
+        Args:
+            start (int): The version to start from.
+            end (int): The version to end at, not before start.
+        Returns:
+            tuple(dict, dict): Node id -> +1 if added or -1 if removed, and the same for edge set keys.
+        """
+        self._check_version(start)
+        self._check_version(end)
+        nodes = {}
+        edges = {}
+        for i in range(start, end):
+            kind = self.kinds[i]
+            key = self.keys[i]
+            if kind < self.EDGE_ADDED:
+                changes = nodes
+            else:
+                changes = edges
+                if type(key) is tuple:
+                    key = frozenset(key)
+            delta = changes.get(key, 0) + (1 if kind in (self.NODE_ADDED, self.EDGE_ADDED) else -1)
+            if delta == 0:
+                del changes[key]
+            else:
+                changes[key] = delta
+        return nodes, edges
+
+    def diff(self, v1:int, v2:int):
+        """
+        Returns the nodes and edges added and removed going from version v1 to version v2, using only the log entries
+        between the two versions. v2 can be before v1, the changes are then reversed.
+        Args:
+            v1 (int): The version to compare from.
+            v2 (int): The version to compare to.
+        Returns:
+            dict: 'nodes_added', 'nodes_removed' (sets of node ids), 'edges_added' and 'edges_removed' (sets of edge keys,
+                  see InformationStructure.edge_set).
+        """
+        nodes, edges = self.net_changes(min(v1, v2), max(v1, v2))
+        sign = 1 if v1 <= v2 else -1
+        return {
+            'nodes_added': set(node_id for node_id, delta in nodes.items() if delta * sign > 0),
+            'nodes_removed': set(node_id for node_id, delta in nodes.items() if delta * sign < 0),
+            'edges_added': set(key for key, delta in edges.items() if delta * sign > 0),
+            'edges_removed': set(key for key, delta in edges.items() if delta * sign < 0),
+        }
+
+class StructureSnapshot:
+    def __init__(self, structure, version:int=None):
+        """
+        Initializes an immutable view of an InformationStructure at a version of its change log.
+        Taking a snapshot is O(1), the node ids and edges of the snapshot are only rebuilt when they are first read,
+        by undoing the log entries made after the snapshot.
+        Args:
+            structure (InformationStructure): The structure to take a snapshot of.
+            version (int): (Optional) The version of the snapshot, defaults to the current version of the structure.
+        Member variables:
+            - structure (InformationStructure): The structure the snapshot was taken of.
+            - version (int): The version of the structure the snapshot shows.
+            - root_id: The id of the structure's root node, None if the structure has no root.
+        """
+        self.structure = structure
+        self.version = len(structure.log) if version is None else version
+        structure.log._check_version(self.version)
+        self.root_id = structure.root.id if structure.root is not None else None
+        self._node_ids = None
+        self._edge_set = None
+
+    def _materialize(self):
+        """
+        Rebuilds the node ids and edge keys of the snapshot from the current state of the structure.
+        """
+        nodes, edges = self.structure.log.net_changes(self.version, len(self.structure.log))
+        node_ids = set(self.structure.nodes)
+        edge_set = set(self.structure.edge_set)
+        for node_id, delta in nodes.items():
+            (node_ids.discard if delta > 0 else node_ids.add)(node_id)
+        for key, delta in edges.items():
+            (edge_set.discard if delta > 0 else edge_set.add)(key)
+        self._node_ids = frozenset(node_ids)
+        self._edge_set = frozenset(edge_set)
+
+    @property
+    def node_ids(self):
+        """
+        Returns the frozenset of node ids in the snapshot.
+        """
+        if self._node_ids is None:
+            self._materialize()
+        return self._node_ids
+
+    @property
+    def edge_set(self):
+        """
+        Returns the frozenset of edge keys in the snapshot, in the form of InformationStructure.edge_set.
+        """
+        if self._edge_set is None:
+            self._materialize()
+        return self._edge_set
+
+    def contains_node(self, node_id):
+        return node_id in self.node_ids
+
+    def contains_edge(self, edge:tuple):
+        return frozenset(edge) in self.edge_set
+
+    def diff(self, other):
+        """
+        Returns the changes going from this snapshot to another one.
+        Snapshots of the same structure are compared through its change log, snapshots of different structures by their
+        node and edge sets.
+        Args:
+            other (StructureSnapshot): The snapshot to compare to, None for an empty structure.
+        Returns:
+            dict: The changes, in the form of ChangeLog.diff.
+        """
+        if other is not None and not isinstance(other, StructureSnapshot):
+            raise TypeError("other must be an instance of StructureSnapshot.")
+        if other is not None and other.structure is self.structure:
+            return self.structure.log.diff(self.version, other.version)
+        node_ids, edge_set = (frozenset(), frozenset()) if other is None else (other.node_ids, other.edge_set)
+        return {
+            'nodes_added': set(node_ids - self.node_ids),
+            'nodes_removed': set(self.node_ids - node_ids),
+            'edges_added': set(edge_set - self.edge_set),
+            'edges_removed': set(self.edge_set - edge_set),
+        }
+
+def snapshot_layer(structures:dict):
+    """
+    Takes a snapshot of every structure of a layer, such as LocalInformation.structures or GlobalInformation.structures.
+    Args:
+        structures (dict): Root id -> InformationStructure.
+    Returns:
+        dict: Root id -> StructureSnapshot.
+    """
+    return {root_id: structure.snapshot() for root_id, structure in structures.items()}
+
+def diff_layers(old:dict, new:dict):
+    """
+    Returns the changes between two layer snapshots taken with snapshot_layer, for the structures that changed.
+    A structure only in new is compared to an empty structure, and a structure only in old is compared the other way.
+    Args:
+        old (dict): Root id -> StructureSnapshot, the earlier snapshot.
+        new (dict): Root id -> StructureSnapshot, the later snapshot.
+    Returns:
+        dict: Root id -> changes in the form of ChangeLog.diff, structures that did not change are left out.
+    """
+    changes = {}
+    for root_id in list(old) + [root_id for root_id in new if root_id not in old]:
+        before, after = old.get(root_id), new.get(root_id)
+        if before is not None and after is not None and before.structure is after.structure and before.version == after.version:
+            continue
+        if before is None:
+            diff = after.diff(None)
+            diff = {'nodes_added': diff['nodes_removed'], 'nodes_removed': diff['nodes_added'],
+                    'edges_added': diff['edges_removed'], 'edges_removed': diff['edges_added']}
+        else:
+            diff = before.diff(after)
+        if any(diff.values()):
+            changes[root_id] = diff
+    return changes
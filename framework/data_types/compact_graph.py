@@ -0,0 +1,282 @@
+"""
+Defines the CompactGraph class, an array backed alternative to networkx graphs for storing information structures.
+"""
+from array import array
+import networkx as nx
+import numpy as np
+
+class CompactGraph:
+    def __init__(self):
+        """
+        Initializes an empty undirected graph stored in CSR (compressed sparse row) form.
+        Node ids are interned to integer indices, and the neighbours of node i are indices[offsets[i]:offsets[i + 1]].
+        New edges are kept in a small pending adjacency that reads look at next to the CSR arrays, and are merged into
+        them once there are more than a fraction of the stored edges, so the cost of merging is amortized over the edges
+        added and reads and writes can be interleaved.
+        Member variables:
+            - node_ids (list): Index -> node id.
+            - index (dict): Node id -> index.
+            - offsets (np.ndarray[int32]): Row offsets into indices, one entry per node plus one. Nodes added since the last
+              merge have no row yet.
+            - indices (np.ndarray[int32]): Concatenated, sorted neighbour indices of every node.
+        """
+        self.node_ids = []
+        self.index = {}
+        self.offsets = np.zeros(1, dtype=np.int32)
+        self.indices = np.zeros(0, dtype=np.int32)
+        # Edges added since the CSR arrays were last built, as node index -> set of neighbour indices
+        self._pending = {}
+        self._num_pending = 0
+
+    def _intern(self, node_id):
+        """
+        Returns the integer index of a node id, adding the node to the graph if it is not present.
+        """
+        i = self.index.get(node_id)
+        if i is None:
+            i = len(self.node_ids)
+            self.index[node_id] = i
+            self.node_ids.append(node_id)
+        return i
+
+    def _compact(self):
+        """
+        Merges the pending edges and any new nodes into the CSR arrays. Pending edges are never already stored, so only
+        the pending entries are sorted, and both sorted runs are interleaved by binary search.
+        """
+        n = len(self.node_ids)
+        if self._num_pending == 0 and len(self.offsets) == n + 1:
+            return
+        counts = np.zeros(n, dtype=np.int64)
+        counts[:len(self.offsets) - 1] = np.diff(self.offsets)
+        new_src = array('i')
+        new_dst = array('i')
+        for i, row in self._pending.items():
+            new_src.extend([i] * len(row))
+            new_dst.extend(row)
+        new_src = np.frombuffer(new_src, dtype=np.int32)
+        new_dst = np.frombuffer(new_dst, dtype=np.int32)
+        order = np.lexsort((new_dst, new_src))
+        new_src, new_dst = new_src[order], new_dst[order]
+        # Rows are sorted, so the (row, neighbour) keys of both runs are sorted too and an entry's merged position is its
+        # position in its own run plus the number of entries of the other run before it
+        old_keys = np.repeat(np.arange(n, dtype=np.int64), counts) * n + self.indices
+        new_keys = new_src.astype(np.int64) * n + new_dst
+        indices = np.empty(len(old_keys) + len(new_keys), dtype=np.int32)
+        indices[np.arange(len(old_keys)) + np.searchsorted(new_keys, old_keys)] = self.indices
+        indices[np.arange(len(new_keys)) + np.searchsorted(old_keys, new_keys)] = new_dst
+        self.offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(counts + np.bincount(new_src, minlength=n), out=self.offsets[1:])
+        self.indices = indices
+        self._pending = {}
+        self._num_pending = 0
+
+    def _rebuild(self, keep):
+        """
+        Keeps the stored entries where keep is True, and rebuilds the offsets of the CSR arrays.
+        """
+        src = np.repeat(np.arange(len(self.node_ids), dtype=np.int32), np.diff(self.offsets))[keep]
+        self.indices = self.indices[keep]
+        self.offsets = np.zeros(len(self.node_ids) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(src, minlength=len(self.node_ids)), out=self.offsets[1:])
+        return src
+
+    def add_node(self, node_id):
+        """
+        Adds a node to the graph, if it is not already present.
+        Args:
+            node_id: The id of the node to add.
+        """
+        self._intern(node_id)
+
+    def add_nodes_from(self, node_ids):
+        """
+        Adds each node in an iterable of node ids to the graph.
+        """
+        for node_id in node_ids:
+            self._intern(node_id)
+
+    def add_edge(self, u, v):
+        """
+        Adds an undirected edge between two nodes, adding the nodes if they are not present.
+        Args:
+            u: The id of the first node.
+            v: The id of the second node.
+        """
+        i, j = self._intern(u), self._intern(v)
+        if self._has_edge(i, j):
+            return
+        # Both directions of each edge are stored, self loops are only stored once
+        self._pending.setdefault(i, set()).add(j)
+        self._pending.setdefault(j, set()).add(i)
+        self._num_pending += 1 if i == j else 2
+        if self._num_pending > max(1024, len(self.indices) // 4):
+            self._compact()
+
+    def add_edges_from(self, edges):
+        """
+        Adds each edge in an iterable of (u, v) tuples to the graph.
+        """
+        for u, v in edges:
+            self.add_edge(u, v)
+
+    def remove_edges_from(self, edges):
+        """
+        Removes each edge in an iterable of (u, v) tuples from the graph, edges that are not present are ignored.
+        """
+        self._compact()
+        removed = set()
+        for u, v in edges:
+            if u in self.index and v in self.index:
+                i, j = self.index[u], self.index[v]
+                removed.update((i * len(self.node_ids) + j, j * len(self.node_ids) + i))
+        if len(removed) == 0:
+            return
+        src = np.repeat(np.arange(len(self.node_ids), dtype=np.int64), np.diff(self.offsets))
+        keys = src * len(self.node_ids) + self.indices
+        self._rebuild(~np.isin(keys, np.fromiter(removed, dtype=np.int64, count=len(removed))))
+
+    def remove_node(self, node_id):
+        """
+        Removes a node and the edges connected to it. The nodes after it move down one index.
+        Args:
+            node_id: The id of the node to remove.
+        """
+        if node_id not in self.index:
+            raise KeyError(f"No node found with ID: {node_id}")
+        self._compact()
+        i = self.index.pop(node_id)
+        src = np.repeat(np.arange(len(self.node_ids), dtype=np.int32), np.diff(self.offsets))
+        keep = (src != i) & (self.indices != i)
+        src, indices = src[keep], self.indices[keep]
+        del self.node_ids[i]
+        for k in range(i, len(self.node_ids)):
+            self.index[self.node_ids[k]] = k
+        src -= src > i
+        self.indices = indices - (indices > i)
+        self.offsets = np.zeros(len(self.node_ids) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(src, minlength=len(self.node_ids)), out=self.offsets[1:])
+
+    def has_node(self, node_id):
+        """
+        Checks if a node is part of the graph.
+        """
+        return node_id in self.index
+
+    def __contains__(self, node_id):
+        return node_id in self.index
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def _row(self, i):
+        """
+        Returns the sorted neighbour indices of the node with index i, including pending edges.
+        """
+        row = self.indices[self.offsets[i]:self.offsets[i + 1]] if i + 1 < len(self.offsets) else self.indices[:0]
+        pending = self._pending.get(i)
+        if pending:
+            row = np.sort(np.concatenate((row, np.fromiter(pending, dtype=np.int32, count=len(pending)))))
+        return row
+
+    def _has_edge(self, i, j):
+        """
+        Checks if there is an edge between the nodes with indices i and j.
+        """
+        if j in self._pending.get(i, ()):
+            return True
+        if i + 1 >= len(self.offsets):
+            return False
+        row = self.indices[self.offsets[i]:self.offsets[i + 1]]
+        k = np.searchsorted(row, j)
+        return bool(k < len(row) and row[k] == j)
+
+    def has_edge(self, u, v):
+        """
+        Checks if there is an edge between two nodes.
+        """
+        if u not in self.index or v not in self.index:
+            return False
+        return self._has_edge(self.index[u], self.index[v])
+
+    def neighbors(self, node_id):
+        """
+        Returns the ids of the nodes adjacent to the given node.
+        """
+        if node_id not in self.index:
+            raise KeyError(f"No node found with ID: {node_id}")
+        return [self.node_ids[j] for j in self._row(self.index[node_id])]
+
+    def degree(self, node_id):
+        """
+        Returns the number of edges incident to the given node, a self loop counts twice as in networkx.
+        """
+        if node_id not in self.index:
+            raise KeyError(f"No node found with ID: {node_id}")
+        i = self.index[node_id]
+        row = self._row(i)
+        return len(row) + int(np.any(row == i))
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        self._compact()
+        src = np.repeat(np.arange(len(self.node_ids), dtype=np.int32), np.diff(self.offsets))
+        return int(np.count_nonzero(src <= self.indices))
+
+    @property
+    def nodes(self):
+        """
+        Returns the list of node ids in insertion order.
+        """
+        return list(self.node_ids)
+
+    @property
+    def edges(self):
+        """
+        Returns the list of edges as (u, v) tuples of node ids, each undirected edge is listed once, ordered by the index
+        of u then v with u added before v.
+        """
+        self._compact()
+        src = np.repeat(np.arange(len(self.node_ids), dtype=np.int32), np.diff(self.offsets))
+        mask = src <= self.indices
+        ids = self.node_ids
+        return [(ids[u], ids[v]) for u, v in zip(src[mask].tolist(), self.indices[mask].tolist())]
+
+    def copy(self):
+        """
+        Returns a copy of the graph that shares no arrays with this one.
+        """
+        self._compact()
+        other = CompactGraph()
+        other.node_ids = list(self.node_ids)
+        other.index = dict(self.index)
+        other.offsets = self.offsets.copy()
+        other.indices = self.indices.copy()
+        return other
+
+    def to_networkx(self):
+        """
+        Converts the graph to a networkx Graph, for drawing or isomorphism checks.
+        Returns:
+            nx.Graph: The equivalent networkx graph.
+        """
+        graph = nx.Graph()
+        graph.add_nodes_from(self.node_ids)
+        graph.add_edges_from(self.edges)
+        return graph
+
+    @classmethod
+    def from_networkx(cls, graph):
+        """
+        Builds a CompactGraph from a networkx Graph. Node and edge attributes are not kept.
+        Args:
+            graph (nx.Graph): The graph to convert.
+        Returns:
+            CompactGraph: The equivalent compact graph.
+        """
+        compact = cls()
+        compact.add_nodes_from(graph.nodes)
+        compact.add_edges_from(graph.edges)
+        return compact
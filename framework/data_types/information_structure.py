@@ -1,11 +1,20 @@
 """
 Defines the basic Node and information structure class used in the KI framework.
 """
+import itertools
+import warnings
+import weakref
+from collections.abc import Mapping
 import networkx as nx
-import matplotlib.pyplot as plt
 import numpy as np
+from framework.data_types.compact_graph import CompactGraph
+from framework.data_types.change_log import ChangeLog, StructureSnapshot
+from framework import rendering
 
 class Node:
+    # Slots instead of a per-instance __dict__, nodes are by far the most numerous objects in a design
+    __slots__ = ('id', 'value', 'data_status', 'handle', '__weakref__')
+
     def __init__(self, id:int, value=None, data_status=False):
         """
         Initializes a Node with a value and an optional data status.
@@ -13,6 +22,9 @@ class Node:
             id (int): Unique identifier for the node.
             value (double): The value of the node.
             data_status (bool): Indicates if the node's data is known or not.
+        Member variables:
+            - handle (int): Integer handle given by a NodeRegistry, unique in the process, None if the node was not interned.
+              Interned nodes compare and hash by handle, other nodes by identity.
         """
         self.id = id
         self.value = value
@@ -20,26 +32,273 @@ class Node:
             self.data_status = True
         else:
             self.data_status = False
+        self.handle = None
+
+    @classmethod
+    def intern(cls, id, value=None, registry=None):
+        """
+        Returns the shared Node for an id from a NodeRegistry, creating it on first use.
+        Args:
+            id: Unique identifier for the node.
+            value (double): (Optional) The value of the node.
+            registry (NodeRegistry): (Optional) The registry to intern into, defaults to the module level default_registry.
+        Returns:
+            Node: The shared node for the id.
+        """
+        return (default_registry if registry is None else registry).intern(id, value)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Node):
+            return NotImplemented
+        # Handles are unique in the process, so two interned nodes are equal exactly when they have the same handle
+        return self.handle is not None and self.handle == other.handle
+
+    def __hash__(self):
+        return hash(self.handle) if self.handle is not None else object.__hash__(self)
+
+    def __repr__(self):
+        return f"Node(id={self.id!r}, value={self.value!r})"
+
+# Handles of interned nodes, shared by every NodeRegistry so a handle identifies one node in the process
+_handles = itertools.count()
+
+class NodeRegistry:
+    def __init__(self):
+        """
+        Initializes an empty interning pool of nodes, so that each logical node id maps to one shared Node object.
+        Each interned node is given an integer handle. The registry only holds weak references, so a node is dropped from
+        it once no structure or layer uses it anymore, and interning its id again creates a new node with a new handle.
+        Member variables:
+            - nodes (WeakValueDictionary): Node id -> shared Node.
+            - handles (WeakValueDictionary): Handle -> shared Node.
+        """
+        self.nodes = weakref.WeakValueDictionary()
+        self.handles = weakref.WeakValueDictionary()
+
+    def intern(self, id, value=None):
+        """
+        Returns the shared Node for an id, creating it on first use.
+        If the shared node has no value yet and a value is given, the value is set and the node becomes known.
+        Args:
+            id: Unique identifier for the node.
+            value (double): (Optional) The value of the node.
+        Returns:
+            Node: The shared node for the id.
+        """
+        node = self.nodes.get(id)
+        if node is None:
+            node = Node(id, value)
+            node.handle = next(_handles)
+            self.nodes[id] = node
+            self.handles[node.handle] = node
+        elif value is not None:
+            if node.value is None:
+                node.value = value
+                node.data_status = True
+            elif node.value != value:
+                raise ValueError(f"Node with ID {id} is already interned with value {node.value}, not {value}.")
+        return node
+
+    def get(self, id):
+        """
+        Returns the shared Node for an id.
+        Args:
+            id: The id of the node to retrieve.
+        Returns:
+            Node: The shared node for the id.
+        """
+        node = self.nodes.get(id)
+        if node is None:
+            raise KeyError(f"No node interned with ID: {id}")
+        return node
+
+    def from_handle(self, handle:int):
+        """
+        Returns the shared Node with the given integer handle.
+        """
+        node = self.handles.get(handle)
+        if node is None:
+            raise KeyError(f"No node interned with handle: {handle}")
+        return node
+
+    def __contains__(self, id):
+        return id in self.nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+# Registry used by Node.intern when no registry is given, it does not keep the nodes alive
+default_registry = NodeRegistry()
+
+class _NodeView(Mapping):
+    """
+    Read-only node id -> Node mapping of a structure using the compact backend, backed by the graph's id index and the
+    structure's node list instead of a dict of its own.
+    """
+    __slots__ = ('_index', '_node_list')
+
+    def __init__(self, index:dict, node_list:list):
+        self._index = index
+        self._node_list = node_list
+
+    def __getitem__(self, node_id):
+        return self._node_list[self._index[node_id]]
+
+    def __contains__(self, node_id):
+        return node_id in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
 
 class InformationStructure:
+    # Graph engines that can store the structure, see CompactGraph for the array backed engine
+    BACKENDS = {'networkx': nx.Graph, 'compact': CompactGraph}
     
-    def __init__(self, node_list=None, edges=None, root=None):
+    def __init__(self, node_list=None, edges=None, root=None, backend='networkx'):
         """
         Initializes the InformationStructure as a graph with nodes, edges, and a defined root node.
+        Nodes are indexed by id and edges are kept in a set, so membership checks and insertions are O(1).
+        Duplicate nodes (by id) and duplicate edges (in either direction) are only stored once.
+        With the compact backend, node ids and edges are only stored in the integer arrays of the CompactGraph: node_id_list,
+        nodes, edges and edge_set are then views built from the graph, and edges are listed in the graph's order, not in
+        the order they were added. Every edge must join two nodes of the structure.
         Args:
             node_list (list): List of nodes in the structure.
             edges (list): List of edges connecting the nodes, uses node ids to denote edges.
             root (node): The root node of the structure.
+            backend (str): Graph engine used for self.structure, 'networkx' (default) or 'compact'.
+        Member variables:
+            - log (ChangeLog): Every node and edge added to or removed from the structure, including at initialization.
         """
-        self.node_list = node_list if node_list is not None else []
-        self.node_id_list = [node.id for node in self.node_list] if node_list else []
-        self.edges = edges if edges is not None else []
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}, must be one of {list(self.BACKENDS)}.")
+        self.backend = backend
+        # Nodes in insertion order, with the compact backend the position of a node is its index in the graph
+        self._node_list = []
+        if backend == 'compact':
+            self._node_id_list = self._edges = self._nodes = self._edge_set = None
+        else:
+            self._node_id_list = []
+            self._edges = []
+            # Index of node id -> Node and set of undirected edge keys, used for O(1) lookups
+            self._nodes = {}
+            self._edge_set = set()
         self.root = root
-        self.structure = nx.Graph()
-        self.structure.add_nodes_from(node.id for node in self.node_list)
-        self.structure.add_edges_from(self.edges)
-        if self.root and self.root not in self.node_list:
+        self.structure = self.BACKENDS[backend]()
+        self.log = ChangeLog()
+        # Comparison invariants and hash, cached with the version they were computed at
+        self._invariant_cache = None
+        self._hash_cache = None
+        for node in (node_list if node_list is not None else []):
+            self._insert_node(node)
+        for edge in (edges if edges is not None else []):
+            self._insert_edge(edge)
+        if self.root and self.root.id not in self.nodes:
             raise ValueError("Root node must be in the node list.")
+
+    @property
+    def node_list(self):
+        """
+        Returns the nodes of the structure in insertion order.
+        """
+        return self._node_list
+
+    @property
+    def node_id_list(self):
+        """
+        Returns the ids of the nodes of the structure in insertion order.
+        """
+        return self.structure.node_ids if self._nodes is None else self._node_id_list
+
+    @property
+    def nodes(self):
+        """
+        Returns the node id -> Node mapping of the structure.
+        """
+        return _NodeView(self.structure.index, self._node_list) if self._nodes is None else self._nodes
+
+    @property
+    def edges(self):
+        """
+        Returns the edges of the structure as (node id, node id) tuples, each undirected edge listed once.
+        """
+        return self.structure.edges if self._nodes is None else self._edges
+
+    @property
+    def edge_set(self):
+        """
+        Returns the set of undirected edge keys of the structure, see _edge_key. Built from the graph on every call
+        with the compact backend.
+        """
+        if self._nodes is None:
+            return set(self._edge_key(edge) for edge in self.structure.edges)
+        return self._edge_set
+
+    def _has_node(self, node_id):
+        """
+        Checks if a node id is part of the structure, without building a view.
+        """
+        return node_id in (self.structure.index if self._nodes is None else self._nodes)
+
+    @staticmethod
+    def _edge_key(edge):
+        """
+        Returns the key used to store an edge in the edge set. Edges are undirected, so (a, b) and (b, a) share a key.
+        """
+        return frozenset(edge)
+
+    @staticmethod
+    def _edge_from_key(key):
+        """
+        Returns an edge tuple for an edge set key. A self loop has a key of size one.
+        """
+        u, *rest = key
+        return (u, rest[0] if rest else u)
+
+    def _insert_node(self, node:Node):
+        """
+        Adds a node to the node index and the graph if a node with the same id is not already present.
+        Returns:
+            bool: True if the node was inserted, False if it was already present.
+        """
+        if self._has_node(node.id):
+            return False
+        self._node_list.append(node)
+        if self._nodes is not None:
+            self._nodes[node.id] = node
+            self._node_id_list.append(node.id)
+        self.structure.add_node(node.id)
+        self.log.record(ChangeLog.NODE_ADDED, node.id)
+        return True
+
+    def _insert_edge(self, edge:tuple):
+        """
+        Adds an edge to the edge set and the graph if it is not already present.
+        Returns:
+            bool: True if the edge was inserted, False if it was already present.
+        """
+        if self._nodes is None:
+            # The compact graph would intern a missing id, and the node list would no longer match its indices
+            if not (self._has_node(edge[0]) and self._has_node(edge[1])):
+                raise ValueError("Both nodes in the edge must be present in the node list.")
+            if self.structure.has_edge(edge[0], edge[1]):
+                return False
+            # Logged as the edge tuple itself, a frozenset key per edge would cost more than the graph
+            key = edge if type(edge) is tuple else (edge[0], edge[1])
+        else:
+            key = self._edge_key(edge)
+            if key in self._edge_set:
+                return False
+            self._edge_set.add(key)
+            self._edges.append((edge[0], edge[1]))
+        self.structure.add_edge(edge[0], edge[1])
+        self.log.record(ChangeLog.EDGE_ADDED, key)
+        return True
         
     def empty(self):
         """
@@ -47,7 +306,7 @@ class InformationStructure:
         Returns:
             bool: True if the structure is empty, False otherwise.
         """
-        return len(self.node_list) == 0
+        return len(self._node_list) == 0
 
     def contains_node(self, node:Node):
         """
@@ -57,15 +316,48 @@ class InformationStructure:
         Returns:
             bool: True if the node is part of the structure, False otherwise.
         """
-        return node.id in self.node_id_list
+        return self._has_node(node.id)
+
+    def contains_edge(self, edge:tuple):
+        """
+        Checks if an edge is part of the information structure, in either direction.
+        Args:
+            edge (tuple): A tuple of two node ids.
+        Returns:
+            bool: True if the edge is part of the structure, False otherwise.
+        """
+        if self._nodes is None:
+            return self.structure.has_edge(edge[0], edge[1])
+        return self._edge_key(edge) in self._edge_set
+
+    def get_node(self, node_id):
+        """
+        Returns the node with the given id.
+        Args:
+            node_id: The id of the node to retrieve.
+        Returns:
+            Node: The node stored in the structure under that id.
+        """
+        if not self._has_node(node_id):
+            raise KeyError(f"No node found with ID: {node_id}")
+        return self.nodes[node_id]
     
     def draw(self):
         """
         Draws the information structure using matplotlib, displaying nodes, edges, and designating the root node.
         """
-        plt.title(f"Information Structure, Root Node = {self.root.id}" if self.root else "Information Structure")
-        nx.draw_spring(self.structure, with_labels=True, node_size=700, font_size=10, edge_color='gray')
-        plt.show()
+        title = f"Information Structure, Root Node = {self.root.id}" if self.root else "Information Structure"
+        rendering.draw_graph(self.to_networkx(), title, pos=rendering.layouts.positions(self))
+
+    def to_networkx(self):
+        """
+        Returns the structure as a networkx Graph, converting it if the structure uses the compact backend.
+        Returns:
+            nx.Graph: The graph of the information structure.
+        """
+        if isinstance(self.structure, nx.Graph):
+            return self.structure
+        return self.structure.to_networkx()
 
     def get_root_node(self):
         """
@@ -94,18 +386,13 @@ class InformationStructure:
         # If the architecture is empty, set the new node as the root
         if self.empty():
             self.root = node
-            self.node_list.append(node)
-            self.node_id_list.append(node.id)
-            self.structure.add_node(node.id)
+            self._insert_node(node)
         else:
-            # Add the new node to the structure
-            self.node_list.append(node)
-            self.node_id_list.append(node.id)
-            self.structure.add_node(node.id)
+            # Add the new node to the structure, a node already present with the same id is kept as is
+            self._insert_node(node)
             # Add the edge to the structure if it is provided
             if edge is not None:
-                self.structure.add_edge(edge[0], edge[1])
-                self.edges.append(edge)
+                self._insert_edge(edge)
         
 
     def add_edge(self, edge:tuple):
@@ -116,27 +403,221 @@ class InformationStructure:
         """
         if not isinstance(edge, tuple) or len(edge) != 2:
             raise ValueError("edge must be a tuple of length 2, representing the source and target node ids.")
-        if edge[0] not in self.node_id_list or edge[1] not in self.node_id_list:
+        if not (self._has_node(edge[0]) and self._has_node(edge[1])):
             raise ValueError("Both nodes in the edge must be present in the node list.")
-        self.structure.add_edge(edge[0], edge[1])
-        self.edges.append((edge[0], edge[1]))
+        self._insert_edge(edge)
+
+    def add_edges(self, edges):
+        """
+        Adds a batch of edges to the information structure, inserting all new edges into the graph at once.
+        Args:
+            edges (iterable[tuple]): Tuples of two node ids, both nodes must be present in the node list.
+        """
+        new_edges = []
+        new_keys = []
+        for edge in edges:
+            if not isinstance(edge, tuple) or len(edge) != 2:
+                raise ValueError("edge must be a tuple of length 2, representing the source and target node ids.")
+            if not (self._has_node(edge[0]) and self._has_node(edge[1])):
+                raise ValueError("Both nodes in the edge must be present in the node list.")
+            if self._nodes is None:
+                if not self.structure.has_edge(edge[0], edge[1]):
+                    # Added one at a time, so a duplicate later in the batch is seen
+                    self.structure.add_edge(edge[0], edge[1])
+                    new_keys.append(edge)
+                continue
+            key = self._edge_key(edge)
+            if key not in self._edge_set:
+                self._edge_set.add(key)
+                new_edges.append(edge)
+                new_keys.append(key)
+        if self._nodes is not None:
+            self._edges.extend(new_edges)
+            self.structure.add_edges_from(new_edges)
+        self.log.record_many(ChangeLog.EDGE_ADDED, new_keys)
+
+    def neighbors(self, node_id):
+        """
+        Returns the ids of the nodes connected to a node by an edge.
+        Args:
+            node_id: The id of the node.
+        Returns:
+            list: The ids of the adjacent nodes.
+        """
+        if not self._has_node(node_id):
+            raise KeyError(f"No node found with ID: {node_id}")
+        return list(self.structure.neighbors(node_id))
+
+    def remove_edges(self, edges):
+        """
+        Removes a batch of edges from the information structure, edges that are not present are ignored.
+        Args:
+            edges (iterable[tuple]): Tuples of two node ids, in either direction.
+        """
+        if self._nodes is None:
+            keys = set(self._edge_key(edge) for edge in edges if self.structure.has_edge(edge[0], edge[1]))
+        else:
+            keys = set(self._edge_key(edge) for edge in edges) & self._edge_set
+        if len(keys) == 0:
+            return
+        self.log.record_many(ChangeLog.EDGE_REMOVED, list(keys))
+        if self._nodes is not None:
+            self._edge_set -= keys
+            self._edges = [edge for edge in self._edges if self._edge_key(edge) not in keys]
+        self.structure.remove_edges_from([self._edge_from_key(key) for key in keys])
+
+    def remove_edge(self, edge:tuple):
+        """
+        Removes an edge from the information structure.
+        Args:
+            edge (tuple): A tuple of two node ids, in either direction.
+        """
+        if not self.contains_edge(edge):
+            raise KeyError(f"No edge found between node IDs {edge[0]} and {edge[1]}")
+        self.remove_edges([edge])
+
+    def remove_node(self, node:Node):
+        """
+        Removes a node and the edges connected to it from the information structure. The root node cannot be removed.
+        Args:
+            node (Node): The node to remove, matched by id.
+        """
+        if not isinstance(node, Node):
+            raise TypeError("node must be an instance of Node.")
+        if not self._has_node(node.id):
+            raise KeyError(f"No node found with ID: {node.id}")
+        if self.root is not None and node.id == self.root.id:
+            raise ValueError("The root node cannot be removed from the structure.")
+        self.remove_edges([(node.id, n) for n in self.neighbors(node.id)])
+        if self._nodes is None:
+            index = self.structure.index[node.id]
+        else:
+            del self._nodes[node.id]
+            index = self._node_id_list.index(node.id)
+            del self._node_id_list[index]
+        del self._node_list[index]
+        self.log.record(ChangeLog.NODE_REMOVED, node.id)
+        self.structure.remove_node(node.id)
+
+    @property
+    def version(self):
+        """
+        Returns the current version of the structure, the number of changes recorded in its log.
+        """
+        return len(self.log)
+
+    def snapshot(self):
+        """
+        Takes an immutable snapshot of the current state of the structure, in O(1) time and memory.
+        Returns:
+            StructureSnapshot: The snapshot, valid for as long as the structure's log is kept.
+        """
+        return StructureSnapshot(self)
+
+    def diff(self, v1:int, v2:int=None):
+        """
+        Returns the nodes and edges added and removed between two versions of the structure, from the change log only.
+        Args:
+            v1 (int): The version to compare from.
+            v2 (int): (Optional) The version to compare to, defaults to the current version.
+        Returns:
+            dict: 'nodes_added', 'nodes_removed' (sets of node ids), 'edges_added' and 'edges_removed' (sets of edge keys).
+        """
+        return self.log.diff(v1, self.version if v2 is None else v2)
+
+    def node_rows(self, table):
+        """
+        Adds the nodes of the structure to a NodeTable, which can be shared with other structures and layers.
+        Args:
+            table (NodeTable): The table to add the nodes to.
+        Returns:
+            np.ndarray[int64]: The table row of each node in node_list, in order.
+        """
+        return table.add_nodes(self.node_list)
+
+    def copy(self):
+        """
+        Returns a shallow copy of the information structure. The Node objects are shared, but the node index,
+        edges and graph are not, so the copy can be composed without changing this structure.
+        Returns:
+            InformationStructure: The copied structure.
+        """
+        return InformationStructure(node_list=self.node_list, edges=self.edges, root=self.root, backend=self.backend)
 
-    def compose(self, other):
+    def compose(self, other, in_place=True):
         """
         Adds the edges and nodes of another InformationStructure to this one, effectively composing them.
+        By default the composition is done in place, only the nodes and edges of other that are not already
+        part of this structure are added to the existing graph. Nodes already present in this structure take precedence.
         Args:
             other (InformationStructure): The other information structure to compose with
+            in_place (bool): If False, this structure is left unchanged and the composition is returned as a new structure.
+        Returns:
+            InformationStructure: The composed structure, this one when in_place is True and a copy otherwise.
         """
         if not isinstance(other, InformationStructure):
             raise TypeError("other must be an instance of InformationStructure.")
-        new_graph = nx.compose(other.structure, self.structure)
-        self.node_list = new_graph.nodes
-        self.edges = new_graph.edges
-        self.structure = new_graph
+        if not in_place:
+            return self.copy().compose(other)
+        for node in other.node_list:
+            self._insert_node(node)
+        for edge in other.edges:
+            self._insert_edge(edge)
+        return self
+
+    def compose_many(self, others):
+        """
+        Composes a batch of InformationStructures into this one in a single pass.
+        Args:
+            others (list[InformationStructure]): The information structures to compose with.
+        """
+        for other in others:
+            if not isinstance(other, InformationStructure):
+                raise TypeError("All elements in others must be of type InformationStructure.")
+        for other in others:
+            for node in other.node_list:
+                self._insert_node(node)
+        for other in others:
+            for edge in other.edges:
+                self._insert_edge(edge)
     
+    def _invariants(self):
+        """
+        Returns the node count, edge count and sorted degree sequence of the structure, cached until the structure changes.
+        """
+        if self._invariant_cache is None or self._invariant_cache[0] != self.version:
+            degrees = dict.fromkeys(self.nodes, 0)
+            for key in self.edge_set:
+                for node_id in key:
+                    # A self loop has a key of size one and counts twice, as in networkx
+                    degrees[node_id] += 1 if len(key) == 2 else 2
+            sequence = tuple(sorted(degrees.values()))
+            self._invariant_cache = (self.version, (len(self.nodes), len(self.edge_set), sequence))
+        return self._invariant_cache[1]
+
+    def structure_hash(self, iterations:int=3):
+        """
+        Returns the Weisfeiler-Lehman hash of the unlabelled graph of the structure, cached until the structure changes.
+        Isomorphic structures always have the same hash, structures with different hashes are never isomorphic.
+        Args:
+            iterations (int): Number of Weisfeiler-Lehman iterations.
+        Returns:
+            str: The hash of the structure.
+        """
+        key = (self.version, iterations)
+        if self._hash_cache is None or self._hash_cache[0] != key:
+            with warnings.catch_warnings():
+                # Newer networkx versions warn that unlabelled hashes changed between versions, hashes are only compared
+                # within one process
+                warnings.simplefilter('ignore', UserWarning)
+                self._hash_cache = (key, nx.weisfeiler_lehman_graph_hash(self.to_networkx(), iterations=iterations))
+        return self._hash_cache[1]
+
     def compare_structure(self, other):
         """
         Compares the current information structure with another one.
+        The comparison is tiered so that only structures that cannot be told apart otherwise pay for a full isomorphism check:
+        node and edge counts and degree sequences first, then equal node ids and edges, then the cached structure_hash.
         Args:
             other (InformationStructure): The other information structure to compare with.
         Returns:
@@ -144,4 +625,13 @@ class InformationStructure:
         """
         if not isinstance(other, InformationStructure):
             raise TypeError("other must be an instance of InformationStructure.")
-        return nx.is_isomorphic(self.structure, other.structure)
+        if other is self:
+            return True
+        if self._invariants() != other._invariants():
+            return False
+        # Structures with the same labelled graph are isomorphic through the identity
+        if self.nodes.keys() == other.nodes.keys() and self.edge_set == other.edge_set:
+            return True
+        if self.structure_hash() != other.structure_hash():
+            return False
+        return nx.is_isomorphic(self.to_networkx(), other.to_networkx())
@@ -0,0 +1,156 @@
+"""
+Defines the NodeTable class, a columnar store of node values and data status used for bulk queries over many nodes.
+"""
+import numpy as np
+from framework.data_types.information_structure import Node
+
+class NodeTable:
+    def __init__(self, nodes=None):
+        """
+        Initializes a columnar table with one row per node id, holding the node values and known status in NumPy arrays.
+        A table can be shared by several structures and layers, each of them refers to its nodes by row.
+        Args:
+            nodes (iterable[Node]): (Optional) Nodes to add to the table.
+        Member variables:
+            - ids (list): Row -> node id.
+            - index (dict): Node id -> row.
+            - nodes (list[Node]): Row -> first Node added with that id.
+            - values (np.ndarray[float64]): Row -> node value, NaN if the value is not known.
+            - known (np.ndarray[bool]): Row -> data status of the node.
+        """
+        self.ids = []
+        self.index = {}
+        self.nodes = []
+        self._values = np.full(16, np.nan)
+        self._known = np.zeros(16, dtype=bool)
+        if nodes is not None:
+            self.add_nodes(nodes)
+
+    @property
+    def values(self):
+        return self._values[:len(self.ids)]
+
+    @property
+    def known(self):
+        return self._known[:len(self.ids)]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, node_id):
+        return node_id in self.index
+
+    def add_node(self, node:Node):
+        """
+        Adds a node to the table if its id is not already present.
+        Args:
+            node (Node): The node to add.
+        Returns:
+            int: The row of the node's id.
+        """
+        if not isinstance(node, Node):
+            raise TypeError("node must be an instance of Node.")
+        row = self.index.get(node.id)
+        if row is not None:
+            return row
+        row = len(self.ids)
+        if row == len(self._values):
+            # Double the capacity so that adding n nodes is linear
+            self._values = np.concatenate((self._values, np.full(row, np.nan)))
+            self._known = np.concatenate((self._known, np.zeros(row, dtype=bool)))
+        self.index[node.id] = row
+        self.ids.append(node.id)
+        self.nodes.append(node)
+        self._values[row] = np.nan if node.value is None else float(node.value)
+        self._known[row] = node.data_status
+        return row
+
+    def add_nodes(self, nodes):
+        """
+        Adds each node of an iterable to the table.
+        Args:
+            nodes (iterable[Node]): The nodes to add.
+        Returns:
+            np.ndarray[int64]: The row of each node, in order.
+        """
+        return np.array([self.add_node(node) for node in nodes], dtype=np.int64)
+
+    def rows(self, node_ids):
+        """
+        Returns the rows of a list of node ids.
+        Args:
+            node_ids (iterable): Ids of nodes in the table.
+        Returns:
+            np.ndarray[int64]: The row of each id, in order.
+        """
+        try:
+            return np.array([self.index[node_id] for node_id in node_ids], dtype=np.int64)
+        except KeyError as e:
+            raise KeyError(f"No node found in the table with ID: {e.args[0]}") from None
+
+    def known_count(self, rows=None):
+        """
+        Counts the known nodes, of the whole table or of the given rows.
+        Args:
+            rows (np.ndarray[int]): (Optional) Rows to count over.
+        Returns:
+            int: The number of known nodes.
+        """
+        known = self.known if rows is None else self.known[rows]
+        return int(np.count_nonzero(known))
+
+    def unknown_count(self, rows=None):
+        """
+        Counts the unknown nodes, of the whole table or of the given rows.
+        Args:
+            rows (np.ndarray[int]): (Optional) Rows to count over.
+        Returns:
+            int: The number of unknown nodes.
+        """
+        total = len(self.ids) if rows is None else len(rows)
+        return total - self.known_count(rows)
+
+    def known_ids(self):
+        """
+        Returns the ids of all known nodes, in row order.
+        """
+        return [self.ids[row] for row in np.flatnonzero(self.known)]
+
+    def unknown_ids(self):
+        """
+        Returns the ids of all unknown nodes, in row order.
+        """
+        return [self.ids[row] for row in np.flatnonzero(~self.known)]
+
+    def set_values(self, values, rows=None):
+        """
+        Sets node values in bulk from an array. Rows given a NaN value become unknown, all other rows become known.
+        Args:
+            values (np.ndarray[float]): The new values, one per row of the table or per entry of rows.
+            rows (np.ndarray[int]): (Optional) Rows to update, defaults to every row of the table.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        n = len(self.ids)
+        if rows is None:
+            if len(values) != n:
+                raise ValueError(f"values must have one entry per row of the table ({n}).")
+            rows = slice(0, n)
+        elif len(values) != len(rows):
+            raise ValueError("values must have one entry per row to update.")
+        self._values[rows] = values
+        self._known[rows] = ~np.isnan(values)
+
+    def write_back(self, nodes=None):
+        """
+        Copies the values and status of the table to Node objects.
+        Args:
+            nodes (iterable[Node]): (Optional) Nodes to update, matched to rows by id. Defaults to the first Node of each row.
+        """
+        values = self.values.tolist()
+        known = self.known.tolist()
+        for node in (self.nodes if nodes is None else nodes):
+            row = self.index.get(node.id)
+            if row is None:
+                continue
+            node.value = values[row] if known[row] else None
+            node.data_status = known[row]
@@ -1,7 +1,14 @@
-from information_structure import InformationStructure, Node
+from framework.data_types.information_structure import InformationStructure, Node, NodeRegistry
+from framework.data_types.compact_graph import CompactGraph
+from framework.data_types.node_table import NodeTable
+from framework.data_types.change_log import StructureSnapshot
+from framework.local_information import LocalInformation
+from framework.local_knowledge import LocalKnowledge
+from framework.global_information import GlobalInformation
 import networkx as nx
 import matplotlib.pyplot as plt
 import numpy as np
+import tracemalloc
 
 
 def test_compose():
@@ -57,6 +64,252 @@ def test_empty_structure():
     empty.add_node(node, edge=None)
     empty.draw()
 
+def test_indexed_storage():
+    """
+    Tests that nodes and edges are indexed, and that duplicates are only stored once.
+    """
+    print("Testing indexed node and edge storage")
+    nodes = [Node(id='A', value=1), Node(id='B', value=2), Node(id='B', value=3)]
+    edges = [('A', 'B'), ('B', 'A')]
+    info_structure = InformationStructure(node_list=nodes, edges=edges, root=nodes[0])
+    assert info_structure.node_id_list == ['A', 'B']
+    assert info_structure.get_node('B') is nodes[1]
+    assert info_structure.contains_edge(('B', 'A'))
+    assert len(info_structure.edges) == 1
+
+    info_structure.add_node(Node(id='C'), ('C', 'A'))
+    info_structure.add_edge(('A', 'C'))
+    assert info_structure.contains_node(Node(id='C'))
+    assert len(info_structure.edges) == 2
+    assert info_structure.structure.number_of_edges() == 2
+    info_structure.add_edges([('B', 'C'), ('C', 'B'), ('A', 'B')])
+    assert info_structure.edges == [('A', 'B'), ('C', 'A'), ('B', 'C')]
+
+    # Bulk construction of a large chain should scale linearly
+    chain = [Node(id=i) for i in range(20000)]
+    chain_edges = [(i, i + 1) for i in range(19999)]
+    large = InformationStructure(node_list=chain, edges=chain_edges, root=chain[0])
+    assert large.contains_node(chain[-1])
+    assert len(large.edges) == 19999
+
+def test_compose_in_place():
+    """
+    Tests that compose merges in place and that compose_many merges a batch of structures.
+    """
+    print("Testing in place compose and compose_many")
+    nodes1 = [Node(id='A'), Node(id='B', value=2)]
+    nodes2 = [Node(id='A', value=1), Node(id='C', value=3)]
+    nodes3 = [Node(id='C', value=3), Node(id='D', value=4)]
+    info1 = InformationStructure(node_list=nodes1, edges=[('A', 'B')], root=nodes1[0])
+    info2 = InformationStructure(node_list=nodes2, edges=[('A', 'C')], root=nodes2[0])
+    info3 = InformationStructure(node_list=nodes3, edges=[('C', 'D'), ('D', 'C')], root=nodes3[0])
+
+    # A composition that is not in place returns a new structure and leaves both inputs unchanged
+    composed = info1.compose(info3, in_place=False)
+    assert composed is not info1 and composed.node_id_list == ['A', 'B', 'C', 'D']
+    assert info1.node_id_list == ['A', 'B'] and info1.edges == [('A', 'B')] and len(composed.edges) == 2
+
+    graph = info1.structure
+    assert info1.compose(info2) is info1
+    assert info1.structure is graph
+    assert all(isinstance(n, Node) for n in info1.node_list)
+    # Nodes already in the structure take precedence
+    assert info1.get_node('A') is nodes1[0]
+    assert info1.node_id_list == ['A', 'B', 'C']
+
+    merged = info2.copy()
+    merged.compose_many([info1, info3])
+    assert merged.node_id_list == ['A', 'C', 'B', 'D']
+    assert len(merged.edges) == 3
+    assert len(info2.edges) == 1
+
+def test_compact_backend():
+    """
+    Tests the array backed compact graph engine against the networkx engine.
+    """
+    print("Testing compact backend")
+    nodes = [Node(id='A'), Node(id='B', value=2), Node(id='C', value=3), Node(id='D', value=4)]
+    edges = [('A', 'B'), ('A', 'C'), ('C', 'D'), ('D', 'C')]
+    compact = InformationStructure(node_list=nodes, edges=edges, root=nodes[0], backend='compact')
+    reference = InformationStructure(node_list=nodes, edges=edges, root=nodes[0])
+    assert isinstance(compact.structure, CompactGraph)
+    assert compact.structure.number_of_edges() == 3
+    assert sorted(compact.structure.neighbors('A')) == ['B', 'C']
+    assert compact.structure.has_edge('D', 'C')
+    assert compact.structure.indices.dtype == np.int32
+    assert compact.compare_structure(reference)
+
+    compact.add_node(Node(id='E'), ('E', 'A'))
+    compact.compose(InformationStructure(node_list=[Node(id='B'), Node(id='F')], edges=[('B', 'F')], root=None))
+    assert compact.structure.degree('A') == 3
+    graph = compact.to_networkx()
+    assert nx.utils.graphs_equal(graph, CompactGraph.from_networkx(graph).to_networkx())
+    compact.draw()
+
+    # Removal rebuilds the compact graph and matches the networkx engine
+    reference.add_node(Node(id='E'), ('E', 'A'))
+    reference.compose(InformationStructure(node_list=[Node(id='B'), Node(id='F')], edges=[('B', 'F')], root=None))
+    for structure in [compact, reference]:
+        structure.remove_node(Node(id='C'))
+        structure.remove_edge(('F', 'B'))
+        assert structure.node_id_list == ['A', 'B', 'D', 'E', 'F']
+        assert structure.edge_set == {frozenset(('A', 'B')), frozenset(('E', 'A'))}
+        assert sorted(structure.neighbors('A')) == ['B', 'E']
+    assert compact.compare_structure(reference)
+    assert compact.diff(0)['edges_added'] == reference.diff(0)['edges_added']
+
+    # Interleaved writes and reads see every edge, and only the integer arrays hold the edges
+    rng = np.random.default_rng(0)
+    nodes = [Node(i) for i in range(5000)]
+    edges = [(int(u), int(v)) for u, v in rng.integers(0, 5000, size=(10000, 2))]
+    usage = {}
+    for backend in ['networkx', 'compact']:
+        tracemalloc.start()
+        structure = InformationStructure(node_list=nodes, edges=edges, root=nodes[0], backend=backend)
+        usage[backend] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        for u, v in edges[:200]:
+            structure.add_edge((u, (v + 1) % 5000))
+            assert structure.contains_edge(((v + 1) % 5000, u)) and u in structure.neighbors((v + 1) % 5000)
+        usage[backend + ' degrees'] = sorted(structure.structure.degree(n.id) for n in nodes)
+    assert usage['compact degrees'] == usage['networkx degrees']
+    assert usage['compact'] < usage['networkx'] / 3
+
+def test_node_registry():
+    """
+    Tests that interned nodes with the same id are a single shared, slotted object.
+    """
+    print("Testing node interning")
+    registry = NodeRegistry()
+    a = Node.intern('A', registry=registry)
+    assert Node.intern('A', value=1, registry=registry) is a
+    assert a.data_status and a.value == 1
+    b = registry.intern('B', 2)
+    assert b.handle > a.handle and Node.intern('C', registry=NodeRegistry()).handle > b.handle
+    assert registry.from_handle(b.handle) is b and len(registry) == 2
+    assert not hasattr(a, '__dict__')
+    # Interned nodes compare and hash by handle, other nodes by identity
+    assert a == registry.get('A') and a != b and len({a, b, registry.intern('A')}) == 2
+    assert Node('A') != Node('A') and Node('A') != a
+    try:
+        registry.intern('B', 3)
+        assert False, "Conflicting values should not be interned"
+    except ValueError:
+        pass
+
+    info1 = InformationStructure(node_list=[a, b], edges=[('A', 'B')], root=a)
+    info2 = InformationStructure(node_list=[registry.intern('B'), registry.intern('C')], edges=[('B', 'C')], root=b)
+    info1.compose(info2)
+    assert info1.get_node('B') is info2.get_node('B')
+
+    # The registry does not keep nodes alive once nothing else uses them
+    del info1, info2
+    handle = registry.intern('D').handle
+    assert 'D' not in registry and len(registry) == 2
+    try:
+        registry.from_handle(handle)
+        assert False, "A dropped node has no handle"
+    except KeyError:
+        pass
+
+def test_node_table():
+    """
+    Tests bulk queries and value updates through a NodeTable shared by two structures.
+    """
+    print("Testing NodeTable")
+    nodes1 = [Node(id='A'), Node(id='B', value=2), Node(id='C', value=3)]
+    nodes2 = [Node(id='C', value=3), Node(id='D')]
+    info1 = InformationStructure(node_list=nodes1, edges=[('A', 'B'), ('A', 'C')], root=nodes1[0])
+    info2 = InformationStructure(node_list=nodes2, edges=[('C', 'D')], root=nodes2[0])
+    table = NodeTable()
+    rows1 = info1.node_rows(table)
+    rows2 = info2.node_rows(table)
+    assert list(rows2) == [2, 3] and len(table) == 4
+    assert table.known_count() == 2 and table.unknown_count(rows2) == 1
+    assert table.unknown_ids() == ['A', 'D']
+
+    table.set_values(np.array([1.0, np.nan]), rows=table.rows(['A', 'B']))
+    assert table.known_ids() == ['A', 'C'] and table.values[0] == 1.0
+    table.write_back(nodes1 + nodes2)
+    assert nodes1[0].value == 1.0 and nodes1[0].data_status
+    assert nodes1[1].value is None and not nodes1[1].data_status
+
+    # The tables of the layers are detached copies, changes only reach the Nodes through write_back
+    nodes1 = [Node(id='A'), Node(id='B', value=2), Node(id='C', value=3)]
+    nodes2 = [Node(id='C', value=3), Node(id='D')]
+    info1 = InformationStructure(node_list=nodes1, edges=[('A', 'B'), ('A', 'C')], root=nodes1[0])
+    info2 = InformationStructure(node_list=nodes2, edges=[('C', 'D')], root=nodes2[0])
+    local_info = LocalInformation(structure_list=[info1, info2])
+    table = local_info.node_table()
+    assert table.ids == ['A', 'B', 'C', 'D'] and table.known_count() == 2
+    table.set_values(np.array([4.0]), rows=table.rows(['D']))
+    assert nodes2[1].value is None and local_info.node_table().known_count() == 2
+    table.write_back(nodes2)
+    assert nodes2[1].value == 4.0 and nodes2[1].data_status
+
+    agent_list = [LocalKnowledge(structure=info, root=info.root) for info in (info1, info2)]
+    global_info = GlobalInformation(init_nodes=[Node(id='A'), Node(id='E')], agent_list=agent_list)
+    table = global_info.node_table()
+    assert table.ids == ['A', 'E', 'B', 'C', 'D'] and table.known_count(table.rows(['A', 'E'])) == 0
+
+    # Growing past the initial capacity keeps earlier rows
+    big = NodeTable(Node(i, value=i) for i in range(100))
+    assert big.known_count() == 100 and big.values[99] == 99.0
+
+def test_change_log():
+    """
+    Tests snapshots and diffs of a structure built from its change log.
+    """
+    print("Testing change log")
+    nodes = [Node(id='A'), Node(id='B', value=2), Node(id='C', value=3)]
+    info = InformationStructure(node_list=nodes, edges=[('A', 'B'), ('A', 'C')], root=nodes[0])
+    assert info.version == 5
+    before = info.snapshot()
+    info.add_node(Node(id='D'), ('C', 'D'))
+    info.compose(InformationStructure(node_list=[Node(id='B'), Node(id='E')], edges=[('B', 'E')], root=None))
+    info.remove_node(Node(id='C'))
+    info.add_edge(('D', 'E'))
+    after = info.snapshot()
+
+    changes = info.diff(before.version)
+    assert changes['nodes_added'] == {'D', 'E'} and changes['nodes_removed'] == {'C'}
+    assert changes['edges_added'] == {frozenset(('B', 'E')), frozenset(('D', 'E'))}
+    assert changes['edges_removed'] == {frozenset(('A', 'C'))}
+    assert after.diff(before)['nodes_added'] == {'C'} and after.diff(before)['edges_removed'] == changes['edges_added']
+
+    # Snapshots keep their state as the structure changes, and match a structure built with the same content
+    info.remove_edge(('D', 'E'))
+    assert before.node_ids == {'A', 'B', 'C'} and before.contains_edge(('C', 'A')) and not after.contains_node('C')
+    assert after.edge_set == info.edge_set | {frozenset(('D', 'E'))}
+    rebuilt = InformationStructure(node_list=[Node(id='A'), Node(id='B'), Node(id='C')], edges=[('B', 'A'), ('A', 'C')], root=Node(id='A'))
+    assert not any(before.diff(rebuilt.snapshot()).values())
+    assert StructureSnapshot(info, 0).node_ids == frozenset() and info.diff(0, 0)['nodes_added'] == set()
+
+def test_compare_structure():
+    """
+    Tests the tiered structural comparison and the cached structure hash.
+    """
+    print("Testing compare_structure")
+    def cycle(ids):
+        return InformationStructure(node_list=[Node(id=i) for i in ids], edges=[(ids[k - 1], ids[k]) for k in range(len(ids))], root=Node(id=ids[0]))
+    hexagon = cycle(['A', 'B', 'C', 'D', 'E', 'F'])
+    relabelled = cycle(['F', 'B', 'D', 'A', 'C', 'E'])
+    triangles = cycle(['A', 'B', 'C'])
+    triangles.compose(cycle(['D', 'E', 'F']))
+    assert hexagon.compare_structure(cycle(['A', 'B', 'C', 'D', 'E', 'F']))
+    assert hexagon.compare_structure(relabelled)
+    # Both are 2-regular with 6 nodes, so only the full isomorphism check tells them apart
+    assert hexagon._invariants() == triangles._invariants() and hexagon.structure_hash() == triangles.structure_hash()
+    assert not hexagon.compare_structure(triangles)
+
+    # The hash is cached until the structure changes
+    before = hexagon.structure_hash()
+    assert hexagon._hash_cache[0][0] == hexagon.version
+    hexagon.add_edge(('A', 'D'))
+    assert hexagon.structure_hash() != before and not hexagon.compare_structure(relabelled)
+    relabelled.add_edge(('F', 'A'))
+    assert hexagon.compare_structure(relabelled)
+
 def main():
     """
     Main function to run all tests.
@@ -64,6 +317,13 @@ def main():
     test_compose()
     test_add_node()
     test_empty_structure()
+    test_indexed_storage()
+    test_compose_in_place()
+    test_compact_backend()
+    test_node_registry()
+    test_node_table()
+    test_change_log()
+    test_compare_structure()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,743 @@
+"""
+Defines the DependencyGraph class used in the KI framework, a compiled, read-only form of the agents of a GlobalInformation layer
+that global information structures can be grown from without modifying any Node.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import numpy as np
+from framework.data_types.information_structure import InformationStructure, Node
+
+# Graph shared by the tasks of a worker process, set once per process by _init_worker
+_worker_graph = None
+
+def _init_worker(graph):
+    """
+    Stores the graph sent to a worker process so it is only unpickled once per process.
+    """
+    global _worker_graph
+    _worker_graph = graph
+
+def _grow_slots(known, slots, cycle_safe=False):
+    """
+    Grows the structures of a batch of work units in a worker process.
+    Returns:
+        tuple: Occurrences that became known, init entries visited, and the starts, roots, members and edges of the grown structures.
+    """
+    result = _worker_graph.grow(known, slots=slots, cycle_safe=cycle_safe)
+    return (np.flatnonzero(result.status & ~_worker_graph.initial_status(known)), np.flatnonzero(result.visited),
+            result.starts, result.roots, result.members, result.edges)
+
+def _grow_scenarios(masks, cycle_safe=False):
+    """
+    Grows a batch of scenarios in a worker process.
+    Returns:
+        list[tuple]: The statistics of each scenario, see DependencyGraph.scenario_statistics.
+    """
+    return [_worker_graph.scenario_statistics(known, cycle_safe) for known in masks]
+
+class DependencyGraph:
+    def __init__(self, init_nodes:list[Node], agent_list:list):
+        """
+        Compiles the init nodes and agents of a global information layer into integer arrays.
+        Node ids are interned to indices, init nodes first. For every agent root, the ids that grow_global would push when
+        expanding that root (the root and init nodes of the agent's structure, other than the root itself) are stored in CSR form.
+        grow_global keeps the known status on each Node object, and two agents can hold different Nodes with the same id, so
+        the Node objects that can be pushed are compiled as occurrences with a known status of their own.
+        Args:
+            init_nodes (list[Node]): The init nodes of the global information layer.
+            agent_list (list[LocalKnowledge]): The agents of the global information layer.
+        Member variables:
+            - node_ids (list): Index -> node id.
+            - index (dict): Node id -> index.
+            - nodes (list[Node]): Index -> representative Node, the init node for init ids, otherwise the first agent node seen.
+            - init_slots (np.ndarray[int32]): Node index of each entry of init_nodes.
+            - init_occurrences (np.ndarray[int32]): Occurrence of each entry of init_nodes.
+            - slot_of (np.ndarray[int32]): Node index -> first init_nodes entry with that id, or -1.
+            - has_agent (np.ndarray[bool]): Node index -> True if an agent with a structure has that node as root.
+            - offsets, pushed (np.ndarray[int32]): CSR arrays of the occurrences pushed when expanding each node.
+            - children (np.ndarray[int32]): Node index of each entry of pushed, the graph of node ids between the agents.
+            - occurrence_nodes (list[Node]): Occurrence -> Node object, shared Node objects are a single occurrence.
+            - occurrence_index (np.ndarray[int32]): Occurrence -> node index.
+            - status (np.ndarray[bool]): Occurrence -> data_status of its Node, the known status growth starts from.
+            - known (np.ndarray[bool]): Node index -> True if the node is known before growth. Init nodes use their own
+              data_status, other nodes are known if any agent's Node with that id is known. Known vectors passed to grow
+              are indexed the same way, and give every occurrence of a node the same status.
+        """
+        self.node_ids = []
+        self.index = {}
+        self.nodes = []
+        self.occurrence_nodes = []
+        self._occurrence_of = {}
+        occurrence_index = []
+        status = []
+        known = []
+        for node in init_nodes:
+            self._intern(node, known)
+        self.init_slots = np.array([self.index[node.id] for node in init_nodes], dtype=np.int32)
+        self.init_occurrences = np.array([self._occurrence(node, occurrence_index, status) for node in init_nodes],
+                                         dtype=np.int32)
+        num_init_ids = len(self.node_ids)
+
+        # The first agent with a structure is the one find_agent returns for a root id
+        root_agents = {}
+        for agent in agent_list:
+            if agent.structure is not None:
+                root_agents.setdefault(agent.root.id, agent)
+        pushable = set(agent.root.id for agent in agent_list) | set(self.index)
+        for agent in root_agents.values():
+            for node in agent.structure.node_list:
+                i = self._intern(node, known)
+                if i >= num_init_ids and node.data_status:
+                    known[i] = True
+
+        n = len(self.node_ids)
+        self.known = np.array(known, dtype=bool)
+        self.slot_of = np.full(n, -1, dtype=np.int32)
+        for slot in range(len(self.init_slots) - 1, -1, -1):
+            self.slot_of[self.init_slots[slot]] = slot
+        self.has_agent = np.zeros(n, dtype=bool)
+        rows = [[] for _ in range(n)]
+        for root_id, agent in root_agents.items():
+            i = self.index[root_id]
+            self.has_agent[i] = True
+            rows[i] = [self._occurrence(node, occurrence_index, status) for node in agent.structure.node_list
+                       if node.id != root_id and node.id in pushable]
+        self.offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum([len(row) for row in rows], out=self.offsets[1:])
+        self.pushed = np.array([k for row in rows for k in row], dtype=np.int32)
+        self.occurrence_index = np.array(occurrence_index, dtype=np.int32)
+        self.status = np.array(status, dtype=bool)
+        self.children = self.occurrence_index[self.pushed]
+        # Reverse of the children arrays, built by component when needed
+        self._reverse = None
+
+    def _intern(self, node:Node, known:list):
+        """
+        Returns the index of a node's id, adding it with the node as representative if it is not present.
+        """
+        i = self.index.get(node.id)
+        if i is None:
+            i = len(self.node_ids)
+            self.index[node.id] = i
+            self.node_ids.append(node.id)
+            self.nodes.append(node)
+            known.append(bool(node.data_status))
+        return i
+
+    def _occurrence(self, node:Node, occurrence_index:list, status:list):
+        """
+        Returns the occurrence of a Node object, adding it if the object was not seen. The node's id must be interned.
+        """
+        k = self._occurrence_of.get(id(node))
+        if k is None:
+            k = len(self.occurrence_nodes)
+            self._occurrence_of[id(node)] = k
+            self.occurrence_nodes.append(node)
+            occurrence_index.append(self.index[node.id])
+            status.append(bool(node.data_status))
+        return k
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __getstate__(self):
+        """
+        Pickles the graph without its representative Node objects, which is the compact form sent to worker processes.
+        An unpickled graph can grow, but its GrowthResults cannot build InformationStructures.
+        """
+        state = self.__dict__.copy()
+        state['nodes'] = None
+        state['occurrence_nodes'] = None
+        del state['index'], state['_occurrence_of']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self._occurrence_of = {}
+
+    def add_node(self, node:Node):
+        """
+        Adds a node to the graph if its id is not present, with no pushed nodes and not part of the init nodes.
+        Args:
+            node (Node): The node to add, it becomes the representative of its id.
+        Returns:
+            int: The index of the node's id.
+        """
+        i = self.index.get(node.id)
+        if i is not None:
+            return i
+        i = len(self.node_ids)
+        self.index[node.id] = i
+        self.node_ids.append(node.id)
+        self.nodes.append(node)
+        self.known = np.append(self.known, bool(node.data_status))
+        self.slot_of = np.append(self.slot_of, np.int32(-1))
+        self.has_agent = np.append(self.has_agent, False)
+        self.offsets = np.append(self.offsets, self.offsets[-1])
+        self._reverse = None
+        return i
+
+    def set_children(self, i:int, nodes:list[Node], has_agent=True):
+        """
+        Replaces the nodes pushed when expanding the node with index i.
+        Args:
+            i (int): Index of the root whose row is replaced.
+            nodes (list[Node]): The new pushed Node objects, in order. Their ids and objects are added if not present.
+            has_agent (bool): Whether an agent with a structure has that node as root.
+        """
+        occurrence_index = self.occurrence_index.tolist()
+        status = self.status.tolist()
+        row = []
+        for node in nodes:
+            self.add_node(node)
+            row.append(self._occurrence(node, occurrence_index, status))
+        self.occurrence_index = np.array(occurrence_index, dtype=np.int32)
+        self.status = np.array(status, dtype=bool)
+        start, end = self.offsets[i], self.offsets[i + 1]
+        self.pushed = np.concatenate((self.pushed[:start], np.array(row, dtype=np.int32), self.pushed[end:]))
+        self.children = self.occurrence_index[self.pushed]
+        self.offsets[i + 1:] += len(row) - (end - start)
+        self.has_agent[i] = has_agent
+        self._reverse = None
+
+    def refresh_status(self, node:Node):
+        """
+        Reads the data_status of a Node object again, after it changed since the graph was compiled.
+        Args:
+            node (Node): The changed node, ignored if it is not an occurrence of the graph.
+        """
+        k = self._occurrence_of.get(id(node))
+        if k is not None:
+            self.status[k] = bool(node.data_status)
+
+    def component(self, indices):
+        """
+        Returns the nodes connected to any of the given nodes through pushed nodes, in either direction.
+        This is the set of nodes whose growth can be affected by a change to the given nodes, see work_units.
+        Args:
+            indices (iterable[int]): Indices of the changed nodes.
+        Returns:
+            np.ndarray[bool]: Mask of the connected nodes, indexed like node_ids.
+        """
+        if self._reverse is None:
+            # Parents of each node in CSR form, built once per change of the graph
+            parents = np.repeat(np.arange(len(self.node_ids), dtype=np.int32), np.diff(self.offsets))
+            order = np.argsort(self.children, kind='stable')
+            reverse_offsets = np.zeros(len(self.node_ids) + 1, dtype=np.int32)
+            np.cumsum(np.bincount(self.children, minlength=len(self.node_ids)), out=reverse_offsets[1:])
+            self._reverse = (reverse_offsets, parents[order])
+        reverse_offsets, parents = self._reverse
+        mask = np.zeros(len(self.node_ids), dtype=bool)
+        stack = []
+        for i in indices:
+            if not mask[i]:
+                mask[i] = True
+                stack.append(i)
+        while stack:
+            i = stack.pop()
+            neighbours = self.children[self.offsets[i]:self.offsets[i + 1]].tolist()
+            neighbours += parents[reverse_offsets[i]:reverse_offsets[i + 1]].tolist()
+            for j in neighbours:
+                if not mask[j]:
+                    mask[j] = True
+                    stack.append(j)
+        return mask
+
+    def known_mask(self, known_ids):
+        """
+        Builds a known vector from an iterable of node ids, all other nodes are unknown.
+        Args:
+            known_ids (iterable): Ids of the known nodes, ids not in the graph are ignored.
+        Returns:
+            np.ndarray[bool]: The known vector, indexed like node_ids.
+        """
+        mask = np.zeros(len(self.node_ids), dtype=bool)
+        for node_id in known_ids:
+            if node_id in self.index:
+                mask[self.index[node_id]] = True
+        return mask
+
+    def strongly_connected_components(self):
+        """
+        Condenses the graph of pushed nodes into strongly connected components, with an iterative version of Tarjan's
+        algorithm so deep dependency chains do not hit the recursion limit. Runs in time linear in the size of the graph.
+        Returns:
+            tuple(np.ndarray[int32], list[list[int]]): Node index -> component, and the node indices of each component.
+            Components are in topological order of the dependencies: a component only pushes nodes of earlier components
+            or of itself, so every component comes after everything it depends on.
+        """
+        n = len(self.node_ids)
+        offsets = self.offsets.tolist()
+        children = self.children.tolist()
+        order = [-1] * n
+        low = [0] * n
+        on_stack = bytearray(n)
+        component = [-1] * n
+        components = []
+        scc_stack = []
+        counter = 0
+        for start in range(n):
+            if order[start] >= 0:
+                continue
+            # Each frame is (node, position of the next child to visit)
+            frames = [(start, offsets[start])]
+            order[start] = low[start] = counter
+            counter += 1
+            scc_stack.append(start)
+            on_stack[start] = 1
+            while frames:
+                node, k = frames[-1]
+                if k < offsets[node + 1]:
+                    frames[-1] = (node, k + 1)
+                    child = children[k]
+                    if order[child] < 0:
+                        order[child] = low[child] = counter
+                        counter += 1
+                        scc_stack.append(child)
+                        on_stack[child] = 1
+                        frames.append((child, offsets[child]))
+                    elif on_stack[child]:
+                        low[node] = min(low[node], order[child])
+                    continue
+                frames.pop()
+                if frames:
+                    parent = frames[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == order[node]:
+                    members = []
+                    while True:
+                        member = scc_stack.pop()
+                        on_stack[member] = 0
+                        component[member] = len(components)
+                        members.append(member)
+                        if member == node:
+                            break
+                    components.append(members)
+        return np.array(component, dtype=np.int32), components
+
+    def cycles(self):
+        """
+        Returns the groups of nodes that depend on each other through the pushed nodes of their agents.
+        Returns:
+            list[list]: The node ids of each strongly connected component with a cycle, in topological order.
+        """
+        offsets = self.offsets.tolist()
+        children = self.children.tolist()
+        cycles = []
+        for members in self.strongly_connected_components()[1]:
+            i = members[0]
+            if len(members) > 1 or i in children[offsets[i]:offsets[i + 1]]:
+                cycles.append([self.node_ids[m] for m in members])
+        return cycles
+
+    def resolvable(self, known=None):
+        """
+        Decides which nodes can be resolved when cycles between agents are resolved as a unit, one strongly connected
+        component at a time in topological order, so every component is decided after everything it depends on.
+        A node is resolvable if expanding an unknown occurrence of it resolves it: a component is resolvable if one of its
+        nodes pushes a known occurrence or an occurrence of a resolvable node of an earlier component, or if it is a single
+        node that pushes nothing. A cycle that only depends on itself stays unknown.
+        Args:
+            known (np.ndarray[bool]): (Optional) Known vector indexed like node_ids, see initial_status.
+        Returns:
+            np.ndarray[bool]: Node index -> whether growth with cycle_safe can resolve the node.
+        """
+        status = self.initial_status(known).tolist()
+        offsets = self.offsets.tolist()
+        pushed = self.pushed.tolist()
+        occurrence_index = self.occurrence_index.tolist()
+        component, components = self.strongly_connected_components()
+        component = component.tolist()
+        resolved = [False] * len(self.node_ids)
+        for c, members in enumerate(components):
+            if len(members) == 1 and offsets[members[0]] == offsets[members[0] + 1]:
+                ok = True
+            else:
+                ok = any(status[k] or (component[occurrence_index[k]] != c and resolved[occurrence_index[k]])
+                         for m in members for k in pushed[offsets[m]:offsets[m + 1]])
+            if ok:
+                for m in members:
+                    resolved[m] = True
+        return np.array(resolved, dtype=bool)
+
+    def _cycle_error(self, i):
+        """
+        Returns the error raised when growth reaches a node whose expansion is still in progress.
+        """
+        component, components = self.strongly_connected_components()
+        ids = [self.node_ids[m] for m in components[component[i]]]
+        return ValueError(f"Cyclic dependency between the agents with root node IDs {ids}, grow with cycle_safe=True to "
+                          "resolve cycles as a unit.")
+
+    def initial_status(self, known=None):
+        """
+        Returns the known status of every occurrence that growth starts from.
+        Args:
+            known (np.ndarray[bool]): (Optional) Known vector indexed like node_ids, giving every occurrence of a node the
+                same status. Defaults to the data_status of each Node object when the graph was compiled.
+        Returns:
+            np.ndarray[bool]: Occurrence -> known status.
+        """
+        if known is None:
+            return self.status
+        known = np.asarray(known, dtype=bool)
+        if len(known) != len(self.node_ids):
+            raise ValueError(f"known must have one entry per node in the graph ({len(self.node_ids)}).")
+        return known[self.occurrence_index]
+
+    def grow(self, known=None, slots=None, cycle_safe=False):
+        """
+        Grows the global information structures without modifying any Node or the graph itself.
+        Follows the same depth-first growth as GlobalInformation.grow_global, on the known status of each occurrence as
+        grow_global does on each Node object, but the status is kept in a per-run array, so the same graph can be grown
+        repeatedly and from several threads. Each occurrence is expanded at most once per growth, and grown from the same
+        status, the result is the same as grow_global on the Nodes the graph was compiled from.
+        Reaching an occurrence whose expansion is still in progress means its agents depend on each other in a cycle (see
+        strongly_connected_components), and raises a ValueError unless cycle_safe is set.
+        With cycle_safe, the edge to the occurrence in progress is added without pushing it again, and whether an
+        occurrence whose pushed occurrences are all done gets resolved is decided by resolvable, which processes the
+        components in topological order. A cycle with a known input from outside is resolved as a unit, a cycle without one
+        stays unknown, and growth takes linear time on any input. On inputs without cycles both modes give the same result.
+        Args:
+            known (np.ndarray[bool]): (Optional) Known vector indexed like node_ids, see initial_status. Defaults to the
+                status of each occurrence.
+            slots (iterable[int]): (Optional) Init node entries to start from, in order. Defaults to all of init_nodes.
+            cycle_safe (bool): If True, cycles between agents are resolved as a unit instead of raising an error.
+        Returns:
+            GrowthResult: The grown structures and the known status after growth.
+        """
+        initial = self.initial_status(known)
+        base = self.known if known is None else np.asarray(known, dtype=bool)
+        # Plain Python containers are much faster to index one element at a time than NumPy arrays
+        status = bytearray(initial.tobytes())
+        # An occurrence that is expanded but not known yet is on the stack, waiting for the occurrences it pushed
+        expanded = bytearray(len(initial))
+        # Node index -> an occurrence of the node is waiting, expanding another one would repeat the cycle forever
+        waiting = bytearray(len(self.node_ids))
+        resolvable = self.resolvable(known).tolist() if cycle_safe else None
+        visited = bytearray(len(self.init_slots))
+        offsets = self.offsets.tolist()
+        pushed_occurrences = self.pushed.tolist()
+        occurrence_index = self.occurrence_index.tolist()
+        slot_of = self.slot_of.tolist()
+        has_agent = self.has_agent.tolist()
+        init_occurrences = self.init_occurrences.tolist()
+
+        starts = []
+        roots = []
+        members = {}
+        edges = {}
+        for slot in (range(len(init_occurrences)) if slots is None else slots):
+            if visited[slot]:
+                continue
+            visited[slot] = 1
+            starts.append(slot)
+            start_occurrence = init_occurrences[slot]
+            root = occurrence_index[start_occurrence]
+            node_list = [root]
+            seen = {root}
+            edge_list = []
+            edge_seen = set()
+            back_edges = []
+            stack = [(start_occurrence, start_occurrence)]
+            while stack:
+                curr, prev = stack[-1]
+                if not status[curr] and expanded[curr]:
+                    # Every occurrence curr pushed is done and none of them resolved it, which only happens inside a cycle
+                    waiting[occurrence_index[curr]] = 0
+                    if not resolvable[occurrence_index[curr]]:
+                        stack.pop()
+                        continue
+                    status[curr] = 1
+                if not status[curr]:
+                    i = occurrence_index[curr]
+                    if not has_agent[i]:
+                        raise KeyError(f"No agent found with root node ID: {self.node_ids[i]}")
+                    if waiting[i] and not cycle_safe:
+                        raise self._cycle_error(i)
+                    expanded[curr] = 1
+                    num_pushed = 0
+                    for sub in pushed_occurrences[offsets[i]:offsets[i + 1]]:
+                        j = occurrence_index[sub]
+                        if j not in seen:
+                            seen.add(j)
+                            node_list.append(j)
+                        if slot_of[j] >= 0:
+                            visited[slot_of[j]] = 1
+                        if expanded[sub] and not status[sub]:
+                            # sub is waiting for curr: the edge closes the cycle, which resolves with the rest of the stack
+                            if not cycle_safe:
+                                raise self._cycle_error(j)
+                            back_edges.append((sub, curr))
+                            continue
+                        stack.append((sub, curr))
+                        num_pushed += 1
+                    if num_pushed:
+                        waiting[i] = 1
+                    elif not cycle_safe:
+                        # Nothing to push, the node is calculable
+                        status[curr] = 1
+                else:
+                    if curr != prev:
+                        u, v = occurrence_index[curr], occurrence_index[prev]
+                        key = (u, v) if u <= v else (v, u)
+                        if key not in edge_seen:
+                            edge_seen.add(key)
+                            edge_list.append((u, v))
+                        status[prev] = 1
+                        waiting[v] = 0
+                    stack.pop()
+            # Edges closing a cycle go last, so an edge the growth resolved between the same two nodes is kept instead
+            for sub, curr in back_edges:
+                u, v = occurrence_index[sub], occurrence_index[curr]
+                key = (u, v) if u <= v else (v, u)
+                if status[sub] and key not in edge_seen:
+                    edge_seen.add(key)
+                    edge_list.append((u, v))
+            roots.append(root)
+            members[root] = node_list
+            edges[root] = edge_list
+        return GrowthResult(self, base, np.frombuffer(bytes(status), dtype=bool),
+                            np.frombuffer(bytes(visited), dtype=bool), roots, members, edges, starts)
+
+    def work_units(self):
+        """
+        Partitions the init node entries into work units that can be grown independently.
+        Two entries are in the same unit if their nodes are connected through the pushed nodes of any root, so growth from one
+        unit never reads or changes the status of another unit's nodes.
+        Returns:
+            list[list[int]]: The init node entries of each unit, in init order, units ordered by their first entry.
+        """
+        parent = list(range(len(self.node_ids)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        offsets = self.offsets.tolist()
+        children = self.children.tolist()
+        for i in range(len(self.node_ids)):
+            for c in children[offsets[i]:offsets[i + 1]]:
+                a, b = find(i), find(c)
+                if a != b:
+                    parent[b] = a
+        units = {}
+        for slot, node in enumerate(self.init_slots.tolist()):
+            units.setdefault(find(node), []).append(slot)
+        return list(units.values())
+
+    def grow_parallel(self, known=None, max_workers=None, cycle_safe=False):
+        """
+        Grows the global information structures in a process pool, one batch of work units per task.
+        Units are independent, so the merged result is the same as grow(known). Structures are ordered by their first init entry.
+        Args:
+            known (np.ndarray[bool]): (Optional) Known vector to grow from, see grow.
+            max_workers (int): (Optional) Number of worker processes, defaults to the number of CPUs.
+            cycle_safe (bool): If True, cycles between agents are resolved as a unit, see grow.
+        Returns:
+            GrowthResult: The grown structures and the known status after growth.
+        """
+        initial = self.initial_status(known)
+        known = None if known is None else np.asarray(known, dtype=bool)
+        units = self.work_units()
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        # Spread the units over a few batches per worker, largest units first onto the least loaded batch
+        num_batches = max(1, min(len(units), 4 * max_workers))
+        batches = [[] for _ in range(num_batches)]
+        loads = [0] * num_batches
+        for unit in sorted(units, key=len, reverse=True):
+            b = loads.index(min(loads))
+            batches[b].extend(unit)
+            loads[b] += len(unit)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(self,)) as pool:
+            futures = [pool.submit(_grow_slots, known, sorted(batch), cycle_safe) for batch in batches if batch]
+            outputs = [future.result() for future in futures]
+
+        status = initial.copy()
+        visited = np.zeros(len(self.init_slots), dtype=bool)
+        grown = []
+        members = {}
+        edges = {}
+        for newly_known, newly_visited, starts, roots, unit_members, unit_edges in outputs:
+            status[newly_known] = True
+            visited[newly_visited] = True
+            grown.extend(zip(starts, roots))
+            members.update(unit_members)
+            edges.update(unit_edges)
+        # Sequential growth starts structures in init order, so sorting by start entry gives the same order
+        grown.sort()
+        return GrowthResult(self, self.known if known is None else known, status, visited, [root for _, root in grown],
+                            members, edges, [start for start, _ in grown])
+
+    def scenario_statistics(self, known, cycle_safe=False):
+        """
+        Grows one scenario and reduces the result to counts, without building any InformationStructure.
+        Args:
+            known (np.ndarray[bool]): Known vector of the scenario.
+            cycle_safe (bool): If True, cycles between agents are resolved as a unit, see grow.
+        Returns:
+            tuple(np.ndarray[int64], int, int): The size of each grown structure in growth order, the number of nodes known
+            after growth and the number of edges GlobalKnowledge.add_edges adds for a knowledge layer of the init nodes.
+        """
+        result = self.grow(known, cycle_safe=cycle_safe)
+        sizes = np.array([len(result.members[root]) for root in result.roots], dtype=np.int64)
+        return sizes, int(np.count_nonzero(result.known)), result.knowledge_edge_count()
+
+    def grow_scenarios(self, known_masks, max_workers=None, cycle_safe=False):
+        """
+        Grows many scenarios of known nodes from this graph, compiled once and shared by every scenario, and returns
+        per-scenario statistics instead of structures. Identical scenarios are only grown once.
+        Args:
+            known_masks (np.ndarray[bool]): Known vectors of shape (scenarios, nodes), columns indexed like node_ids.
+            max_workers (int): (Optional) If given, the distinct scenarios are grown in a pool of this many processes, the
+                graph being sent once to each process.
+            cycle_safe (bool): If True, cycles between agents are resolved as a unit, see grow.
+        Returns:
+            dict:
+                - 'structure_count' (np.ndarray[int64]): Number of grown structures of each scenario.
+                - 'node_count' (np.ndarray[int64]): Total size of the grown structures of each scenario.
+                - 'largest_structure' (np.ndarray[int64]): Size of the largest grown structure of each scenario, 0 if none.
+                - 'known_count' (np.ndarray[int64]): Number of nodes known after growth in each scenario.
+                - 'knowledge_edges' (np.ndarray[int64]): Number of edges of a GlobalKnowledge layer of the init nodes.
+                - 'structure_sizes' (list[np.ndarray[int64]]): The size of each grown structure of each scenario, in growth order.
+        """
+        masks = np.asarray(known_masks, dtype=bool)
+        if masks.ndim != 2 or masks.shape[1] != len(self.node_ids):
+            raise ValueError(f"known_masks must have one column per node in the graph ({len(self.node_ids)}).")
+        distinct, inverse = np.unique(masks, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        if max_workers is None:
+            outputs = [self.scenario_statistics(known, cycle_safe) for known in distinct]
+        else:
+            # A few contiguous batches per worker, so each task is large enough to outweigh sending its masks
+            num_batches = max(1, min(len(distinct), 4 * max_workers))
+            bounds = np.linspace(0, len(distinct), num_batches + 1).astype(int)
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(self,)) as pool:
+                futures = [pool.submit(_grow_scenarios, distinct[start:end], cycle_safe)
+                           for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+                outputs = [output for future in futures for output in future.result()]
+        sizes = [outputs[k][0] for k in inverse]
+        return {
+            'structure_count': np.array([len(s) for s in sizes], dtype=np.int64),
+            'node_count': np.array([s.sum() for s in sizes], dtype=np.int64),
+            'largest_structure': np.array([s.max(initial=0) for s in sizes], dtype=np.int64),
+            'known_count': np.array([outputs[k][1] for k in inverse], dtype=np.int64),
+            'knowledge_edges': np.array([outputs[k][2] for k in inverse], dtype=np.int64),
+            'structure_sizes': sizes,
+        }
+
+class GrowthResult:
+    def __init__(self, graph:DependencyGraph, initial_known, status, visited, roots:list[int], members:dict, edges:dict,
+                 starts:list[int]):
+        """
+        Holds the outcome of DependencyGraph.grow. Structures are kept as node indices and only turned into
+        InformationStructures when the structures property is read.
+        Args:
+            graph (DependencyGraph): The graph the result was grown from.
+            initial_known (np.ndarray[bool]): Known status of every node before growth.
+            status (np.ndarray[bool]): Known status of every occurrence after growth.
+            visited (np.ndarray[bool]): Visited status of every entry of init_nodes after growth.
+            roots (list[int]): Node index of the root of each grown structure, in growth order.
+            members (dict): Root index -> node indices of the structure.
+            edges (dict): Root index -> (node index, node index) edges of the structure.
+            starts (list[int]): Init node entry each structure was grown from, in growth order.
+        """
+        self.graph = graph
+        self.initial_known = initial_known
+        self.status = status
+        self.visited = visited
+        self.roots = roots
+        self.members = members
+        self.edges = edges
+        self.starts = starts
+        self._structures = None
+        self._known = None
+
+    @property
+    def known(self):
+        """
+        Returns the known status of every node after growth, indexed like node_ids: a node is known if it was known
+        before growth or if any of its occurrences is known after growth.
+        """
+        if self._known is None:
+            known = np.array(self.initial_known, dtype=bool)
+            occurrence_index = self.graph.occurrence_index[:len(self.status)]
+            known[occurrence_index[self.status]] = True
+            self._known = known
+        return self._known
+
+    @property
+    def structures(self):
+        """
+        Returns the grown structures as a dict of root id -> InformationStructure, in the same form as GlobalInformation.structures.
+        The structures use the representative Node objects of the graph.
+        """
+        if self._structures is None:
+            nodes = self.graph.nodes
+            ids = self.graph.node_ids
+            self._structures = {}
+            for root in self.roots:
+                self._structures[ids[root]] = InformationStructure(
+                    node_list=[nodes[i] for i in self.members[root]],
+                    edges=[(ids[u], ids[v]) for u, v in self.edges[root]],
+                    root=nodes[root])
+        return self._structures
+
+    def resolved_from(self):
+        """
+        Returns the edges of each grown structure as node ids, in the orientation of growth.
+        Returns:
+            dict: Root id -> (u, v) edges where v was resolved from u, in growth order.
+        """
+        ids = self.graph.node_ids
+        return {ids[root]: [(ids[u], ids[v]) for u, v in self.edges[root]] for root in self.roots}
+
+    def knowledge_edge_count(self):
+        """
+        Counts the edges GlobalKnowledge.add_edges adds from the grown structures for a knowledge layer of the init nodes,
+        with array operations instead of building the structures: every init node is connected to the other init nodes of
+        the first structure containing it.
+        Returns:
+            int: The number of undirected edges.
+        """
+        if len(self.roots) == 0:
+            return 0
+        n = len(self.graph.node_ids)
+        lists = [self.members[root] for root in self.roots]
+        lengths = np.array([len(members) for members in lists], dtype=np.int64)
+        nodes = np.fromiter((i for members in lists for i in members), dtype=np.int64, count=int(lengths.sum()))
+        owner = np.repeat(np.arange(len(lists)), lengths)
+        keep = self.graph.slot_of[nodes] >= 0
+        nodes, owner = nodes[keep], owner[keep]
+        # Members are listed in growth order, so the first occurrence of a node is in its first structure
+        ids, first = np.unique(nodes, return_index=True)
+        first_owner = owner[first]
+        counts = np.bincount(owner, minlength=len(lists))
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        # Pair each init node with every init node of its first structure
+        repeats = counts[first_owner]
+        u = np.repeat(ids, repeats)
+        within = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        v = nodes[np.repeat(offsets[first_owner], repeats) + within]
+        pairs = u != v
+        keys = np.minimum(u, v)[pairs] * n + np.maximum(u, v)[pairs]
+        return len(np.unique(keys))
+
+    def is_known(self, node:Node):
+        """
+        Checks if a node is known after growth.
+        Args:
+            node (Node): The node to check.
+        Returns:
+            bool: True if the node is known or was resolved during growth, False otherwise.
+        """
+        if not isinstance(node, Node):
+            raise TypeError("node must be an instance of Node.")
+        if node.id not in self.graph.index:
+            raise KeyError(f"Node with ID {node.id} not found in the dependency graph.")
+        return bool(self.known[self.graph.index[node.id]])
@@ -2,13 +2,56 @@
 Defines the Global Information class used in the KI framework, which is grown from a collection of local knowledge layers.
 """
 
+import itertools
 import numpy as np
 import networkx as nx
-import matplotlib.pyplot as plt
 from queue import LifoQueue
 from framework.data_types.information_structure import InformationStructure, Node
+from framework.data_types.node_table import NodeTable
+from framework.data_types.change_log import snapshot_layer, diff_layers
 from framework.local_information import LocalInformation
 from framework.local_knowledge import LocalKnowledge
+from framework.dependency_graph import DependencyGraph, GrowthResult
+from framework.impact import ImpactIndex
+from framework import rendering
+
+# Counter of GlobalInformation versions, unique across layers so a version identifies both a layer and its state
+_versions = itertools.count()
+
+class DesignChange:
+    NODE_ADDED = 'node_added'
+    NODE_REMOVED = 'node_removed'
+    VALUE_KNOWN = 'value_known'
+    EDGE_ADDED = 'edge_added'
+    KINDS = (NODE_ADDED, NODE_REMOVED, VALUE_KNOWN, EDGE_ADDED)
+
+    def __init__(self, kind:str, agent:LocalKnowledge=None, node:Node=None, edge:tuple=None, value=None):
+        """
+        Describes a change to the design, to be applied with GlobalInformation.apply_change.
+        Args:
+            kind (str): One of DesignChange.KINDS.
+                - NODE_ADDED: node is added to agent's structure, connected by edge if given.
+                - NODE_REMOVED: node is removed from agent's structure.
+                - VALUE_KNOWN: node's value becomes known and is set to value.
+                - EDGE_ADDED: edge is added to agent's structure.
+            agent (LocalKnowledge): The agent whose structure changes, not needed for VALUE_KNOWN.
+            node (Node): The added, removed or known node.
+            edge (tuple): The added edge.
+            value (double): The value of a node that becomes known.
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown change kind: {kind}, must be one of {list(self.KINDS)}.")
+        if kind != self.VALUE_KNOWN and not isinstance(agent, LocalKnowledge):
+            raise TypeError("agent must be an instance of LocalKnowledge.")
+        if kind != self.EDGE_ADDED and not isinstance(node, Node):
+            raise TypeError("node must be an instance of Node.")
+        if kind == self.VALUE_KNOWN and value is None:
+            raise ValueError("A node that becomes known must be given a value.")
+        self.kind = kind
+        self.agent = agent
+        self.node = node
+        self.edge = edge
+        self.value = value
 
 class GlobalInformation:
     def __init__(self, init_nodes:list[Node], agent_list:list[LocalKnowledge]):
@@ -19,7 +62,9 @@ class GlobalInformation:
             agent_list (list[LocalKnowledge]): List of LocalKnowledge objects representing the local knowledge of agents.
         
         Member Variables:
-
+            - version (int): Changes whenever agents are added, removed or refreshed and whenever structures are grown or
+              regrown, so it can be used to invalidate indexes built from the layer. Changes made directly to an agent's
+              structure or to a grown structure do not change it.
         """
         if not isinstance(init_nodes, list):
             raise TypeError("init_nodes must be a list of Node objects.")
@@ -33,14 +78,145 @@ class GlobalInformation:
             if not isinstance(node, Node):
                 raise TypeError("All elements in init_nodes must be of type Node.")
         self.visited = np.zeros(len(init_nodes), dtype=bool)
+        # Map of init node id -> index in init_nodes/visited, the first occurrence of an id is used
+        self.init_index = {}
+        for i, node_id in enumerate(self.init_nodes_ids):
+            self.init_index.setdefault(node_id, i)
+        # Index of the first init node that may not be visited yet, used by get_node and all_visited
+        self.cursor = 0
 
         self.roots = []
+        # Map of root id -> first agent with that root, and node id -> agents whose structure contains the node
+        self.agent_index = {}
+        self.node_agents = {}
+        # Root id and node ids each agent was indexed with, so it can be removed from the indexes after it changes
+        self.indexed_agents = {}
         for agent in agent_list:
-            if not isinstance(agent, LocalKnowledge):
-                raise TypeError("All elements in agent_list must be of type LocalKnowledge.")
-            if agent.root is None:
-                raise ValueError("LocalKnowledge agent must have a root node.")
+            self._index_agent(agent)
             self.roots.append(agent.root.id)
+        self.root_ids = set(self.roots)
+        # Compiled form of the init nodes and agents, built on first use and dropped when agents change
+        self.dependency_graph = None
+        # GrowthResult the structures were grown from, when they were grown without setting Node.data_status
+        self.growth = None
+        self.version = next(_versions)
+        # Dependency index of the grown structures, built by impact on first use
+        self.impact_index = None
+        # Inverted index of the grown structures and the versions it was built at, see structure_index
+        self._structure_index = None
+        # Root id -> (u, v) edges of the grown structure where v was resolved from u, in growth order
+        self.resolved_from = {}
+
+    def _index_agent(self, agent:LocalKnowledge):
+        """
+        Validates an agent and adds it to the root and node indexes.
+        Args:
+            agent (LocalKnowledge): The agent to index.
+        """
+        if not isinstance(agent, LocalKnowledge):
+            raise TypeError("All elements in agent_list must be of type LocalKnowledge.")
+        if agent.root is None:
+            raise ValueError("LocalKnowledge agent must have a root node.")
+        if agent.structure is None:
+            # Agents without a structure do not contain any node, as in LocalKnowledge.contains_node
+            self.indexed_agents[agent] = (agent.root.id, None)
+            self.dependency_graph = None
+            self.version = next(_versions)
+            return
+        node_ids = list(agent.structure.node_id_list)
+        self.indexed_agents[agent] = (agent.root.id, node_ids)
+        self.agent_index.setdefault(agent.root.id, agent)
+        for node_id in node_ids:
+            self.node_agents.setdefault(node_id, []).append(agent)
+        self.dependency_graph = None
+        self.version = next(_versions)
+
+    def _unindex_agent(self, agent:LocalKnowledge):
+        """
+        Removes an agent from the root and node indexes, using the root and nodes it was indexed with.
+        Args:
+            agent (LocalKnowledge): The agent to remove.
+        """
+        root_id, node_ids = self.indexed_agents.pop(agent)
+        if self.agent_index.get(root_id) is agent:
+            self._reset_root(root_id)
+        for node_id in node_ids or []:
+            agents = self.node_agents[node_id]
+            agents.remove(agent)
+            if len(agents) == 0:
+                del self.node_agents[node_id]
+        self.version = next(_versions)
+
+    def _reset_root(self, root_id):
+        """
+        Points the root index entry for root_id at the first indexed agent in agent_list with that root and a structure.
+        Args:
+            root_id: The root id to reset.
+        """
+        self.agent_index.pop(root_id, None)
+        for agent in self.agent_list:
+            indexed = self.indexed_agents.get(agent)
+            if indexed is not None and indexed[0] == root_id and indexed[1] is not None:
+                self.agent_index[root_id] = agent
+                return
+
+    def add_agent(self, agent:LocalKnowledge):
+        """
+        Adds an agent to the global information layer and its indexes.
+        Args:
+            agent (LocalKnowledge): The agent to add.
+        """
+        if agent in self.indexed_agents:
+            raise ValueError(f"Agent with root node ID {agent.root.id} is already part of the global information layer.")
+        self._index_agent(agent)
+        self.agent_list.append(agent)
+        self.roots.append(agent.root.id)
+        self.root_ids.add(agent.root.id)
+
+    def remove_agent(self, agent:LocalKnowledge):
+        """
+        Removes an agent from the global information layer and its indexes.
+        Args:
+            agent (LocalKnowledge): The agent to remove.
+        """
+        if agent not in self.indexed_agents:
+            raise KeyError(f"Agent with root node ID {agent.root.id} not found in the global information layer.")
+        index = self.agent_list.index(agent)
+        self._unindex_agent(agent)
+        del self.agent_list[index]
+        root_id = self.roots.pop(index)
+        if root_id not in self.roots:
+            self.root_ids.discard(root_id)
+
+    def refresh_agent(self, agent:LocalKnowledge):
+        """
+        Re-indexes an agent after its root or structure has changed, for example after LocalKnowledge.expand.
+        Args:
+            agent (LocalKnowledge): The agent to re-index.
+        """
+        if agent not in self.indexed_agents:
+            raise KeyError(f"Agent with root node ID {agent.root.id} not found in the global information layer.")
+        old_root_id = self.indexed_agents[agent][0]
+        self._unindex_agent(agent)
+        self._index_agent(agent)
+        self._reset_root(agent.root.id)
+        index = self.agent_list.index(agent)
+        self.roots[index] = agent.root.id
+        if old_root_id not in self.roots:
+            self.root_ids.discard(old_root_id)
+        self.root_ids.add(agent.root.id)
+
+    def agents_containing(self, node:Node):
+        """
+        Returns the agents whose local knowledge structure contains the given node.
+        Args:
+            node (Node): The node to look up.
+        Returns:
+            list[LocalKnowledge]: The agents containing the node, in the order they were indexed.
+        """
+        if not isinstance(node, Node):
+            raise TypeError("node must be an instance of Node.")
+        return list(self.node_agents.get(node.id, []))
     
     # Might not actually need this function, will just keep it for now
     def is_visited(self, node:Node):
@@ -53,10 +229,17 @@ class GlobalInformation:
         """
         if not isinstance(node, Node):
             raise TypeError("node must be an instance of Node.")
-        if node.id not in self.init_nodes:
+        if node.id not in self.init_index:
             raise KeyError(f"Node with ID {node.id} not found in the global information layer.")
-        index = self.init_nodes.index(node)
-        return self.visited[index]
+        return self.visited[self.init_index[node.id]]
+
+    def mark_visited(self, node_id):
+        """
+        Marks the init node with the given id as visited.
+        Args:
+            node_id: The id of the init node to mark.
+        """
+        self.visited[self.init_index[node_id]] = True
     
     def get_node(self):
         """
@@ -65,11 +248,10 @@ class GlobalInformation:
         Returns:
             Node: An unvisited node from the global information layer, or None if all nodes have been visited.
         """
-        for i, node in enumerate(self.init_nodes):
-            if not self.visited[i]:
-                self.visited[i] = True
-                return node
-        return None
+        if self.all_visited():
+            return None
+        self.visited[self.cursor] = True
+        return self.init_nodes[self.cursor]
 
     def find_agent(self, node):
         """
@@ -81,28 +263,262 @@ class GlobalInformation:
         """
         if not isinstance(node, Node):
             raise TypeError("node must be an instance of Node.")
-        for agent in self.agent_list:
-            if agent.contains_node(node):
-                return agent
-        return None
+        # LocalKnowledge.contains_node only matches the agent's root, so the root index gives the same agent in O(1)
+        return self.agent_index.get(node.id)
     
     def all_visited(self):
         """
         Checks if all nodes in the global information layer have been visited.
+        Nodes before the cursor are always visited, so the cursor only has to move forward over the visited array once.
         Returns:
             bool: True if all nodes have been visited, False otherwise.
         """
-        return np.all(self.visited)
+        while self.cursor < len(self.visited) and self.visited[self.cursor]:
+            self.cursor += 1
+        return self.cursor == len(self.visited)
     
-    def grow_global(self):
+    def structures_key(self):
+        """
+        Returns a key that changes whenever the grown structures may have changed: when the version of the layer changes,
+        when self.structures is replaced, or when one of its structures is replaced or edited.
+        Returns:
+            tuple: The key, compared with == by the caches built from the structures.
+        """
+        return (self.version, id(self.structures), tuple((root_id, id(structure), structure.version)
+                                                         for root_id, structure in self.structures.items()))
+
+    def structure_index(self):
+        """
+        Returns an inverted index from node id to the structures in self.structures that contain the node.
+        The index is cached, and built again only when the version of the layer or of one of its structures changes, or
+        when self.structures is replaced. The returned dict is shared and must not be modified.
+        Returns:
+            dict: Node id -> list of root ids, in the order of self.structures.
+        """
+        key = self.structures_key()
+        if self._structure_index is not None and self._structure_index[0] == key:
+            return self._structure_index[1]
+        index = {}
+        for root_id, structure in self.structures.items():
+            for node_id in structure.node_id_list:
+                index.setdefault(node_id, []).append(root_id)
+        self._structure_index = (key, index)
+        return index
+
+    def node_table(self, table:NodeTable=None):
+        """
+        Builds a NodeTable of the init nodes followed by the nodes of every agent's structure, for bulk queries and value updates.
+        As with LocalInformation.node_table, the table is detached from the Nodes and is copied back with NodeTable.write_back.
+        Args:
+            table (NodeTable): (Optional) An existing table to add the nodes to, so it can be shared with other layers.
+        Returns:
+            NodeTable: The table holding the nodes of the layer.
+        """
+        table = NodeTable() if table is None else table
+        table.add_nodes(self.init_nodes)
+        for agent in self.agent_list:
+            if agent.structure is not None:
+                agent.structure.node_rows(table)
+        return table
+
+    def compile(self):
+        """
+        Returns the DependencyGraph of the init nodes and agents, compiling it if the agents changed since it was last built.
+        Node values changed after compiling are not picked up, pass a known vector to DependencyGraph.grow instead.
+        Returns:
+            DependencyGraph: The compiled graph.
+        """
+        if self.dependency_graph is None:
+            self.dependency_graph = DependencyGraph(self.init_nodes, self.agent_list)
+        return self.dependency_graph
+
+    def simulate_growth(self, known=None, cycle_safe=False):
+        """
+        Grows the global information structures without modifying this layer, its Nodes or its agents.
+        Unlike grow_global, resolved nodes are tracked in a per-run array instead of setting Node.data_status, so the same
+        layer can be grown repeatedly, and concurrently, under different known nodes.
+        Args:
+            known: (Optional) Known nodes to grow from, either a bool array indexed like compile().node_ids or an
+                iterable of known node ids, which sets the status of every Node with a given id. Defaults to the
+                data_status of each Node when the graph was compiled, which gives the same structures as grow_global.
+            cycle_safe (bool): If True, agents that depend on each other in a cycle are resolved as a unit instead of
+                raising a ValueError, see DependencyGraph.grow.
+        Returns:
+            GrowthResult: The grown structures and the known status after growth.
+        """
+        graph = self.compile()
+        if known is not None and not isinstance(known, np.ndarray):
+            known = graph.known_mask(known)
+        return graph.grow(known, cycle_safe=cycle_safe)
+
+    def simulate_scenarios(self, known_masks, max_workers=None, cycle_safe=False):
+        """
+        Grows many scenarios of known nodes from the compiled graph of the layer and returns per-scenario statistics, see
+        DependencyGraph.grow_scenarios. Nothing in the layer, its Nodes or its agents is changed.
+        Args:
+            known_masks: Either a bool array of shape (scenarios, nodes) with columns indexed like compile().node_ids, or a
+                list with an iterable of known node ids per scenario.
+            max_workers (int): (Optional) If given, the scenarios are grown in a pool of this many processes.
+            cycle_safe (bool): If True, cycles between agents are resolved as a unit, see DependencyGraph.grow.
+        Returns:
+            dict: Arrays of statistics with one entry per scenario, see DependencyGraph.grow_scenarios.
+        """
+        graph = self.compile()
+        if not isinstance(known_masks, np.ndarray):
+            known_masks = np.array([graph.known_mask(known) for known in known_masks], dtype=bool).reshape(-1, len(graph.node_ids))
+        return graph.grow_scenarios(known_masks, max_workers=max_workers, cycle_safe=cycle_safe)
+
+    def _known_in_agents(self, node_id):
+        """
+        Returns the known status DependencyGraph compiles for a node id that is not an init node: True if the node is known in
+        the structure of any agent that find_agent would return for its root.
+        """
+        for agent in self.node_agents.get(node_id, []):
+            if self.agent_index.get(agent.root.id) is agent and agent.structure.get_node(node_id).data_status:
+                return True
+        return False
+
+    def apply_change(self, change:DesignChange, knowledge=None):
+        """
+        Applies a design change and regrows only the structures it can affect, instead of growing the whole layer again.
+        Structures are grown as in simulate_growth, and after the change self.structures is the same as the structures
+        simulate_growth gives on a new GlobalInformation built from the changed agents. If the structures were not grown
+        that way yet, they are grown in full first, and the edges of knowledge are then rebuilt in full.
+        Only the work units (see DependencyGraph.work_units) containing the changed nodes, before and after the change, are regrown.
+        Args:
+            change (DesignChange): The change to apply.
+            knowledge (GlobalKnowledge): (Optional) A GlobalKnowledge layer whose edges are updated for the regrown structures.
+        Returns:
+            set: Ids of the nodes whose growth could be affected by the change.
+        """
+        if not isinstance(change, DesignChange):
+            raise TypeError("change must be an instance of DesignChange.")
+        graph = self.compile()
+        regrown = self.growth is None
+        if regrown:
+            self.growth = graph.grow()
+            self.structures = dict(self.growth.structures)
+            self.resolved_from = self.growth.resolved_from()
+            self.visited = self.growth.visited.copy()
+            self.version = next(_versions)
+        agent = change.agent
+        if change.kind == DesignChange.EDGE_ADDED:
+            # Edges inside an agent's structure do not change which nodes are pushed, so no structure needs to regrow
+            agent.structure.add_edge(change.edge)
+            if knowledge is not None and regrown:
+                knowledge.structure.remove_edges(list(knowledge.structure.edges))
+                knowledge.add_edges(self)
+            return set()
+        if agent is not None and agent not in self.indexed_agents:
+            raise KeyError(f"Agent with root node ID {agent.root.id} not found in the global information layer.")
+
+        touched = [change.node.id] if agent is None else [agent.root.id, change.node.id]
+        before = graph.component([graph.index[node_id] for node_id in touched if node_id in graph.index])
+        if change.kind == DesignChange.NODE_ADDED:
+            agent.structure.add_node(change.node, change.edge)
+        elif change.kind == DesignChange.NODE_REMOVED:
+            agent.structure.remove_node(change.node)
+        else:
+            change.node.value = change.value
+            change.node.data_status = True
+        if agent is not None:
+            self.refresh_agent(agent)
+            self.dependency_graph = graph
+
+        # Update the compiled graph in place: pushed nodes of the agent's root and known status of the changed node
+        graph.add_node(change.node)
+        if agent is not None:
+            graph.add_node(agent.root)
+        if agent is not None and self.agent_index.get(agent.root.id) is agent:
+            graph.set_children(graph.index[agent.root.id], [
+                node for node in agent.structure.node_list
+                if node.id != agent.root.id and (node.id in self.root_ids or node.id in self.init_index)])
+        graph.refresh_status(change.node)
+        i = graph.index[change.node.id]
+        if change.node.id in self.init_index:
+            graph.known[i] = self.init_nodes[self.init_index[change.node.id]].data_status
+        else:
+            graph.known[i] = self._known_in_agents(change.node.id)
+
+        # Regrow the init entries of the affected nodes and merge them with the structures that did not change
+        # Ids added by the change are new entries at the end of the graph, which were not part of any component before
+        before = np.concatenate((before, np.zeros(len(graph.node_ids) - len(before), dtype=bool)))
+        affected = before | graph.component([graph.index[node_id] for node_id in touched])
+        slots = np.flatnonzero(affected[graph.init_slots])
+        result = graph.grow(slots=slots.tolist())
+        old = self.growth
+        grown = [(start, root) for start, root in zip(old.starts, old.roots) if not affected[graph.init_slots[start]]]
+        grown += list(zip(result.starts, result.roots))
+        grown.sort()
+        members = {root: old.members[root] for _, root in grown if root in old.members and not affected[root]}
+        members.update(result.members)
+        edges = {root: old.edges[root] for _, root in grown if root in old.edges and not affected[root]}
+        edges.update(result.edges)
+        # Occurrences added by the change are new entries at the end of the status vector
+        status = result.status.copy()
+        unaffected = ~affected[graph.occurrence_index[:len(old.status)]]
+        status[:len(old.status)][unaffected] = old.status[unaffected]
+        visited = old.visited.copy()
+        visited[slots] = result.visited[slots]
+        self.growth = GrowthResult(graph, graph.known.copy(), status, visited, [root for _, root in grown], members, edges,
+                                   [start for start, _ in grown])
+
+        new_structures = result.structures
+        # Ids of the nodes in the regrown structures, before and after the change
+        changed_ids = set()
+        for root_id, structure in list(self.structures.items()) + list(new_structures.items()):
+            if root_id in graph.index and affected[graph.index[root_id]]:
+                changed_ids.update(structure.node_id_list)
+        structures = {}
+        for _, root in grown:
+            root_id = graph.node_ids[root]
+            structures[root_id] = new_structures[root_id] if affected[root] else self.structures[root_id]
+        self.structures = structures
+        self.resolved_from = self.growth.resolved_from()
+        self.visited = visited.copy()
+        self.version = next(_versions)
+        if knowledge is not None and regrown:
+            # Every structure was grown again, so the edges of knowledge are rebuilt from all of them
+            knowledge.structure.remove_edges(list(knowledge.structure.edges))
+            knowledge.add_edges(self)
+        elif knowledge is not None:
+            knowledge.update_edges(self, changed_ids)
+        return set(graph.node_ids[i] for i in np.flatnonzero(affected))
+
+    def grow_global(self, max_workers=None, cycle_safe=False):
         """
         Grows the global information layer by traversing through the local knowledge layers of agents.
         It uses a depth-first search approach to explore the information structures and to build structures from the back.
+        Root and init node membership are checked with sets and the next unvisited init node is found with a cursor,
+        so growth is linear in the number of nodes and edges visited.
+        Args:
+            max_workers (int): (Optional) If given, the init nodes are partitioned into independent work units that are grown
+                in a pool of this many processes, see DependencyGraph.grow_parallel. Parallel growth tracks resolved nodes
+                in a per-run array as simulate_growth does, and does not set Node.data_status.
+            cycle_safe (bool): If True, agents that depend on each other in a cycle are resolved as a unit, so growth
+                terminates in linear time on any design (see DependencyGraph.grow). Growth then tracks resolved nodes as
+                simulate_growth does. Without it, a cycle between agents raises a ValueError naming the agents of the cycle.
         """
+        self.version = next(_versions)
+        if max_workers is not None or cycle_safe:
+            graph = self.compile()
+            if max_workers is not None:
+                result = graph.grow_parallel(max_workers=max_workers, cycle_safe=cycle_safe)
+            else:
+                result = graph.grow(cycle_safe=True)
+            self.structures.update(result.structures)
+            self.resolved_from.update(result.resolved_from())
+            self.visited |= result.visited
+            self.growth = result
+            return
+        self.growth = None
         stack = []
+        # Ids of the nodes that were expanded and are waiting for a node they pushed to resolve them
+        waiting = set()
         while not self.all_visited():
             # Each iteration of this loop will find a new node to start from, and thus will grow a new information structure
             info = InformationStructure()
+            resolved = []
             # Get a node that has not been visited, and mark as visited
             node = self.get_node()
             root = node
@@ -116,27 +532,33 @@ class GlobalInformation:
                     raise TypeError("curr_node must be an instance of Node.")
                 # Check if the current node value is known or not
                 if not curr_node[0].data_status:
+                    if curr_node[0].id in waiting:
+                        # The node depends on itself through the agents it pushed, so it would be expanded forever
+                        graph = self.compile()
+                        raise graph._cycle_error(graph.index[curr_node[0].id])
                     # Find an agent that contains this node
                     agent = self.find_agent(curr_node[0])
                     structure = agent.structure
                     # For each sub-node in the structure, if it is a root node, push it onto the stack
+                    num_added = 0
                     for sub_node in structure.node_list:
                         # Might want to change this logic around, for now its ok
                         # If the sub node is not the current node and it is a root node or an init node, push it onto the stack
-                        num_added = 0
-                        if sub_node.id != curr_node[0].id and (sub_node.id in self.roots or sub_node.id in self.init_nodes_ids):
+                        is_init = sub_node.id in self.init_index
+                        if sub_node.id != curr_node[0].id and (sub_node.id in self.root_ids or is_init):
                             stack.append((sub_node, curr_node[0]))
                             # Add the sub node to the information structure
                             info.add_node(sub_node)
-                            # If sub node is an init node, mark it as visited
                             num_added += 1
-                            if sub_node.id in self.init_nodes_ids:
-                                index = self.init_nodes_ids.index(sub_node.id)
-                                self.visited[index] = True
+                            # If sub node is an init node, mark it as visited
+                            if is_init:
+                                self.mark_visited(sub_node.id)
                     if num_added == 0:
                         # If no sub nodes were added, we can pop the current node from the stack as this means it is calculable
                         # and we can add it to the information structure
                         curr_node[0].data_status = True
+                    else:
+                        waiting.add(curr_node[0].id)
 
                 else:
                     # If the current node is now known, we can add an edge to the information structure
@@ -144,20 +566,67 @@ class GlobalInformation:
                     # Draw an edge between current node and the node it came from
                     if not curr_node[0].id == curr_node[1].id:
                         info.add_edge((curr_node[0].id, curr_node[1].id))
+                        resolved.append((curr_node[0].id, curr_node[1].id))
                         curr_node[1].data_status = True
+                        waiting.discard(curr_node[1].id)
                         stack.pop()
                     else:
                         stack.pop()
             # After the stack is empty, we have a complete information structure
             self.structures[root.id] = info
+            self.resolved_from[root.id] = resolved
+
+    def impact(self, nodes:list[Node], knowledge=None):
+        """
+        Returns what a change to the given nodes affects, see ImpactIndex.impact. The index is built from the grown structures
+        on first use and rebuilt when they or the agents change.
+        Args:
+            nodes (list[Node]): The changed nodes.
+            knowledge (GlobalKnowledge): (Optional) A GlobalKnowledge layer whose affected nodes are returned as well.
+        Returns:
+            dict: The affected nodes, structures, agents and knowledge nodes.
+        """
+        if self.impact_index is None:
+            self.impact_index = ImpactIndex(self)
+        return self.impact_index.impact(nodes, knowledge)
+
+    def snapshot(self):
+        """
+        Takes an immutable snapshot of every grown structure, without copying any structure.
+        Structures regrown by grow_global are new objects, so they are compared by content with earlier snapshots,
+        while structures kept by apply_change are compared through their change logs.
+        Returns:
+            dict: Root id -> StructureSnapshot.
+        """
+        return snapshot_layer(self.structures)
+
+    def diff(self, old:dict, new:dict=None):
+        """
+        Returns the changes to the grown structures between two snapshots.
+        Args:
+            old (dict): A snapshot taken with self.snapshot().
+            new (dict): (Optional) A later snapshot, defaults to the current structures.
+        Returns:
+            dict: Root id -> changes in the form of ChangeLog.diff, for the structures that changed.
+        """
+        return diff_layers(old, self.snapshot() if new is None else new)
 
     def draw(self):
         """
         Draws the global information layer using matplotlib, displaying nodes, edges, and designating the root nodes.
         """
-        plt.figure(figsize=(10, 10))
-        for i, (root_id, structure) in enumerate(self.structures.items()):
-            plt.subplot(len(self.structures), 1, i + 1)
-            plt.title(f"Information Structure with Root Node ID = {root_id}")
-            nx.draw(structure.structure, with_labels=True, node_size=700, font_size=10, edge_color='gray')
-        plt.show()
\ No newline at end of file
+        rendering.draw_graphs({root_id: structure.to_networkx() for root_id, structure in self.structures.items()},
+                              positions={root_id: rendering.layouts.positions(structure) for root_id, structure in self.structures.items()})
+
+    def render(self, directory, fmt='png', per_page=rendering.PER_PAGE, max_workers=None):
+        """
+        Writes the grown structures of the layer to paginated image files, without showing anything.
+        Args:
+            directory (str): Directory to write the files to, created if missing.
+            fmt (str): 'png' or 'svg'.
+            per_page (int): Maximum number of structures on one page.
+            max_workers (int): (Optional) If given, the pages are rendered in a pool of this many processes.
+        Returns:
+            list[str]: The paths of the written files, in page order.
+        """
+        return rendering.render_structures(self.structures, directory, fmt=fmt, per_page=per_page, max_workers=max_workers)
\ No newline at end of file
@@ -6,8 +6,9 @@ from framework.data_types.information_structure import InformationStructure, Nod
 from framework.local_information import LocalInformation
 from framework.local_knowledge import LocalKnowledge
 from framework.global_information import GlobalInformation
+from framework import rendering
 import networkx as nx
-import matplotlib.pyplot as plt
+import numpy as np
 
 
 class GlobalKnowledge:
@@ -25,42 +26,150 @@ class GlobalKnowledge:
             raise TypeError("init_nodes must be a list of Node objects.")
         self.node_list = init_nodes
         self.node_id_list = [node.id for node in self.node_list]
+        self.node_id_set = set(self.node_id_list)
         # Create an InformationStructure with the provided nodes and no edges or root.
         # Edges will be add later when the GlobalKnowledge layer is examined by the agent.
         self.structure = InformationStructure(node_list=self.node_list, edges=[], root=None)
 
-    def find_connections(self, node: Node, global_info: GlobalInformation) -> list[Node]:
+    def find_connections(self, node: Node, global_info: GlobalInformation, index: dict = None) -> list[Node]:
         """
         Finds connections for a given node in the GlobalInformation layer.
         Args:
             node (Node): The node for which connections are to be found.
             global_info (GlobalInformation): The GlobalInformation layer to search for connections.
+            index (dict): (Optional) Node id -> root ids index, defaults to the cached GlobalInformation.structure_index.
         Returns:
             list[Node]: List of nodes that are connected to the given node in the GlobalInformation layer.
         """
-        connections = []
-        for structure in global_info.structures.values():
-            if structure.contains_node(node):
-                # If the node is found in the structure, return all connected nodes.
-                for n in structure.node_list:
-                    # Excluding the node itself, add a node to connections if it is part of the global knowledge layer.
-                    # This ensures that we only consider nodes that are part of the global knowledge layer.
-                    if n.id != node.id and n.id in self.node_id_list:
-                        connections.append(n)
-                return connections
-        # If no connections are found, return an empty list.
-        return []
+        if index is None:
+            index = global_info.structure_index()
+        root_ids = index.get(node.id)
+        if not root_ids:
+            # If no connections are found, return an empty list.
+            return []
+        # If the node is found in a structure, return all connected nodes of the first structure containing it.
+        # Excluding the node itself, add a node to connections if it is part of the global knowledge layer.
+        structure = global_info.structures[root_ids[0]]
+        return [n for n in structure.node_list if n.id != node.id and n.id in self.node_id_set]
 
-    def add_edges(self, global_info: GlobalInformation):
+    def project_edges(self, global_info: GlobalInformation) -> list[tuple]:
+        """
+        Computes the edges add_edges would add, as a sparse matrix product instead of Python loops.
+        B is the knowledge node x structure incidence matrix and F keeps only the first structure containing each knowledge
+        node, the structure find_connections uses. Two knowledge nodes are connected if F @ B.T is non zero in either direction.
+        Requires scipy.
+        Args:
+            global_info (GlobalInformation): The GlobalInformation layer to extract connections from.
+        Returns:
+            list[tuple]: The undirected edges as (node id, node id) tuples, each edge listed once.
+        """
+        from scipy import sparse
+
+        knowledge_index = {}
+        for node_id in self.node_id_list:
+            knowledge_index.setdefault(node_id, len(knowledge_index))
+        ids = list(knowledge_index)
+        rows = []
+        cols = []
+        for s, structure in enumerate(global_info.structures.values()):
+            members = [knowledge_index[node_id] for node_id in structure.node_id_list if node_id in knowledge_index]
+            rows.extend(members)
+            cols.extend([s] * len(members))
+        if len(rows) == 0:
+            return []
+        rows = np.array(rows, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        shape = (len(ids), len(global_info.structures))
+        incidence = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=shape)
+        # Structures were added in order, so the first entry of each row after a stable sort is its first structure
+        order = np.argsort(rows, kind='stable')
+        first_rows, first = np.unique(rows[order], return_index=True)
+        first_cols = cols[order][first]
+        first_incidence = sparse.csr_matrix((np.ones(len(first_rows), dtype=np.int32), (first_rows, first_cols)), shape=shape)
+        projection = first_incidence @ incidence.T
+        projection = sparse.triu(projection + projection.T, k=1).tocoo()
+        order = np.lexsort((projection.col, projection.row))
+        return [(ids[u], ids[v]) for u, v in zip(projection.row[order], projection.col[order])]
+
+    def add_edges(self, global_info: GlobalInformation, vectorized: bool = False):
         """
         Adds edges to the GlobalKnowledge layer based on the connections found in the GlobalInformation layer.
+        The node -> structure index and the knowledge nodes of each structure are computed once, so the work is
+        linear in the size of the structures plus the number of edges added.
         Args:
             global_info (GlobalInformation): The GlobalInformation layer to extract connections from.
+            vectorized (bool): If True, the edges are computed in one step with project_edges, for large knowledge layers.
+        """
+        if vectorized:
+            self.structure.add_edges(self.project_edges(global_info))
+            return
+        self._connect(self.node_list, global_info.structures, global_info.structure_index())
+
+    def update_edges(self, global_info: GlobalInformation, node_ids):
+        """
+        Updates the edges of the GlobalKnowledge layer after GlobalInformation.apply_change regrew some structures, giving
+        the same edges add_edges gives on the changed layer.
+        Args:
+            global_info (GlobalInformation): The GlobalInformation layer the structures were regrown in.
+            node_ids (iterable): Ids of the nodes of the regrown structures, before and after the change.
+        """
+        changed = set(node_ids) & self.node_id_set
+        if len(changed) == 0:
+            return
+        # Other knowledge nodes keep their edges to a changed node if it is still part of their first structure
+        others = {}
+        for node_id in changed:
+            for n in self.structure.neighbors(node_id):
+                if n not in changed:
+                    others.setdefault(n, []).append(node_id)
+        first = self._first_structures(global_info, changed | others.keys())
+        self.structure.remove_edges([(node_id, n) for node_id in changed for n in self.structure.neighbors(node_id)])
+        self._connect([node for node in self.node_list if node.id in changed], global_info.structures,
+                      {node_id: [root_id] for node_id, root_id in first.items() if node_id in changed})
+        for n, node_ids in others.items():
+            structure = global_info.structures.get(first.get(n))
+            if structure is not None:
+                self.structure.add_edges([(n, node_id) for node_id in node_ids if node_id in structure.nodes])
+
+    @staticmethod
+    def _first_structures(global_info: GlobalInformation, node_ids):
+        """
+        Finds the first structure of global_info containing each node, without indexing every structure.
+        Returns:
+            dict: Node id -> root id of its first structure, for the nodes contained in a structure.
+        """
+        pending = set(node_ids)
+        first = {}
+        for root_id, structure in global_info.structures.items():
+            if len(pending) == 0:
+                break
+            found = [node_id for node_id in pending if node_id in structure.nodes]
+            for node_id in found:
+                first[node_id] = root_id
+            pending.difference_update(found)
+        return first
+
+    def _connect(self, nodes: list[Node], structures: dict, index: dict):
+        """
+        Adds the edges of each node to the other knowledge nodes of the first structure containing it.
+        Args:
+            nodes (list[Node]): The knowledge nodes to connect.
+            structures (dict): Root id -> InformationStructure.
+            index (dict): Node id -> root ids of the structures containing it, in order.
         """
-        for node in self.node_list:
-            connections = self.find_connections(node=node, global_info=global_info)
-            for c in connections:
-                self.structure.add_edge((node.id, c.id))
+        # Root id -> nodes of that structure which are part of the global knowledge layer
+        knowledge_members = {}
+        for node in nodes:
+            root_ids = index.get(node.id)
+            if not root_ids:
+                continue
+            root_id = root_ids[0]
+            if root_id not in knowledge_members:
+                structure = structures[root_id]
+                knowledge_members[root_id] = [n for n in structure.node_list if n.id in self.node_id_set]
+            for c in knowledge_members[root_id]:
+                if c.id != node.id:
+                    self.structure.add_edge((node.id, c.id))
             
     def draw(self):
         """
@@ -69,6 +178,5 @@ class GlobalKnowledge:
         if self.structure is None:
             print("No structure to draw.")
             return
-        plt.title("Global Knowledge Structure")
-        nx.draw(self.structure.structure, with_labels=True, node_size=700, font_size=10, edge_color='gray')
-        plt.show()
\ No newline at end of file
+        rendering.draw_graph(self.structure.to_networkx(), "Global Knowledge Structure",
+                             pos=rendering.layouts.positions(self.structure))
\ No newline at end of file
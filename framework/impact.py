@@ -0,0 +1,139 @@
+"""
+Defines the ImpactIndex class, a dependency index over the grown structures of a GlobalInformation layer used to answer
+which nodes, structures, agents and GlobalKnowledge nodes are affected when some nodes change.
+"""
+
+from collections import OrderedDict, deque
+from framework.data_types.information_structure import Node
+
+class ImpactIndex:
+    def __init__(self, global_info, max_entries=1024):
+        """
+        Initializes the dependency index of a GlobalInformation layer. The index is built from the grown structures when it
+        is first queried, and rebuilt whenever the layer, its grown structures or the structures of its agents have changed
+        since.
+        The direction of an edge of a grown structure is taken from GlobalInformation.resolved_from, recorded when the
+        structure was grown: for an edge (u, v) there, v was resolved from u, so v depends on u. Structures do not keep the
+        orientation of their edges (the compact backend and compose store them undirected), so an edge that growth did not
+        record, like one added to a grown structure by hand, is treated as undirected and makes each end a dependent of the
+        other. Grown structures only hold roots and init nodes, so every node of an agent's structure also has the agent's
+        root as a dependent: a change inside an agent reaches its root, and from there the structures grown from that root.
+        Args:
+            global_info (GlobalInformation): The layer to index.
+            max_entries (int): Maximum number of query results kept in the result cache.
+        Member variables:
+            - dependents (dict): Node id -> ids of the nodes resolved from it, over all grown structures, and of the roots of
+              the agents whose structure holds it.
+            - node_structures (dict): Node id -> root ids of the grown structures containing it.
+            - node_agents (dict): Node id -> agents whose structure contains it.
+            - key (tuple): Key of the structures and agents the index was built from, see _key. None before the first build.
+            - results (OrderedDict): LRU cache of query results, keyed by the frozenset of changed ids.
+        """
+        self.global_info = global_info
+        self.max_entries = max_entries
+        self.dependents = {}
+        self.node_structures = {}
+        self.node_agents = {}
+        self.key = None
+        self.results = OrderedDict()
+
+    def _key(self):
+        """
+        Returns a key that changes whenever the grown structures or the structures of the agents may have changed.
+        """
+        agents = tuple((id(agent.structure), agent.structure.version if agent.structure is not None else None)
+                       for agent in self.global_info.agent_list)
+        return self.global_info.structures_key(), agents
+
+    def rebuild(self):
+        """
+        Builds the reverse dependency edges from the grown structures and the agents, and the node -> structure index from
+        the grown structures, and clears the result cache.
+        """
+        key = self._key()
+        dependents = {}
+        node_structures = {}
+        node_agents = {}
+        for agent in self.global_info.agent_list:
+            if agent.structure is None:
+                continue
+            for node_id in agent.structure.node_id_list:
+                node_agents.setdefault(node_id, []).append(agent)
+                if node_id != agent.root.id:
+                    dependents.setdefault(node_id, set()).add(agent.root.id)
+        for root_id, structure in self.global_info.structures.items():
+            for node_id in structure.node_id_list:
+                node_structures.setdefault(node_id, []).append(root_id)
+            edge_set = structure.edge_set
+            oriented = set()
+            for u, v in self.global_info.resolved_from.get(root_id, ()):
+                edge = frozenset((u, v))
+                if edge in edge_set and edge not in oriented:
+                    oriented.add(edge)
+                    dependents.setdefault(u, set()).add(v)
+            for edge in edge_set - oriented:
+                for u in edge:
+                    for v in edge:
+                        if u != v:
+                            dependents.setdefault(u, set()).add(v)
+        self.dependents = dependents
+        self.node_structures = node_structures
+        self.node_agents = node_agents
+        self.results.clear()
+        self.key = key
+
+    def _query(self, node_ids:frozenset):
+        """
+        Walks the reverse dependency edges from the changed ids. Only the affected nodes and their edges are visited.
+        Returns:
+            tuple: The affected node ids, root ids of the affected structures and affected agents.
+        """
+        affected = set(node_ids)
+        node_queue = deque(node_ids)
+        while node_queue:
+            node_id = node_queue.popleft()
+            for dependent in self.dependents.get(node_id, ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    node_queue.append(dependent)
+        structures = set()
+        agents = set()
+        for node_id in affected:
+            structures.update(self.node_structures.get(node_id, ()))
+            agents.update(self.node_agents.get(node_id, ()))
+        return frozenset(affected), frozenset(structures), frozenset(agents)
+
+    def impact(self, nodes:list[Node], knowledge=None):
+        """
+        Returns what a change to a batch of nodes affects, in time proportional to the size of the result.
+        Results are cached until the grown structures or the structures of the agents change.
+        Args:
+            nodes (list[Node]): The changed nodes.
+            knowledge (GlobalKnowledge): (Optional) A GlobalKnowledge layer whose affected nodes are returned as well.
+        Returns:
+            dict:
+                - 'nodes' (frozenset): Ids of the changed nodes and of every node depending on them, directly or not,
+                  including the roots of the agents holding them.
+                - 'structures' (frozenset): Root ids of the grown structures containing an affected node.
+                - 'agents' (frozenset[LocalKnowledge]): Agents whose structure contains an affected node.
+                - 'knowledge_nodes' (frozenset): Ids of the affected nodes of knowledge, only if knowledge is given.
+        """
+        for node in nodes:
+            if not isinstance(node, Node):
+                raise TypeError("All elements in nodes must be of type Node.")
+        if self.key != self._key():
+            self.rebuild()
+        key = frozenset(node.id for node in nodes)
+        result = self.results.get(key)
+        if result is None:
+            result = self._query(key)
+            self.results[key] = result
+            if len(self.results) > self.max_entries:
+                self.results.popitem(last=False)
+        else:
+            self.results.move_to_end(key)
+        affected, structures, agents = result
+        impact = {'nodes': affected, 'structures': structures, 'agents': agents}
+        if knowledge is not None:
+            impact['knowledge_nodes'] = frozenset(node_id for node_id in affected if node_id in knowledge.node_id_set)
+        return impact
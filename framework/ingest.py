@@ -0,0 +1,143 @@
+"""
+Defines the streaming ingest functions used to build LocalInformation layers from large exports of agent information
+structures, one record at a time instead of from a fully built list of InformationStructures.
+A record is a tuple (root, nodes, edges): the root node, the other nodes of the structure and its edges.
+"""
+
+import itertools
+import json
+from framework.data_types.information_structure import InformationStructure, Node
+from framework.local_information import LocalInformation
+from framework import storage
+
+def structure_from_record(record, backend='networkx'):
+    """
+    Builds an InformationStructure from a record.
+    Args:
+        record (tuple): (root, nodes, edges). The root and each node is a Node, a node id or an (id, value) pair, and edges
+            are pairs of node ids. Nodes that only appear in edges are added as unknown nodes.
+        backend (str): Graph engine of the structure, see InformationStructure.
+    Returns:
+        InformationStructure: The structure, rooted at the record's root.
+    """
+    if not isinstance(record, (tuple, list)) or len(record) != 3:
+        raise ValueError("record must be a tuple of (root, nodes, edges).")
+    root, nodes, edges = record
+    root = _to_node(root)
+    node_list = [root] + [_to_node(node) for node in nodes]
+    edges = [tuple(edge) for edge in edges]
+    seen = set(node.id for node in node_list)
+    for edge in edges:
+        if len(edge) != 2:
+            raise ValueError("edge must be a tuple of length 2, representing the source and target node ids.")
+        for node_id in edge:
+            if node_id not in seen:
+                seen.add(node_id)
+                node_list.append(Node(node_id))
+    return InformationStructure(node_list=node_list, edges=edges, root=root, backend=backend)
+
+def _to_node(node):
+    """
+    Returns a Node for a Node, an (id, value) pair or an id.
+    """
+    if isinstance(node, Node):
+        return node
+    if isinstance(node, (tuple, list)):
+        if len(node) != 2:
+            raise ValueError("A node given as a pair must be (id, value).")
+        return Node(node[0], node[1])
+    return Node(node)
+
+def chunks(records, chunk_size:int):
+    """
+    Splits an iterable of records into lists of at most chunk_size records, reading one chunk at a time.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+def ingest(records, layer:LocalInformation=None, chunk_size:int=1000, backend='networkx'):
+    """
+    Builds a LocalInformation layer from an iterable of records, one chunk at a time.
+    Only one chunk of records is held besides the layer itself, and roots are checked for duplicates as each chunk is added.
+    A chunk with a duplicate root is not added, the chunks before it stay in the layer.
+    Args:
+        records (iterable[tuple]): The records, see structure_from_record.
+        layer (LocalInformation): (Optional) The layer to add the structures to, defaults to a new layer.
+        chunk_size (int): Number of records read and added at a time.
+        backend (str): Graph engine of the structures.
+    Returns:
+        LocalInformation: The layer holding the ingested structures.
+    """
+    layer = LocalInformation(structure_list=[]) if layer is None else layer
+    for chunk in chunks(records, chunk_size):
+        layer.add_structures([structure_from_record(record, backend) for record in chunk])
+    return layer
+
+def ingest_to_file(records, path:str, chunk_size:int=1000):
+    """
+    Streams an iterable of records to a saved LocalInformation layer on disk (see storage), so peak memory does not depend
+    on the number of records. Structures are built one at a time and written every chunk_size records.
+    Args:
+        records (iterable[tuple]): The records, see structure_from_record.
+        path (str): The directory to write to.
+        chunk_size (int): Number of structures buffered between writes.
+    Returns:
+        LayerFile: The saved layer, memory mapped.
+    """
+    return storage.save_structures((structure_from_record(record) for record in records), path, chunk_size)
+
+def read_jsonl(path:str):
+    """
+    Reads records from a JSON lines file, one structure per line in the form
+    {"root": id, "nodes": [id or [id, value], ...], "edges": [[id, id], ...]}. "nodes" and "edges" are optional.
+    Args:
+        path (str): The file to read.
+    Yields:
+        tuple: One record per non-empty line.
+    """
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                yield (entry['root'], entry.get('nodes', []), entry.get('edges', []))
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                raise ValueError(f"Invalid record on line {line_number} of {path}: {e}") from None
+
+def read_edge_list(path:str, delimiter:str=None):
+    """
+    Reads records from an edge list file. Each line is "root u v" for an edge (u, v) of the structure of root, or "root u"
+    for a node without edges. Consecutive lines with the same root form one structure. Ids are read as strings, lines
+    starting with # are skipped.
+    Args:
+        path (str): The file to read.
+        delimiter (str): (Optional) Column separator, defaults to any whitespace.
+    Yields:
+        tuple: One record per structure.
+    """
+    root, nodes, edges = None, [], []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            columns = [column.strip() for column in line.split(delimiter)]
+            if len(columns) not in (2, 3):
+                raise ValueError(f"Invalid line {line_number} of {path}: expected 2 or 3 columns, got {len(columns)}.")
+            if columns[0] != root:
+                if root is not None:
+                    yield (root, nodes, edges)
+                root, nodes, edges = columns[0], [], []
+            if len(columns) == 2:
+                nodes.append(columns[1])
+            else:
+                edges.append((columns[1], columns[2]))
+    if root is not None:
+        yield (root, nodes, edges)
@@ -2,10 +2,17 @@
 Defines the LocalInformation class used in the KI framework, describes a local information layer.
 """
 
+import itertools
 import numpy as np
 import networkx as nx
-import matplotlib.pyplot as plt
 from framework.data_types.information_structure import InformationStructure, Node
+from framework.data_types.node_table import NodeTable
+from framework.data_types.change_log import snapshot_layer, diff_layers
+from framework.propagation import PropagationEngine, AGGREGATIONS
+from framework import rendering
+
+# Shared counter, so that a version number identifies both a LocalInformation layer and its state
+_versions = itertools.count()
 
 class LocalInformation:
 
@@ -14,6 +21,12 @@ class LocalInformation:
         Initializes the LocalInformation layer with a given size and a list of InformationStructure objects.
         Args:
             structure_list (list): List of InformationStructure objects.
+        Member variables:
+            - version (int): Changes whenever a structure is added to the layer. Versions are unique across all layers,
+              so they can be used as cache keys. Changes made directly to a structure of the layer do not change it.
+            - aggregations (dict): Root id -> aggregation computing the root's value from its inputs, see set_aggregation.
+            - propagation (tuple): The compiled PropagationEngine and the versions of the layer and of its structures it was
+              compiled at, None until compile_propagation is called.
         """
         self.structures = {}
         for structure in structure_list:
@@ -24,6 +37,9 @@ class LocalInformation:
                 raise ValueError(f"Duplicate root node ID found: {structure.get_root_node().id}")
             self.structures[structure.get_root_node().id] = structure
         self.size = len(self.structures)
+        self.version = next(_versions)
+        self.aggregations = {}
+        self.propagation = None
     
     def get_structure(self, root):
         """
@@ -54,15 +70,39 @@ class LocalInformation:
     
     def draw(self):
         """
-        Draws all InformationStructures in the LocalInformation layer using matplotlib.
+        Draws all InformationStructures in the LocalInformation layer using matplotlib, at most rendering.PER_PAGE per figure.
+        """
+        rendering.draw_graphs({root_id: structure.to_networkx() for root_id, structure in self.structures.items()}, node_size=300,
+                              positions={root_id: rendering.layouts.positions(structure) for root_id, structure in self.structures.items()})
+
+    def render(self, directory, fmt='png', per_page=rendering.PER_PAGE, max_workers=None):
+        """
+        Writes all InformationStructures in the layer to paginated image files, without showing anything.
+        Args:
+            directory (str): Directory to write the files to, created if missing.
+            fmt (str): 'png' or 'svg'.
+            per_page (int): Maximum number of structures on one page.
+            max_workers (int): (Optional) If given, the pages are rendered in a pool of this many processes.
+        Returns:
+            list[str]: The paths of the written files, in page order.
         """
-        plt.figure(figsize=(10, 10))
-        for i, (root_id, structure) in enumerate(self.structures.items()):
-            plt.subplot(len(self.structures), 1, i + 1)
-            plt.title(f"Information Structure with Root Node ID = {root_id}")
-            nx.draw(structure.structure, with_labels=True, node_size=300, font_size=10, edge_color='gray')
-        plt.show()
+        return rendering.render_structures(self.structures, directory, fmt=fmt, per_page=per_page, max_workers=max_workers)
     
+    def node_table(self, table:NodeTable=None):
+        """
+        Builds a NodeTable of the nodes of every structure in the layer, for bulk queries and value updates.
+        The table is a detached copy of the values and status of the Nodes: later changes to the Nodes are not seen by the
+        table, and values set on the table only reach the Nodes through NodeTable.write_back.
+        Args:
+            table (NodeTable): (Optional) An existing table to add the nodes to, so it can be shared with other layers.
+        Returns:
+            NodeTable: The table holding the nodes of the layer.
+        """
+        table = NodeTable() if table is None else table
+        for structure in self.structures.values():
+            structure.node_rows(table)
+        return table
+
     def add_structure(self, new_structure:InformationStructure):
         """
         Adds a new InformationStructure to the LocalInformation layer.
@@ -70,4 +110,84 @@ class LocalInformation:
             new_structure (InformationStructure): The structure to be added.
         """
         self.structures[new_structure.get_root_node().id] = new_structure
-        self.size += 1
\ No newline at end of file
+        self.size += 1
+        self.version = next(_versions)
+        self.propagation = None
+
+    def add_structures(self, structures:list):
+        """
+        Adds a batch of InformationStructures to the layer. The batch is checked before any structure is added, so a
+        batch with an invalid structure or a root already in the layer leaves the layer unchanged.
+        Args:
+            structures (list[InformationStructure]): The structures to add.
+        """
+        root_ids = set()
+        for structure in structures:
+            if not isinstance(structure, InformationStructure):
+                raise TypeError("All elements in structures must be of type InformationStructure.")
+            root_id = structure.get_root_node().id
+            if root_id in self.structures or root_id in root_ids:
+                raise ValueError(f"Duplicate root node ID found: {root_id}")
+            root_ids.add(root_id)
+        for structure in structures:
+            self.structures[structure.get_root_node().id] = structure
+        self.size += len(structures)
+        self.version = next(_versions)
+        self.propagation = None
+
+    def set_aggregation(self, root, aggregation):
+        """
+        Attaches an aggregation to the root of a structure, the root's value is then computed from the values of the nodes
+        adjacent to it in the structure by propagate.
+        Args:
+            root (Node): The root of the structure.
+            aggregation: A name in AGGREGATIONS ('sum', 'mean', 'prod', 'min' or 'max'), or a callable given the input values
+                as an array of shape (inputs, scenarios) and returning an array of shape (scenarios,).
+        """
+        self.get_structure(root)
+        if not callable(aggregation) and aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation: {aggregation}, must be callable or one of {list(AGGREGATIONS)}.")
+        self.aggregations[root.id] = aggregation
+        self.propagation = None
+
+    def compile_propagation(self):
+        """
+        Returns the PropagationEngine of the layer's aggregations, compiling it if the layer, one of its structures or the
+        aggregations changed since it was last built. Evaluate it with several columns of values to compute many scenarios at once.
+        Returns:
+            PropagationEngine: The compiled engine.
+        """
+        # Structures can be edited directly, which only changes their own version
+        versions = (self.version, tuple(structure.version for structure in self.structures.values()))
+        if self.propagation is None or self.propagation[1] != versions:
+            self.propagation = (PropagationEngine(self), versions)
+        return self.propagation[0]
+
+    def propagate(self):
+        """
+        Computes the value of every unknown node that can be derived from the known nodes through the aggregations, and
+        sets it on the Nodes of the layer.
+        Returns:
+            list: Ids of the nodes that were given a value.
+        """
+        engine = self.compile_propagation()
+        return engine.write_back(engine.evaluate(), self.structures.values())
+
+    def snapshot(self):
+        """
+        Takes an immutable snapshot of every structure in the layer, without copying any structure.
+        Returns:
+            dict: Root id -> StructureSnapshot.
+        """
+        return snapshot_layer(self.structures)
+
+    def diff(self, old:dict, new:dict=None):
+        """
+        Returns the changes to the structures of the layer between two snapshots.
+        Args:
+            old (dict): A snapshot taken with self.snapshot().
+            new (dict): (Optional) A later snapshot, defaults to the current state of the layer.
+        Returns:
+            dict: Root id -> changes in the form of ChangeLog.diff, for the structures that changed.
+        """
+        return diff_layers(old, self.snapshot() if new is None else new)
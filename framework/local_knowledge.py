@@ -3,10 +3,89 @@ Defines the Local Knowledge layer in the KI framework
 """
 
 import networkx as nx
-import matplotlib.pyplot as plt
-import queue
+from collections import deque, OrderedDict
 from framework.data_types.information_structure import InformationStructure, Node
 from framework.local_information import LocalInformation
+from framework import rendering
+
+class ExpansionCache:
+    def __init__(self, max_entries=1024, max_size=1000000):
+        """
+        Initializes an LRU cache of expansion closures, the roots reachable from a root of a LocalInformation layer.
+        Entries are keyed by (LocalInformation.version, root id), so adding a structure to a layer invalidates its entries.
+        The cache can be shared by many LocalKnowledge layers, so agents whose roots overlap reuse each other's closures.
+        Args:
+            max_entries (int): Maximum number of closures kept.
+            max_size (int): Maximum number of roots kept over all closures, which bounds the memory used.
+        """
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns the closure stored under a key and marks it as most recently used, or None if it is not cached.
+        """
+        closure = self.entries.get(key)
+        if closure is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return closure
+
+    def put(self, key, closure:tuple):
+        """
+        Stores a closure, evicting the least recently used closures while the cache is over its limits.
+        """
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+        self.entries[key] = closure
+        self.size += len(closure)
+        while self.entries and (len(self.entries) > self.max_entries or self.size > self.max_size):
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def closure(self, agent:LocalInformation, root:Node):
+        """
+        Returns the roots of agent's information layer reachable from root, starting with root itself.
+        The search is breadth-first, but when it reaches a root whose closure is already cached, that closure is added
+        as a whole instead of being walked again. Every root reached is looked up with get, so it counts as a hit or a miss.
+        Args:
+            agent (LocalInformation): The information layer to expand in.
+            root (Node): The root to expand from.
+        Returns:
+            tuple[Node]: The reachable roots.
+        """
+        key = (agent.version, root.id)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        order = [root]
+        seen = {root.id}
+        node_queue = deque([root])
+        while node_queue:
+            curr = node_queue.popleft()
+            for node in agent.get_structure(curr).node_list:
+                if node.id in seen or not agent.is_root_node(node):
+                    continue
+                # Looked up through get, so a reused closure is promoted like any other hit and is not evicted first
+                sub_closure = self.get((agent.version, node.id))
+                if sub_closure is not None:
+                    for n in sub_closure:
+                        if n.id not in seen:
+                            seen.add(n.id)
+                            order.append(n)
+                else:
+                    seen.add(node.id)
+                    order.append(node)
+                    node_queue.append(node)
+        closure = tuple(order)
+        self.put(key, closure)
+        return closure
 
 class LocalKnowledge:
     def __init__(self, structure=None, root=None):
@@ -24,6 +103,7 @@ class LocalKnowledge:
     def add_structure(self, new_structure:InformationStructure):
         """
         Adds an InformationStructure to the Local Knowledge layer.
+        The first structure added is copied, so composing later structures does not modify the original.
         Args:
             structure (InformationStructure): The information structure to be added.
             root (Node): 
@@ -31,10 +111,23 @@ class LocalKnowledge:
         if not isinstance(new_structure, InformationStructure):
             raise TypeError("structure must be an instance of InformationStructure.")
         if self.structure is None:
-            self.structure = new_structure
+            self.structure = new_structure.copy()
             self.root = new_structure.get_root_node()
         else:
             self.structure.compose(new_structure)
+
+    def add_structures(self, new_structures:list[InformationStructure]):
+        """
+        Adds a batch of InformationStructures to the Local Knowledge layer, merging them in a single pass.
+        Args:
+            new_structures (list[InformationStructure]): The information structures to be added.
+        """
+        if len(new_structures) == 0:
+            return
+        if self.structure is None:
+            self.add_structure(new_structures[0])
+            new_structures = new_structures[1:]
+        self.structure.compose_many(new_structures)
     
     def contains_node(self, node:Node):
         """
@@ -57,31 +150,51 @@ class LocalKnowledge:
         if self.structure is None:
             print("No structure to draw.")
             return
-        plt.title(f"Knowledge Structure, Root Node = {self.root.id}" if self.root else "Knowledge Structure")
-        nx.draw(self.structure.structure, with_labels=True, node_size=700, font_size=10, edge_color='gray')
-        plt.show()
+        title = f"Knowledge Structure, Root Node = {self.root.id}" if self.root else "Knowledge Structure"
+        rendering.draw_graph(self.structure.to_networkx(), title, pos=rendering.layouts.positions(self.structure))
     
-    def expand(self, agent:LocalInformation, root:Node):
+    def expand(self, agent:LocalInformation, root:Node, cache:ExpansionCache=None):
         """
         Expands the Local Knowledge layer by adding new structures from another agent.
+        Supporting structures are found with a breadth-first search over the roots of the agent's information layer,
+        and are composed into the Local Knowledge layer in a single merge once the search is done.
         Args:
             agent (LocalInformation): The agent whos information structures are to be added.
             root (Node): Initial root node for the expansion.
+            cache (ExpansionCache): (Optional) Cache of closures to reuse. With a cache, structures are merged in the order
+                the cached closure lists them, which can differ from the breadth-first order, the nodes and edges are the same.
         """
         if not isinstance(agent, LocalInformation):
             raise TypeError("agent must be an instance of LocalInformation.")
-        node_queue = queue.Queue()
+        if cache is not None:
+            root_ids = set(n.id for n in self.roots)
+            self.root = root
+            self.roots.append(root)
+            supporting_structures = [agent.get_structure(root)]
+            for node in cache.closure(agent, root)[1:]:
+                if node.id not in root_ids:
+                    root_ids.add(node.id)
+                    self.roots.append(node)
+                    supporting_structures.append(agent.get_structure(node))
+            self.add_structures(supporting_structures)
+            return
         self.root = root
         self.roots.append(root)
-        node_queue.put(root)
-        while not node_queue.empty():
-            curr = node_queue.get()
+        # Ids of the roots already reached, so each supporting structure is only queued once
+        root_ids = set(n.id for n in self.roots)
+        node_queue = deque([root])
+        supporting_structures = []
+        while node_queue:
+            curr = node_queue.popleft()
             supporting_structure = agent.get_structure(curr)
-            self.add_structure(supporting_structure)
+            supporting_structures.append(supporting_structure)
 
             # Check if any nodes in the supporting structure are root nodes for other structures in the agent's information layer
             # If they are, add them to the Local Knowledge layer's roots and queue them for further expansion
             for node in supporting_structure.node_list:
-                if agent.is_root_node(node) and node.id not in [n.id for n in self.roots]:
+                if node.id not in root_ids and agent.is_root_node(node):
+                    root_ids.add(node.id)
                     self.roots.append(node)
-                    node_queue.put(node)
\ No newline at end of file
+                    node_queue.append(node)
+        # Merge every reached structure at once, in the order they were reached
+        self.add_structures(supporting_structures)
@@ -0,0 +1,152 @@
+"""
+Defines the PropagationEngine class used in the KI framework, which computes the values of unknown nodes of a LocalInformation
+layer from the aggregation functions attached to the roots of its structures.
+"""
+
+import numpy as np
+
+# Aggregations evaluated for a whole level at once with ufunc.reduceat. Each of them gives NaN if any input is NaN.
+AGGREGATIONS = {'sum': np.add, 'mean': np.add, 'prod': np.multiply, 'min': np.minimum, 'max': np.maximum}
+
+class PropagationEngine:
+    def __init__(self, local_info, aggregations:dict=None):
+        """
+        Compiles a LocalInformation layer and the aggregations attached to its roots into levels of integer arrays.
+        The value of a root with an aggregation is computed from the nodes adjacent to it in its structure, its inputs. An
+        input can itself be the root of another structure with an aggregation, so roots are levelized: a root is on the level
+        after the highest level of its inputs, and nodes that are not computed are on level 0.
+        Args:
+            local_info (LocalInformation): The layer to compile.
+            aggregations (dict): (Optional) Root id -> aggregation, defaults to local_info.aggregations. An aggregation is
+                either a name in AGGREGATIONS, or a callable given the input values of one root as an array of shape
+                (inputs, scenarios) and returning an array of shape (scenarios,).
+        Member variables:
+            - table (NodeTable): The nodes of the layer, values passed to evaluate are indexed by the rows of this table.
+            - instances (list[list[Node]]): Row -> every Node of the layer's structures with that id.
+            - level_of (np.ndarray[int32]): Row -> level of the node.
+            - levels (list[list[tuple]]): The batches of each level above 0, one per aggregation, as tuples of the
+              aggregation, the rows of the roots, the rows of their inputs in CSR order and the start of each root's inputs.
+        """
+        aggregations = local_info.aggregations if aggregations is None else aggregations
+        self.table = local_info.node_table()
+        self.instances = [[] for _ in range(len(self.table))]
+        for structure in local_info.structures.values():
+            for node in structure.node_list:
+                self.instances[self.table.index[node.id]].append(node)
+        inputs = {}
+        for root_id, aggregation in aggregations.items():
+            if root_id not in local_info.structures:
+                raise KeyError(f"No structure found for root node ID: {root_id}")
+            if not callable(aggregation) and aggregation not in AGGREGATIONS:
+                raise ValueError(f"Unknown aggregation: {aggregation}, must be callable or one of {list(AGGREGATIONS)}.")
+            neighbors = [node_id for node_id in local_info.structures[root_id].neighbors(root_id) if node_id != root_id]
+            # A root without inputs can not be computed
+            if neighbors:
+                inputs[self.table.index[root_id]] = self.table.rows(neighbors).tolist()
+
+        # Kahn's algorithm over the roots, a root is ready once all of its inputs that are computed have a level
+        self.level_of = np.zeros(len(self.table), dtype=np.int32)
+        waiting = {row: sum(1 for i in rows if i in inputs) for row, rows in inputs.items()}
+        dependents = {}
+        for row, rows in inputs.items():
+            for i in rows:
+                if i in inputs:
+                    dependents.setdefault(i, []).append(row)
+        ready = [row for row, count in waiting.items() if count == 0]
+        order = []
+        while ready:
+            row = ready.pop()
+            order.append(row)
+            self.level_of[row] = 1 + max(self.level_of[i] for i in inputs[row])
+            for dependent in dependents.get(row, ()):
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(inputs):
+            cycle = sorted(str(self.table.ids[row]) for row, count in waiting.items() if count > 0)
+            raise ValueError(f"The aggregations depend on each other in a cycle, through the roots: {cycle}")
+
+        batches = {}
+        for row in sorted(order):
+            aggregation = aggregations[self.table.ids[row]]
+            batches.setdefault((int(self.level_of[row]), aggregation), []).append(row)
+        self.levels = [[] for _ in range(int(self.level_of.max(initial=0)))]
+        for (level, aggregation), rows in batches.items():
+            counts = [len(inputs[row]) for row in rows]
+            starts = np.zeros(len(rows), dtype=np.int64)
+            np.cumsum(counts[:-1], out=starts[1:])
+            flat = np.array([i for row in rows for i in inputs[row]], dtype=np.int64)
+            self.levels[level - 1].append((aggregation, np.array(rows, dtype=np.int64), flat, starts))
+
+    def current_values(self):
+        """
+        Returns the values of the nodes of the table, NaN for unknown nodes. Every structure holds its own Node objects, so
+        a row takes the value of the first of its Nodes that is known, whichever structure it is in. Nodes marked known
+        without a value, like the nodes grow_global finds calculable, count as unknown.
+        Returns:
+            np.ndarray[float64]: Row -> value.
+        """
+        values = np.full(len(self.instances), np.nan)
+        for row, nodes in enumerate(self.instances):
+            for node in nodes:
+                if node.data_status and node.value is not None:
+                    values[row] = float(node.value)
+                    break
+        return values
+
+    def evaluate(self, values=None):
+        """
+        Computes every value that can be derived, level by level. Each level is evaluated in one NumPy operation per
+        aggregation, for all scenarios at once. Known values are never replaced, and a root is only computed in the
+        scenarios where all of its inputs are known or computed.
+        Args:
+            values (np.ndarray[float]): (Optional) Known values indexed by table row, NaN for unknown nodes, either of shape
+                (rows,) for a single scenario or (rows, scenarios). Defaults to current_values().
+        Returns:
+            np.ndarray[float64]: The values after propagation, in the shape of values.
+        """
+        values = self.current_values() if values is None else np.asarray(values, dtype=np.float64)
+        if values.ndim not in (1, 2) or values.shape[0] != len(self.table):
+            raise ValueError(f"values must have one row per node in the table ({len(self.table)}).")
+        out = values.reshape(len(self.table), -1).copy()
+        for level in self.levels:
+            for aggregation, rows, flat, starts in level:
+                gathered = out[flat]
+                if callable(aggregation):
+                    derived = np.empty((len(rows), out.shape[1]))
+                    ends = np.append(starts[1:], len(flat))
+                    for k in range(len(rows)):
+                        segment = gathered[starts[k]:ends[k]]
+                        derived[k] = np.asarray(aggregation(segment), dtype=np.float64).reshape(out.shape[1])
+                        derived[k, np.isnan(segment).any(axis=0)] = np.nan
+                else:
+                    derived = AGGREGATIONS[aggregation].reduceat(gathered, starts, axis=0)
+                    if aggregation == 'mean':
+                        derived /= np.diff(np.append(starts, len(flat)))[:, None]
+                current = out[rows]
+                out[rows] = np.where(np.isnan(current), derived, current)
+        return out.reshape(values.shape)
+
+    def write_back(self, values, structures):
+        """
+        Sets the values computed in a single scenario on the unknown Nodes of the given structures.
+        Args:
+            values (np.ndarray[float]): Values of shape (rows,), as returned by evaluate.
+            structures (iterable[InformationStructure]): The structures whose Nodes are updated.
+        Returns:
+            list: Ids of the nodes that were given a value, in row order.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape != (len(self.table),):
+            raise ValueError(f"values must have one entry per node in the table ({len(self.table)}).")
+        computed = self.level_of > 0
+        computed &= ~np.isnan(values)
+        computed &= np.isnan(self.current_values())
+        rows = np.flatnonzero(computed)
+        updates = {self.table.ids[row]: float(values[row]) for row in rows}
+        for structure in structures:
+            for node in structure.node_list:
+                if node.id in updates and node.value is None:
+                    node.value = updates[node.id]
+                    node.data_status = True
+        return [self.table.ids[row] for row in rows]
@@ -0,0 +1,241 @@
+"""
+Defines the drawing functions used by the draw() methods of every layer in the KI framework.
+matplotlib is only imported the first time something is drawn, so code that never draws does not pay for importing it.
+Node positions are cached per structure by a LayoutCache, so drawing a structure again only lays out the nodes added since.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import math
+import os
+import weakref
+import networkx as nx
+import numpy as np
+
+# Graphs with more nodes than this are laid out with a spectral layout instead of a spring layout
+SPRING_LIMIT = 500
+# Number of structures drawn on one page by draw_graphs and render_pages
+PER_PAGE = 12
+
+def _pyplot():
+    """
+    Imports and returns matplotlib.pyplot.
+    """
+    import matplotlib.pyplot as plt
+    return plt
+
+def layout(graph:nx.Graph, previous:dict=None, seed=0):
+    """
+    Computes the positions of the nodes of a graph. Nodes that already have a position in previous keep it, and only
+    the other nodes are laid out.
+    Small graphs use a spring layout. Larger graphs use a spectral layout (circular if scipy is missing) when nothing is
+    cached, and new nodes are placed next to their already placed neighbours, so the cost stays linear in the new nodes.
+    Args:
+        graph (nx.Graph): The graph to lay out.
+        previous (dict): (Optional) Node id -> position from an earlier layout of the graph.
+        seed (int): Seed of the spring layout.
+    Returns:
+        dict: Node id -> np.ndarray position, for every node of the graph.
+    """
+    pos = {n: p for n, p in (previous or {}).items() if n in graph}
+    new = [n for n in graph if n not in pos]
+    if len(new) == 0:
+        return pos
+    if len(graph) <= SPRING_LIMIT:
+        if len(pos) == 0:
+            return nx.spring_layout(graph, seed=seed)
+        return nx.spring_layout(graph, pos=pos, fixed=list(pos), seed=seed)
+    if len(pos) == 0:
+        try:
+            return nx.spectral_layout(graph)
+        except ImportError:
+            return nx.circular_layout(graph)
+    rng = np.random.default_rng(seed)
+    scale = 0.05 * max(np.ptp(np.array(list(pos.values())), axis=0).max(), 1e-3)
+    # Breadth-first from the placed nodes, so a chain of new nodes is placed one step at a time
+    pending = set(new)
+    frontier = [n for n in new if any(m in pos for m in graph.neighbors(n))]
+    while pending:
+        if len(frontier) == 0:
+            # A new component without any placed node starts at a random position
+            frontier = [next(iter(pending))]
+            pos[frontier[0]] = rng.uniform(-1, 1, 2)
+            pending.discard(frontier[0])
+        next_frontier = []
+        for n in frontier:
+            if n in pending:
+                placed = [pos[m] for m in graph.neighbors(n) if m in pos]
+                pos[n] = np.mean(placed, axis=0) + rng.normal(0, scale, 2)
+                pending.discard(n)
+            next_frontier.extend(m for m in graph.neighbors(n) if m in pending)
+        frontier = next_frontier
+    return pos
+
+class LayoutCache:
+    def __init__(self, max_roots=1024):
+        """
+        Initializes a cache of node positions, one layout per InformationStructure. A layout is reused as long as the version
+        of its structure does not change, and is the starting point of the next layout when it does, so only new nodes move.
+        Args:
+            max_roots (int): Maximum number of layouts kept by root id.
+        Member variables:
+            - entries (WeakKeyDictionary): InformationStructure -> (version, positions), dropped with the structure.
+            - by_root (OrderedDict): Root id -> positions of the last structure laid out with that root, so structures that
+              are built again, like the grown structures of GlobalInformation, start from the previous layout. Kept in LRU order.
+        """
+        self.max_roots = max_roots
+        self.entries = weakref.WeakKeyDictionary()
+        self.by_root = OrderedDict()
+
+    def positions(self, structure):
+        """
+        Returns the positions of the nodes of a structure, laying out only the nodes that are not cached.
+        Args:
+            structure (InformationStructure): The structure to lay out.
+        Returns:
+            dict: Node id -> position.
+        """
+        entry = self.entries.get(structure)
+        if entry is not None and entry[0] == structure.version:
+            return entry[1]
+        root_id = structure.root.id if structure.root is not None else None
+        previous = entry[1] if entry is not None else self.by_root.get(root_id)
+        pos = layout(structure.to_networkx(), previous)
+        self.entries[structure] = (structure.version, pos)
+        if root_id is not None:
+            self.by_root[root_id] = pos
+            self.by_root.move_to_end(root_id)
+            if len(self.by_root) > self.max_roots:
+                self.by_root.popitem(last=False)
+        return pos
+
+# Cache used by the draw() and render() methods of every layer
+layouts = LayoutCache()
+
+def _grid(count):
+    """
+    Returns the number of rows and columns of a grid of subplots that is about square.
+    """
+    cols = math.ceil(math.sqrt(count))
+    return math.ceil(count / cols), cols
+
+def _draw_page(figure, items, node_size):
+    """
+    Draws a page of (title, graph, positions) items on a figure, in a grid of subplots.
+    """
+    rows, cols = _grid(len(items))
+    for i, (title, graph, pos) in enumerate(items):
+        ax = figure.add_subplot(rows, cols, i + 1)
+        ax.set_title(title, fontsize=9)
+        # Labels are unreadable on large graphs and take most of the drawing time
+        labels = len(graph) <= SPRING_LIMIT
+        nx.draw(graph, pos=pos, ax=ax, with_labels=labels, node_size=node_size if labels else 10, font_size=8,
+                edge_color='gray')
+
+def _pages(items, per_page):
+    """
+    Splits a list of items into pages of at most per_page items.
+    """
+    return [items[start:start + per_page] for start in range(0, len(items), per_page)]
+
+def draw_graph(graph:nx.Graph, title:str, node_size=700, spring=False, pos=None):
+    """
+    Draws a single graph with labelled nodes in the current figure and shows it.
+    Args:
+        graph (nx.Graph): The graph to draw.
+        title (str): Title of the plot.
+        node_size (int): Size of the drawn nodes.
+        spring (bool): If True and pos is not given, nx.draw_spring is used instead of nx.draw.
+        pos (dict): (Optional) Node id -> position, for example from LayoutCache.positions.
+    """
+    plt = _pyplot()
+    plt.title(title)
+    if pos is not None:
+        nx.draw(graph, pos=pos, with_labels=True, node_size=node_size, font_size=10, edge_color='gray')
+    else:
+        draw = nx.draw_spring if spring else nx.draw
+        draw(graph, with_labels=True, node_size=node_size, font_size=10, edge_color='gray')
+    plt.show()
+
+def draw_graphs(graphs:dict, node_size=700, positions:dict=None, per_page=PER_PAGE):
+    """
+    Draws several graphs in a grid of subplots, at most per_page graphs per figure, and shows the figures.
+    Args:
+        graphs (dict): Root node id -> nx.Graph of the structure with that root.
+        node_size (int): Size of the drawn nodes.
+        positions (dict): (Optional) Root node id -> node positions of the graph, laid out with nx.spring_layout if missing.
+        per_page (int): Maximum number of graphs in one figure.
+    """
+    plt = _pyplot()
+    positions = {} if positions is None else positions
+    items = [(f"Information Structure with Root Node ID = {root_id}", graph,
+              positions[root_id] if root_id in positions else nx.spring_layout(graph, seed=0))
+             for root_id, graph in graphs.items()]
+    for page in _pages(items, per_page):
+        _draw_page(plt.figure(figsize=(10, 10)), page, node_size)
+    plt.show()
+
+def _use_agg():
+    """
+    Selects the non-interactive Agg backend, run in each rendering worker before anything is drawn.
+    """
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+def _render_page(path, items, node_size, dpi):
+    """
+    Draws a page of items on a Figure with its own Agg canvas and writes it to a file. The figure is not registered with
+    pyplot, so nothing is shown and it is freed with the page. networkx still imports pyplot to draw, so worker
+    processes select the Agg backend first (see _use_agg), and the process that renders without workers keeps its backend.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    rows, cols = _grid(len(items))
+    figure = Figure(figsize=(4 * cols, 4 * rows))
+    FigureCanvasAgg(figure)
+    _draw_page(figure, items, node_size)
+    figure.tight_layout()
+    figure.savefig(path, dpi=dpi)
+    return path
+
+def render_pages(items:list, directory, prefix='page', fmt='png', per_page=PER_PAGE, node_size=300, dpi=100,
+                 max_workers=None):
+    """
+    Writes (title, graph, positions) items to image files, at most per_page items per file, without showing anything.
+    Args:
+        items (list[tuple]): The title, nx.Graph and node positions of each graph.
+        directory (str): Directory to write the files to, created if missing.
+        prefix (str): Start of the file names, pages are named prefix_0000.fmt, prefix_0001.fmt, ...
+        fmt (str): 'png' or 'svg'.
+        per_page (int): Maximum number of graphs on one page.
+        node_size (int): Size of the drawn nodes.
+        dpi (int): Resolution of png files.
+        max_workers (int): (Optional) If given, the pages are rendered in a pool of this many processes.
+    Returns:
+        list[str]: The paths of the written files, in page order.
+    """
+    if fmt not in ('png', 'svg'):
+        raise ValueError(f"Unknown format: {fmt}, must be 'png' or 'svg'.")
+    os.makedirs(directory, exist_ok=True)
+    pages = _pages(list(items), per_page)
+    paths = [os.path.join(directory, f"{prefix}_{i:04d}.{fmt}") for i in range(len(pages))]
+    if max_workers is None:
+        return [_render_page(path, page, node_size, dpi) for path, page in zip(paths, pages)]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_use_agg) as pool:
+        futures = [pool.submit(_render_page, path, page, node_size, dpi) for path, page in zip(paths, pages)]
+        return [future.result() for future in futures]
+
+def render_structures(structures:dict, directory, title="Information Structure with Root Node ID = {}", **kwargs):
+    """
+    Writes the structures of a layer to image files with render_pages, using the cached layouts.
+    Args:
+        structures (dict): Root id -> InformationStructure.
+        directory (str): Directory to write the files to.
+        title (str): Title of each structure, formatted with its root id.
+        **kwargs: Passed to render_pages.
+    Returns:
+        list[str]: The paths of the written files, in page order.
+    """
+    items = [(title.format(root_id), structure.to_networkx(), layouts.positions(structure))
+             for root_id, structure in structures.items()]
+    return render_pages(items, directory, **kwargs)
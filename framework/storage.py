@@ -0,0 +1,358 @@
+"""
+Defines the binary on-disk format of the LocalInformation, LocalKnowledge and GlobalInformation layers.
+A saved layer is a directory holding a JSON header and one .npy file per array: an interned id table, the nodes of every
+structure with their values and status, and the edges of every structure, both in CSR form (offsets per structure).
+The arrays are opened with numpy.memmap, so opening a layer does no parsing and the pages can be shared read-only between
+worker processes. Node and InformationStructure objects are only built when a structure or the whole layer is loaded.
+"""
+
+import json
+import os
+import shutil
+import numpy as np
+from framework.data_types.information_structure import InformationStructure, Node
+from framework.local_information import LocalInformation
+from framework.local_knowledge import LocalKnowledge
+from framework.global_information import GlobalInformation
+
+FORMAT_VERSION = 1
+
+# Graph engine of each saved structure, as an index into this list, -1 for an agent saved without a structure
+BACKEND_NAMES = list(InformationStructure.BACKENDS)
+
+class _Writer:
+    # Arrays written one structure at a time, file name -> dtype
+    STRUCTURE_ARRAYS = {'roots': np.int32, 'backends': np.int8, 'node_offsets': np.int64, 'node_rows': np.int32,
+                        'node_values': np.float64, 'node_known': bool, 'edge_offsets': np.int64, 'edge_src': np.int32,
+                        'edge_dst': np.int32}
+
+    def __init__(self, path:str):
+        """
+        Writes the id table and structure arrays of a layer to a directory. Structure arrays are buffered in lists and
+        appended to raw files on flush, so a layer can be written in chunks with bounded memory.
+        Args:
+            path (str): The directory to write to, created if needed.
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.ids = []
+        self.index = {}
+        self.buffers = {name: [] for name in self.STRUCTURE_ARRAYS}
+        self.buffers['node_offsets'].append(0)
+        self.buffers['edge_offsets'].append(0)
+        self.counts = dict.fromkeys(self.STRUCTURE_ARRAYS, 0)
+        self.raw = {name: open(os.path.join(path, name + '.raw'), 'wb') for name in self.STRUCTURE_ARRAYS}
+        # Paths of the files written by close, removed again by discard
+        self.written = []
+
+    def row(self, node_id):
+        """
+        Returns the row of a node id in the id table, adding it on first use.
+        """
+        row = self.index.get(node_id)
+        if row is None:
+            row = len(self.ids)
+            self.index[node_id] = row
+            self.ids.append(node_id)
+        return row
+
+    def nodes(self, nodes):
+        """
+        Returns the rows, values and status of a list of nodes.
+        """
+        rows = [self.row(node.id) for node in nodes]
+        values = [np.nan if node.value is None else float(node.value) for node in nodes]
+        return rows, values, [bool(node.data_status) for node in nodes]
+
+    def add_structure(self, structure:InformationStructure):
+        """
+        Appends a structure to the structure arrays, None is stored as an empty structure.
+        """
+        buffers = self.buffers
+        if structure is not None:
+            rows, values, known = self.nodes(structure.node_list)
+            buffers['node_rows'] += rows
+            buffers['node_values'] += values
+            buffers['node_known'] += known
+            buffers['edge_src'] += [self.row(u) for u, _ in structure.edges]
+            buffers['edge_dst'] += [self.row(v) for _, v in structure.edges]
+        has_root = structure is not None and structure.root is not None
+        buffers['roots'].append(self.row(structure.root.id) if has_root else -1)
+        buffers['backends'].append(BACKEND_NAMES.index(structure.backend) if structure is not None else -1)
+        buffers['node_offsets'].append(self.counts['node_rows'] + len(buffers['node_rows']))
+        buffers['edge_offsets'].append(self.counts['edge_src'] + len(buffers['edge_src']))
+
+    def flush(self):
+        """
+        Appends the buffered structure arrays to their raw files and empties the buffers.
+        """
+        for name, dtype in self.STRUCTURE_ARRAYS.items():
+            self.raw[name].write(np.array(self.buffers[name], dtype=dtype).tobytes())
+            self.counts[name] += len(self.buffers[name])
+            self.buffers[name].clear()
+
+    def discard(self):
+        """
+        Closes and removes the raw files and every file already written by close, when the layer cannot be written.
+        """
+        for name, raw in self.raw.items():
+            raw.close()
+            self.written.append(os.path.join(self.path, name + '.raw'))
+        for path in self.written:
+            if os.path.exists(path):
+                os.remove(path)
+        self.written = []
+
+    def id_arrays(self):
+        """
+        Returns the arrays of the id table, by file name.
+        """
+        if all(isinstance(node_id, (int, np.integer)) and not isinstance(node_id, bool) for node_id in self.ids):
+            return {'ids': np.array(self.ids, dtype=np.int64)}
+        if all(isinstance(node_id, str) for node_id in self.ids):
+            # Strings are stored as one UTF-8 buffer with the byte offset of each id
+            encoded = [node_id.encode('utf-8') for node_id in self.ids]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+            return {'id_bytes': np.frombuffer(b''.join(encoded), dtype=np.uint8), 'id_offsets': offsets}
+        raise TypeError("Node ids must be all integers or all strings to be saved.")
+
+    def close(self, header:dict, extra:dict=None):
+        """
+        Writes the structure arrays as .npy files, then the id table, the extra arrays and the header.
+        Args:
+            header (dict): Header entries of the layer, such as its kind.
+            extra (dict): (Optional) File name -> array, for the arrays specific to the kind of layer.
+        """
+        self.flush()
+        for name, dtype in self.STRUCTURE_ARRAYS.items():
+            self.raw[name].close()
+            raw_path = os.path.join(self.path, name + '.raw')
+            self.written.append(os.path.join(self.path, name + '.npy'))
+            with open(self.written[-1], 'wb') as f, open(raw_path, 'rb') as raw:
+                shape = (self.counts[name],)
+                np.lib.format.write_array_header_1_0(f, {'descr': np.dtype(dtype).str, 'fortran_order': False, 'shape': shape})
+                shutil.copyfileobj(raw, f)
+            os.remove(raw_path)
+        arrays = self.id_arrays()
+        arrays.update(extra or {})
+        for name, array in arrays.items():
+            self.written.append(os.path.join(self.path, name + '.npy'))
+            np.save(self.written[-1], array)
+        header = dict(header, format=FORMAT_VERSION, arrays=list(self.STRUCTURE_ARRAYS) + list(arrays))
+        self.written.append(os.path.join(self.path, 'header.json'))
+        with open(self.written[-1], 'w') as f:
+            json.dump(header, f)
+
+def save(layer, path:str):
+    """
+    Saves a LocalInformation, LocalKnowledge or GlobalInformation layer to a directory, which is created if needed.
+    A GlobalInformation layer is saved with its init nodes, agents, grown structures and visited init nodes.
+    Args:
+        layer: The layer to save.
+        path (str): The directory to write to.
+    """
+    if not isinstance(layer, (LocalInformation, LocalKnowledge, GlobalInformation)):
+        raise TypeError("layer must be an instance of LocalInformation, LocalKnowledge or GlobalInformation.")
+    writer = _Writer(path)
+    header = {'kind': type(layer).__name__}
+    extra = {}
+    try:
+        if isinstance(layer, LocalInformation):
+            for structure in layer.structures.values():
+                writer.add_structure(structure)
+        elif isinstance(layer, LocalKnowledge):
+            writer.add_structure(layer.structure)
+            extra['agent_roots'] = np.array([writer.row(layer.root.id) if layer.root is not None else -1], dtype=np.int32)
+            extra['knowledge_roots'] = np.array([writer.row(node.id) for node in layer.roots], dtype=np.int32)
+        else:
+            rows, values, known = writer.nodes(layer.init_nodes)
+            extra['init_rows'] = np.array(rows, dtype=np.int32)
+            extra['init_values'] = np.array(values, dtype=np.float64)
+            extra['init_known'] = np.array(known, dtype=bool)
+            extra['visited'] = np.asarray(layer.visited, dtype=bool)
+            # Agents come first in the structure arrays, followed by the grown structures
+            rows, values, known = writer.nodes([agent.root for agent in layer.agent_list])
+            extra['agent_roots'] = np.array(rows, dtype=np.int32)
+            extra['agent_root_values'] = np.array(values, dtype=np.float64)
+            extra['agent_root_known'] = np.array(known, dtype=bool)
+            for agent in layer.agent_list:
+                writer.add_structure(agent.structure)
+            header['agents'] = len(layer.agent_list)
+            for structure in layer.structures.values():
+                writer.add_structure(structure)
+        writer.close(header, extra)
+    except BaseException:
+        # No open handles or partial files are left behind
+        writer.discard()
+        raise
+
+def save_structures(structures, path:str, chunk_size:int=1000):
+    """
+    Saves an iterable of InformationStructures as a LocalInformation layer, without holding more than chunk_size
+    structures' arrays in memory. The structures are not kept, so the iterable can be a generator over a large input.
+    Args:
+        structures (iterable[InformationStructure]): The structures of the layer, each with a distinct root.
+        path (str): The directory to write to.
+        chunk_size (int): Number of structures buffered between writes.
+    Returns:
+        LayerFile: The saved layer, memory mapped.
+    """
+    writer = _Writer(path)
+    root_ids = set()
+    try:
+        for k, structure in enumerate(structures):
+            if not isinstance(structure, InformationStructure):
+                raise TypeError("All elements in structures must be of type InformationStructure.")
+            root_id = structure.get_root_node().id
+            if root_id in root_ids:
+                raise ValueError(f"Duplicate root node ID found: {root_id}")
+            root_ids.add(root_id)
+            writer.add_structure(structure)
+            if (k + 1) % chunk_size == 0:
+                writer.flush()
+        writer.close({'kind': 'LocalInformation'})
+    except BaseException:
+        writer.discard()
+        raise
+    return LayerFile(path)
+
+class LayerFile:
+    def __init__(self, path:str, mmap:bool=True):
+        """
+        Opens a layer saved with save. The arrays are memory mapped read-only, nothing is parsed until a structure is loaded.
+        A LayerFile can be sent to worker processes, only its path is pickled and each process maps the same files.
+        Args:
+            path (str): The directory the layer was saved to.
+            mmap (bool): If False, the arrays are read into memory instead of being memory mapped.
+        Member variables:
+            - kind (str): The type of the saved layer.
+            - arrays (dict): File name -> read-only array.
+        """
+        self.path = path
+        self.mmap = mmap
+        with open(os.path.join(path, 'header.json')) as f:
+            self.header = json.load(f)
+        if self.header.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported layer format: {self.header.get('format')}, expected {FORMAT_VERSION}.")
+        self.kind = self.header['kind']
+        self.arrays = {}
+        for name in self.header['arrays']:
+            self.arrays[name] = np.load(os.path.join(path, name + '.npy'), mmap_mode='r' if mmap else None)
+        self._ids = None
+
+    def __getstate__(self):
+        return {'path': self.path, 'mmap': self.mmap}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['mmap'])
+
+    def __len__(self):
+        """
+        Returns the number of structures in the file.
+        """
+        return len(self.arrays['roots'])
+
+    @property
+    def ids(self):
+        """
+        Returns the id table as a list, decoded on first use.
+        """
+        if self._ids is None:
+            if 'ids' in self.arrays:
+                self._ids = self.arrays['ids'].tolist()
+            else:
+                data = self.arrays['id_bytes'].tobytes()
+                offsets = self.arrays['id_offsets'].tolist()
+                self._ids = [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        return self._ids
+
+    def _nodes(self, rows, values, known):
+        """
+        Builds one Node per row.
+        """
+        ids = self.ids
+        nodes = []
+        for row, value, status in zip(rows.tolist(), values.tolist(), known.tolist()):
+            node = Node(ids[row], None if np.isnan(value) else value)
+            node.data_status = status
+            nodes.append(node)
+        return nodes
+
+    def _agent_node(self, structure, row):
+        """
+        Returns the Node of an agent's structure with the id of a row, or a new Node if the structure does not contain it.
+        """
+        node_id = self.ids[row]
+        if structure is not None and node_id in structure.nodes:
+            return structure.get_node(node_id)
+        return Node(node_id)
+
+    def structure(self, k:int):
+        """
+        Builds the k-th structure of the file.
+        Args:
+            k (int): Position of the structure, agents of a GlobalInformation layer come before its grown structures.
+        Returns:
+            InformationStructure: The structure, None if an agent was saved without one.
+        """
+        if not 0 <= k < len(self):
+            raise IndexError(f"Structure {k} is out of range, the file has {len(self)} structures.")
+        backend = int(self.arrays['backends'][k])
+        if backend < 0:
+            return None
+        a = self.arrays
+        start, end = a['node_offsets'][k], a['node_offsets'][k + 1]
+        nodes = self._nodes(a['node_rows'][start:end], a['node_values'][start:end], a['node_known'][start:end])
+        start, end = a['edge_offsets'][k], a['edge_offsets'][k + 1]
+        ids = self.ids
+        edges = [(ids[u], ids[v]) for u, v in zip(a['edge_src'][start:end].tolist(), a['edge_dst'][start:end].tolist())]
+        structure = InformationStructure(node_list=nodes, edges=edges, backend=BACKEND_NAMES[backend])
+        root_row = int(a['roots'][k])
+        if root_row >= 0:
+            structure.root = structure.get_node(ids[root_row])
+        return structure
+
+    def load(self):
+        """
+        Builds the saved layer.
+        Returns:
+            LocalInformation, LocalKnowledge or GlobalInformation: The layer, with new Node objects.
+        """
+        a = self.arrays
+        if self.kind == 'LocalInformation':
+            return LocalInformation(structure_list=[self.structure(k) for k in range(len(self))])
+        if self.kind == 'LocalKnowledge':
+            structure = self.structure(0)
+            root_row = int(a['agent_roots'][0])
+            agent = LocalKnowledge(structure=structure, root=self._agent_node(structure, root_row) if root_row >= 0 else None)
+            agent.roots = [self._agent_node(structure, row) for row in a['knowledge_roots'].tolist()]
+            return agent
+        num_agents = self.header['agents']
+        init_nodes = self._nodes(a['init_rows'], a['init_values'], a['init_known'])
+        roots = self._nodes(a['agent_roots'], a['agent_root_values'], a['agent_root_known'])
+        agents = []
+        for k in range(num_agents):
+            structure = self.structure(k)
+            root = roots[k]
+            if structure is not None and structure.root is not None and structure.root.id == root.id:
+                # An agent's root is normally the root Node of its structure
+                root = structure.root
+            agents.append(LocalKnowledge(structure=structure, root=root))
+        global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agents)
+        for k in range(num_agents, len(self)):
+            structure = self.structure(k)
+            global_info.structures[structure.root.id] = structure
+        global_info.visited = np.array(a['visited'], dtype=bool)
+        return global_info
+
+def load(path:str, mmap:bool=True):
+    """
+    Loads a layer saved with save.
+    Args:
+        path (str): The directory the layer was saved to.
+        mmap (bool): If False, the arrays are read into memory instead of being memory mapped.
+    Returns:
+        LocalInformation, LocalKnowledge or GlobalInformation: The saved layer.
+    """
+    return LayerFile(path, mmap=mmap).load()
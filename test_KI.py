@@ -1,8 +1,16 @@
-from framework.global_information import GlobalInformation
+from framework.global_information import GlobalInformation, DesignChange
 from framework.global_knowledge import GlobalKnowledge
 from framework.local_information import LocalInformation
-from framework.local_knowledge import LocalKnowledge
+from framework.local_knowledge import LocalKnowledge, ExpansionCache
 from framework.data_types.information_structure import InformationStructure, Node
+from framework import storage, ingest, rendering
+from benchmarks import suite
+import math
+import os
+import pickle
+import json
+import random
+import tempfile
 import networkx as nx
 import matplotlib.pyplot as plt
 import numpy as np
@@ -101,6 +109,10 @@ def test_local_knowledge():
         local_knowledge = LocalKnowledge()
         root = Node(id='A', value=1) # Initial root node for expansion
         local_knowledge.expand(agent=local_info, root=root)
+        assert [n.id for n in local_knowledge.roots] == ['A', 'B', 'D', 'F']
+        assert local_knowledge.structure.node_id_list == ['A', 'B', 'C', 'D', 'H', 'I', 'E', 'F', 'J', 'K']
+        # The structures of the information layer are not changed by the expansion
+        assert info1.node_id_list == ['A', 'B', 'C', 'D']
         local_knowledge.draw()
 
     test_basic()
@@ -218,6 +230,693 @@ def test_global_knowledge():
     global_knowledge.add_edges(global_info=global_info)
     global_knowledge.draw()
 
+def example_agents():
+    """
+    Builds the init nodes and agents of the three agent example used in test_global_information.
+    Returns:
+        tuple(list[Node], list[LocalKnowledge]): The init nodes and agents.
+    """
+    nodes1 = [Node('T1'), Node('a'), Node('b', value=1), Node('d'), Node('T2')]
+    nodes2 = [Node('T2'), Node('a'), Node('b', value=1), Node('c', value=1), Node('d'), Node('e'), Node('g'), Node('TK', value=1)]
+    nodes3 = [Node('TN', value=1), Node('d'), Node('c')]
+    edges1 = [('T1', 'a'), ('a', 'b'), ('a', 'd'), ('b', 'd'), ('d', 'T2')]
+    edges2 = [('T2', 'a'), ('a', 'b'), ('a', 'd'), ('b', 'c'), ('d', 'e'), ('e', 'g'), ('g', 'TK')]
+    edges3 = [('TN', 'd'), ('d', 'c')]
+    info1 = InformationStructure(node_list=nodes1, edges=edges1, root=nodes1[0])
+    info2 = InformationStructure(node_list=nodes2, edges=edges2, root=nodes2[0])
+    info3 = InformationStructure(node_list=nodes3, edges=edges3, root=nodes3[0])
+    init_nodes = [Node('T1'), Node('TK', value=1), Node('TN')]
+    agent_list = [LocalKnowledge(structure=info, root=info.root) for info in [info1, info2, info3]]
+    return init_nodes, agent_list
+
+def conflicting_agents(seed, num_ids=8):
+    """
+    Builds a random design without cycles where the same id appears in several agents, known in some and unknown in others.
+    Agent N<i> only pushes ids N<j> with j > i, and 'x' is an id that is never a root.
+    Args:
+        seed (int): Seed of the design, the same seed always builds the same design from new Node objects.
+        num_ids (int): Number of root ids.
+    Returns:
+        tuple(list[Node], list[LocalKnowledge]): The init nodes and agents.
+    """
+    rng = random.Random(seed)
+    agent_list = []
+    for i in range(num_ids):
+        if rng.random() < 0.2:
+            continue
+        children = [f'N{j}' if j < num_ids else 'x' for j in range(i + 1, num_ids + 1) if rng.random() < 0.35]
+        nodes = [Node(f'N{i}', value=1 if rng.random() < 0.1 else None)]
+        nodes += [Node(node_id, value=1 if rng.random() < 0.3 else None) for node_id in children]
+        info = InformationStructure(node_list=nodes, edges=[(nodes[0].id, node.id) for node in nodes[1:]], root=nodes[0])
+        agent_list.append(LocalKnowledge(structure=info, root=info.root))
+    roots = set(agent.root.id for agent in agent_list)
+    init_ids = [f'N{i}' for i in rng.sample(range(num_ids), 3) if f'N{i}' in roots]
+    init_nodes = [Node(node_id, value=1 if rng.random() < 0.2 else None) for node_id in init_ids]
+    return init_nodes, agent_list
+
+def grown(structures):
+    """
+    Returns the node ids and edges of each structure of a dict of root id -> InformationStructure, for comparisons.
+    """
+    return {root_id: (structure.node_id_list, structure.edges) for root_id, structure in structures.items()}
+
+def test_grow_global_result():
+    """
+    Checks the structures grown from the three agent example, and the visited bookkeeping of the growth.
+    """
+    print("Testing grow_global result")
+    init_nodes, agent_list = example_agents()
+    global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agent_list)
+    global_info.grow_global()
+    assert list(global_info.structures) == ['T1', 'TN']
+    assert global_info.structures['T1'].node_id_list == ['T1', 'T2', 'TK']
+    assert sorted(global_info.structures['T1'].edges) == [('T2', 'T1'), ('TK', 'T2')]
+    assert global_info.structures['TN'].node_id_list == ['TN']
+    assert global_info.all_visited()
+    assert global_info.is_visited(Node('TK'))
+    assert global_info.get_node() is None
+
+def test_agent_index():
+    """
+    Checks the root id and node id indexes of GlobalInformation as agents are added, changed and removed.
+    """
+    print("Testing GlobalInformation agent indexes")
+    init_nodes, agent_list = example_agents()
+    agent1, agent2, agent3 = agent_list
+    global_info = GlobalInformation(init_nodes=init_nodes, agent_list=list(agent_list))
+    assert global_info.find_agent(Node('T2')) is agent2
+    assert global_info.find_agent(Node('a')) is None
+    assert global_info.agents_containing(Node('d')) == [agent1, agent2, agent3]
+
+    # A new agent with the same root does not replace the first one until it is removed
+    duplicate = LocalKnowledge(structure=InformationStructure(node_list=[Node('T2'), Node('x')], edges=[('T2', 'x')], root=Node('T2')), root=Node('T2'))
+    global_info.add_agent(duplicate)
+    assert global_info.find_agent(Node('T2')) is agent2
+    global_info.remove_agent(agent2)
+    assert global_info.find_agent(Node('T2')) is duplicate
+    assert global_info.agents_containing(Node('TK')) == []
+
+    # Changing an agent's structure is picked up after refresh_agent
+    agent3.add_structure(InformationStructure(node_list=[Node('c'), Node('q')], edges=[('c', 'q')], root=Node('c')))
+    global_info.refresh_agent(agent3)
+    assert global_info.agents_containing(Node('q')) == [agent3]
+    assert global_info.find_agent(Node('TN')) is agent3
+    assert 'T2' in global_info.root_ids
+
+def test_simulate_growth():
+    """
+    Checks that simulate_growth grows the same structures as grow_global without changing any Node.
+    """
+    print("Testing simulate_growth")
+    init_nodes, agent_list = example_agents()
+    global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agent_list)
+    status_before = [node.data_status for agent in agent_list for node in agent.structure.node_list]
+    first = global_info.simulate_growth()
+    second = global_info.simulate_growth()
+    assert status_before == [node.data_status for agent in agent_list for node in agent.structure.node_list]
+    assert global_info.structures == {} and not global_info.visited.any()
+    assert list(first.structures) == ['T1', 'TN']
+    assert first.structures['T1'].node_id_list == ['T1', 'T2', 'TK']
+    assert sorted(first.structures['T1'].edges) == [('T2', 'T1'), ('TK', 'T2')]
+    assert first.roots == second.roots and first.edges == second.edges
+    assert first.is_known(Node('T1')) and not global_info.compile().known[0]
+
+    # With TN unknown and T2 known, TN grows through agent 3 and T1 stops at T2
+    scenario = global_info.simulate_growth(known=['TK', 'T2'])
+    assert scenario.structures['T1'].node_id_list == ['T1', 'T2']
+    assert scenario.structures['TK'].node_id_list == ['TK']
+
+    global_info.grow_global()
+    for root_id, structure in global_info.structures.items():
+        assert structure.node_id_list == first.structures[root_id].node_id_list
+        assert structure.edges == first.structures[root_id].edges
+
+    # Each Node has its own status, so the known B of agent D does not stop the growth through the unknown B of agent A
+    names = {'A': ['B'], 'B': ['C'], 'C': ['x'], 'D': ['B']}
+    values = {('C', 'x'): 1, ('D', 'B'): 7}
+    agent_list = [LocalKnowledge(structure=InformationStructure(
+        node_list=[Node(root_id)] + [Node(node_id, value=values.get((root_id, node_id))) for node_id in children],
+        edges=[(root_id, node_id) for node_id in children], root=Node(root_id)), root=Node(root_id))
+        for root_id, children in names.items()]
+    global_info = GlobalInformation(init_nodes=[Node('A')], agent_list=agent_list)
+    expected = {'A': (['A', 'B', 'C'], [('C', 'B'), ('B', 'A')])}
+    assert grown(global_info.simulate_growth().structures) == expected
+    global_info.grow_global()
+    assert grown(global_info.structures) == expected
+
+    # simulate_growth is grow_global without changing any Node, on designs where the same id is known in some agents only
+    for seed in range(50):
+        global_info = GlobalInformation(*conflicting_agents(seed))
+        simulated = grown(global_info.simulate_growth().structures)
+        global_info.grow_global()
+        assert simulated == grown(global_info.structures)
+
+def test_grow_global_parallel():
+    """
+    Checks that parallel growth gives the same structures, in the same order, as sequential growth.
+    """
+    print("Testing parallel grow_global")
+    sequential = GlobalInformation(*example_agents())
+    assert sequential.compile().work_units() == [[0, 1], [2]]
+    sequential.grow_global()
+    expected = sequential
+    init_nodes, agent_list = example_agents()
+
+    # A second copy of the example with disjoint ids adds two more independent work units
+    other_nodes, other_agents = example_agents()
+    for agent in other_agents:
+        for node in agent.structure.node_list:
+            node.id = node.id + '_2'
+        agent.structure = InformationStructure(node_list=agent.structure.node_list,
+                                               edges=[(u + '_2', v + '_2') for u, v in agent.structure.edges],
+                                               root=agent.structure.root)
+    for node in other_nodes:
+        node.id = node.id + '_2'
+    parallel = GlobalInformation(init_nodes=init_nodes + other_nodes, agent_list=agent_list + other_agents)
+    assert len(parallel.compile().work_units()) == 4
+    parallel.grow_global(max_workers=2)
+    assert list(parallel.structures) == ['T1', 'TN', 'T1_2', 'TN_2']
+    assert parallel.all_visited()
+    for root_id, structure in expected.structures.items():
+        assert parallel.structures[root_id].node_id_list == structure.node_id_list
+        assert parallel.structures[root_id + '_2'].edges == [(u + '_2', v + '_2') for u, v in structure.edges]
+
+    # Designs where the same id is known in some agents only
+    for seed in range(8):
+        sequential = GlobalInformation(*conflicting_agents(seed))
+        sequential.grow_global()
+        parallel = GlobalInformation(*conflicting_agents(seed))
+        parallel.grow_global(max_workers=2)
+        assert grown(parallel.structures) == grown(sequential.structures)
+
+def test_knowledge_connections():
+    """
+    Checks the connections and edges of the GlobalKnowledge layer built from the three agent example.
+    """
+    print("Testing GlobalKnowledge connections")
+    init_nodes, agent_list = example_agents()
+    global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agent_list)
+    global_info.grow_global()
+    index = global_info.structure_index()
+    assert index == {'T1': ['T1'], 'T2': ['T1'], 'TK': ['T1'], 'TN': ['TN']}
+    # The index is cached until the layer or one of its structures changes
+    assert global_info.structure_index() is index
+    global_info.structures['TN'].add_node(Node('x'), edge=('TN', 'x'))
+    assert global_info.structure_index()['x'] == ['TN']
+    global_info.structures['TN'].remove_node(Node('x'))
+    assert 'x' not in global_info.structure_index()
+
+    global_knowledge = GlobalKnowledge(init_nodes=init_nodes)
+    assert [n.id for n in global_knowledge.find_connections(Node('T1'), global_info)] == ['TK']
+    assert global_knowledge.find_connections(Node('TN'), global_info) == []
+    assert global_knowledge.find_connections(Node('x'), global_info) == []
+    global_knowledge.add_edges(global_info=global_info)
+    assert global_knowledge.structure.edges == [('T1', 'TK')]
+
+    vectorized = GlobalKnowledge(init_nodes=init_nodes)
+    assert vectorized.project_edges(global_info) == [('T1', 'TK')]
+    vectorized.add_edges(global_info=global_info, vectorized=True)
+    assert vectorized.structure.edge_set == global_knowledge.structure.edge_set
+
+def test_expansion_cache():
+    """
+    Checks that expansions sharing an ExpansionCache reuse each other's closures and give the same structures.
+    """
+    print("Testing LocalKnowledge expansion cache")
+    nodes1 = [Node(id='A', value=1), Node(id='B', value=2), Node(id='C', value=3), Node(id='D', value=4)]
+    nodes2 = [Node(id='D', value=4), Node(id='E', value=5), Node(id='F', value=6)]
+    nodes3 = [Node(id='B', value=2), Node(id='H', value=7), Node(id='I', value=8)]
+    nodes4 = [Node(id='F', value=6), Node(id='J', value=9), Node(id='K', value=10)]
+    info1 = InformationStructure(node_list=nodes1, edges=[('A', 'B'), ('A', 'C'), ('A', 'D')], root=nodes1[0])
+    info2 = InformationStructure(node_list=nodes2, edges=[('D', 'E'), ('D', 'F')], root=nodes2[0])
+    info3 = InformationStructure(node_list=nodes3, edges=[('B', 'H'), ('B', 'I')], root=nodes3[0])
+    info4 = InformationStructure(node_list=nodes4, edges=[('F', 'J'), ('F', 'K')], root=nodes4[0])
+    local_info = LocalInformation(structure_list=[info1, info2, info3])
+
+    cache = ExpansionCache(max_entries=2)
+    sub_agent = LocalKnowledge()
+    sub_agent.expand(agent=local_info, root=Node('D'), cache=cache)
+    agent = LocalKnowledge()
+    agent.expand(agent=local_info, root=Node('A'), cache=cache)
+    uncached = LocalKnowledge()
+    uncached.expand(agent=local_info, root=Node('A'))
+    assert cache.hits == 1 and list(cache.entries) == [(local_info.version, 'D'), (local_info.version, 'A')]
+    assert set(agent.structure.node_id_list) == set(uncached.structure.node_id_list)
+    assert agent.structure.edge_set == uncached.structure.edge_set
+    assert sorted(n.id for n in agent.roots) == ['A', 'B', 'D']
+
+    # Adding a structure changes the version of the layer, so the old closures are no longer used
+    local_info.add_structure(info4)
+    grown = LocalKnowledge()
+    grown.expand(agent=local_info, root=Node('A'), cache=cache)
+    assert 'K' in grown.structure.node_id_list
+    assert len(cache.entries) == 2 and (local_info.version, 'A') in cache.entries
+
+    # A closure reused inside other expansions is promoted on each reuse, so it outlives closures used less recently
+    cache = ExpansionCache(max_entries=2)
+    LocalKnowledge().expand(agent=local_info, root=Node('F'), cache=cache)
+    LocalKnowledge().expand(agent=local_info, root=Node('B'), cache=cache)
+    LocalKnowledge().expand(agent=local_info, root=Node('D'), cache=cache)
+    assert list(cache.entries) == [(local_info.version, 'F'), (local_info.version, 'D')]
+
+def test_apply_change():
+    """
+    Checks that applying design changes one at a time gives the same structures and knowledge edges as growing the changed
+    layer from scratch.
+    """
+    print("Testing incremental design changes")
+    init_nodes, agent_list = example_agents()
+    agent1, agent2, agent3 = agent_list
+    global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agent_list)
+    global_knowledge = GlobalKnowledge(init_nodes=init_nodes)
+    changes = [
+        # Ids the layer has never seen before
+        DesignChange(DesignChange.NODE_ADDED, agent=agent3, node=Node('new', value=1), edge=('TN', 'new')),
+        DesignChange(DesignChange.VALUE_KNOWN, node=Node('other'), value=2),
+        DesignChange(DesignChange.NODE_ADDED, agent=agent3, node=Node('T1'), edge=('TN', 'T1')),
+        DesignChange(DesignChange.VALUE_KNOWN, node=init_nodes[0], value=3),
+        DesignChange(DesignChange.NODE_REMOVED, agent=agent1, node=Node('T2')),
+        DesignChange(DesignChange.EDGE_ADDED, agent=agent2, edge=('a', 'e')),
+    ]
+    for change in changes:
+        affected = global_info.apply_change(change, knowledge=global_knowledge)
+        expected = GlobalInformation(init_nodes=init_nodes, agent_list=agent_list)
+        expected.structures = dict(expected.simulate_growth().structures)
+        expected_knowledge = GlobalKnowledge(init_nodes=init_nodes)
+        expected_knowledge.add_edges(global_info=expected)
+        assert list(global_info.structures) == list(expected.structures)
+        for root_id, structure in expected.structures.items():
+            assert global_info.structures[root_id].node_id_list == structure.node_id_list
+            assert global_info.structures[root_id].edge_set == structure.edge_set
+        assert global_knowledge.structure.edge_set == expected_knowledge.structure.edge_set
+        assert (change.kind == DesignChange.EDGE_ADDED) == (len(affected) == 0)
+    assert agent2.structure.contains_edge(('e', 'a')) and not agent1.structure.contains_node(Node('T2'))
+
+def test_layer_snapshots():
+    """
+    Checks snapshots and diffs of the LocalInformation and GlobalInformation layers as their structures change.
+    """
+    print("Testing layer snapshots")
+    nodes1 = [Node(id='A', value=1), Node(id='B', value=2), Node(id='C', value=3)]
+    nodes2 = [Node(id='B', value=2), Node(id='H', value=7)]
+    info1 = InformationStructure(node_list=nodes1, edges=[('A', 'B'), ('A', 'C')], root=nodes1[0])
+    info2 = InformationStructure(node_list=nodes2, edges=[('B', 'H')], root=nodes2[0])
+    local_info = LocalInformation(structure_list=[info1])
+    snapshot = local_info.snapshot()
+    assert local_info.diff(snapshot) == {}
+    info1.add_node(Node(id='D'), ('C', 'D'))
+    local_info.add_structure(info2)
+    changes = local_info.diff(snapshot)
+    assert list(changes) == ['A', 'B']
+    assert changes['A']['nodes_added'] == {'D'} and changes['A']['edges_added'] == {frozenset(('C', 'D'))}
+    assert changes['B']['nodes_added'] == {'B', 'H'} and changes['B']['nodes_removed'] == set()
+
+    # Structures kept by apply_change keep their logs, regrown ones are compared by content
+    init_nodes, agent_list = example_agents()
+    global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agent_list)
+    global_info.apply_change(DesignChange(DesignChange.EDGE_ADDED, agent=agent_list[1], edge=('a', 'e')))
+    before = global_info.snapshot()
+    global_info.apply_change(DesignChange(DesignChange.NODE_ADDED, agent=agent_list[2], node=Node('T2'), edge=('TN', 'T2')))
+    changes = global_info.diff(before)
+    # The init node TN is unknown, so it grows through the added T2 as grow_global does
+    assert list(changes) == ['TN'] and changes['TN']['nodes_added'] == {'T2', 'TK'}
+
+def test_storage():
+    """
+    Checks that layers saved to disk load back with the same structures, values and status.
+    """
+    print("Testing layer storage")
+    nodes1 = [Node(id='A', value=1), Node(id='B', value=2), Node(id='C')]
+    nodes2 = [Node(id='B', value=2), Node(id='H', value=7.5)]
+    info1 = InformationStructure(node_list=nodes1, edges=[('A', 'B'), ('A', 'C')], root=nodes1[0])
+    info2 = InformationStructure(node_list=nodes2, edges=[('B', 'H')], root=nodes2[0], backend='compact')
+    local_info = LocalInformation(structure_list=[info1, info2])
+    agent = LocalKnowledge()
+    agent.expand(agent=local_info, root=Node('A'))
+    init_nodes, agent_list = example_agents()
+    global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agent_list)
+    global_info.grow_global()
+
+    with tempfile.TemporaryDirectory() as path:
+        storage.save(local_info, os.path.join(path, 'local_info'))
+        layer_file = storage.LayerFile(os.path.join(path, 'local_info'))
+        assert isinstance(layer_file.arrays['node_rows'], np.memmap) and len(layer_file) == 2
+        loaded = layer_file.load()
+        assert list(loaded.structures) == ['A', 'B'] and loaded.structures['B'].backend == 'compact'
+        for root_id, structure in local_info.structures.items():
+            assert loaded.structures[root_id].node_id_list == structure.node_id_list
+            assert loaded.structures[root_id].edges == structure.edges
+            assert [n.value for n in loaded.structures[root_id].node_list] == [n.value for n in structure.node_list]
+        assert not loaded.structures['A'].get_node('C').data_status
+        # Only the path is pickled, the copy maps the same files
+        assert pickle.loads(pickle.dumps(layer_file)).structure(1).edges == [('B', 'H')]
+
+        storage.save(agent, os.path.join(path, 'agent'))
+        loaded = storage.load(os.path.join(path, 'agent'))
+        assert loaded.root.id == 'A' and sorted(n.id for n in loaded.roots) == ['A', 'B']
+        assert loaded.structure.edge_set == agent.structure.edge_set
+
+        storage.save(global_info, os.path.join(path, 'global_info'))
+        loaded = storage.load(os.path.join(path, 'global_info'), mmap=False)
+        assert loaded.init_nodes_ids == ['T1', 'TK', 'TN'] and [n.data_status for n in loaded.init_nodes] == [n.data_status for n in init_nodes]
+        assert loaded.all_visited() and list(loaded.structures) == ['T1', 'TN']
+        assert loaded.structures['T1'].edges == global_info.structures['T1'].edges
+        assert loaded.find_agent(Node('T2')).structure.node_id_list == agent_list[1].structure.node_id_list
+        assert loaded.find_agent(Node('T2')).root is loaded.find_agent(Node('T2')).structure.root
+
+        # A layer that can not be saved leaves no files behind
+        mixed = LocalInformation(structure_list=[InformationStructure(node_list=[Node(1), Node('b')], edges=[(1, 'b')],
+                                                                      root=Node(1))])
+        try:
+            storage.save(mixed, os.path.join(path, 'mixed'))
+            assert False, "Mixed id types can not be saved"
+        except TypeError:
+            pass
+        assert os.listdir(os.path.join(path, 'mixed')) == []
+
+def test_ingest():
+    """
+    Checks that streamed records build the same layer in memory and on disk, and that duplicate roots are rejected.
+    """
+    print("Testing streaming ingest")
+    records = [('A', [('B', 2), 'C'], [('A', 'B'), ('A', 'C')]), ('D', [], [('D', 'E'), ('D', 'F')]), ('B', ['H'], [('B', 'H')])]
+    with tempfile.TemporaryDirectory() as path:
+        with open(os.path.join(path, 'records.jsonl'), 'w') as f:
+            for root, nodes, edges in records:
+                f.write(json.dumps({'root': root, 'nodes': nodes, 'edges': edges}) + '\n')
+        with open(os.path.join(path, 'records.txt'), 'w') as f:
+            f.write("# root u v\nA B\nA C\nA A B\nA A C\nD D E\nD D F\nB H\nB B H\n")
+
+        layer = ingest.ingest(ingest.read_jsonl(os.path.join(path, 'records.jsonl')), chunk_size=2)
+        assert list(layer.structures) == ['A', 'D', 'B'] and layer.size == 3
+        assert layer.structures['A'].get_node('B').value == 2 and not layer.structures['A'].get_node('C').data_status
+        assert layer.structures['D'].node_id_list == ['D', 'E', 'F']
+        from_edge_list = ingest.ingest(ingest.read_edge_list(os.path.join(path, 'records.txt')))
+        for root_id, structure in layer.structures.items():
+            assert set(from_edge_list.structures[root_id].node_id_list) == set(structure.node_id_list)
+            assert from_edge_list.structures[root_id].edge_set == structure.edge_set
+
+        layer_file = ingest.ingest_to_file(iter(records), os.path.join(path, 'layer'), chunk_size=2)
+        loaded = layer_file.load()
+        for root_id, structure in layer.structures.items():
+            assert loaded.structures[root_id].node_id_list == structure.node_id_list
+            assert loaded.structures[root_id].edges == structure.edges
+
+        # The chunk holding the duplicate root is not added, earlier chunks are
+        try:
+            ingest.ingest(records + [('D', [], [])], chunk_size=3)
+            assert False, "duplicate root was not rejected"
+        except ValueError:
+            pass
+        partial = LocalInformation(structure_list=[])
+        try:
+            ingest.ingest(records + [('D', [], [])], layer=partial, chunk_size=2)
+        except ValueError:
+            pass
+        assert list(partial.structures) == ['A', 'D']
+
+def test_impact():
+    """
+    Checks the nodes, structures, agents and knowledge nodes affected by a change, and that results are cached until the
+    layer changes.
+    """
+    print("Testing change impact queries")
+    init_nodes, agent_list = example_agents()
+    agent1, agent2, agent3 = agent_list
+    global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agent_list)
+    global_info.grow_global()
+    global_knowledge = GlobalKnowledge(init_nodes=init_nodes)
+    global_knowledge.add_edges(global_info=global_info)
+
+    # T1 is resolved from T2, which is resolved from TK
+    impact = global_info.impact([Node('TK')], knowledge=global_knowledge)
+    assert impact['nodes'] == {'TK', 'T2', 'T1'} and impact['structures'] == {'T1'}
+    assert impact['agents'] == {agent1, agent2} and impact['knowledge_nodes'] == {'TK', 'T1'}
+    assert global_info.impact([Node('T1')])['nodes'] == {'T1'} and 'knowledge_nodes' not in global_info.impact([Node('T1')])
+    batch = global_info.impact([Node('T2'), Node('TN')])
+    assert batch['nodes'] == {'T2', 'T1', 'TN'} and batch['structures'] == {'T1', 'TN'} and batch['agents'] == {agent1, agent2, agent3}
+    # d is inside all three agents, so it reaches their roots and the structures grown from them
+    inner = global_info.impact([Node('d')])
+    assert inner['nodes'] == {'d', 'T1', 'T2', 'TN'} and inner['structures'] == {'T1', 'TN'}
+    assert inner['agents'] == {agent1, agent2, agent3}
+    assert global_info.impact([Node('g')])['nodes'] == {'g', 'T2', 'T1'} and global_info.impact([Node('g')])['structures'] == {'T1'}
+    index = global_info.impact_index
+    assert len(index.results) == 5 and global_info.impact([Node('TK')])['nodes'] is impact['nodes']
+
+    # Removing an agent changes the version of the layer, so the index is rebuilt
+    global_info.remove_agent(agent3)
+    assert len(index.results) == 5 and global_info.impact([Node('d')])['agents'] == {agent1, agent2}
+    assert len(index.results) == 1 and index.key == index._key()
+
+    # Changing a grown structure in place rebuilds the index; the new edge was not grown, so it is undirected
+    global_info.structures['T1'].add_node(Node('Z'))
+    global_info.structures['T1'].add_edge(('Z', 'T1'))
+    assert global_info.impact([Node('Z')])['structures'] == {'T1'} and 'Z' in global_info.impact([Node('T1')])['nodes']
+
+    # The compact backend does not keep the orientation of edges, which is taken from the growth instead
+    init_nodes, agent_list = example_agents()
+    compact = GlobalInformation(init_nodes=init_nodes, agent_list=agent_list)
+    compact.grow_global()
+    compact.structures = {root_id: InformationStructure(structure.node_list, structure.edges, structure.root, backend='compact')
+                          for root_id, structure in compact.structures.items()}
+    assert compact.impact([Node('T1')])['nodes'] == {'T1'}
+    assert compact.impact([Node('TK')])['nodes'] == {'TK', 'T2', 'T1'} and compact.impact([Node('TK')])['structures'] == {'T1'}
+
+def test_cycle_safe_growth():
+    """
+    Checks that agents depending on each other in a cycle are reported, raise an error in the default growth, and are
+    resolved as a unit with cycle_safe.
+    """
+    print("Testing cycle safe growth")
+    # CA pushes x and CB, CB pushes CA and CC, and CC only depends on x
+    nodes1 = [Node('CA'), Node('x', value=1), Node('CB')]
+    nodes2 = [Node('CB'), Node('CA'), Node('CC')]
+    nodes3 = [Node('CC'), Node('x', value=1)]
+    infos = [InformationStructure(node_list=nodes1, edges=[('CA', 'CB'), ('CA', 'x')], root=nodes1[0]),
+             InformationStructure(node_list=nodes2, edges=[('CB', 'CA'), ('CB', 'CC')], root=nodes2[0]),
+             InformationStructure(node_list=nodes3, edges=[('CC', 'x')], root=nodes3[0])]
+    init_nodes = [Node('CA'), Node('x', value=1)]
+    agent_list = [LocalKnowledge(structure=info, root=info.root) for info in infos]
+    global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agent_list)
+    graph = global_info.compile()
+    component, components = graph.strongly_connected_components()
+    assert component[graph.index['CA']] == component[graph.index['CB']] != component[graph.index['CC']]
+    # Dependencies come first
+    assert component[graph.index['x']] < component[graph.index['CC']] < component[graph.index['CA']]
+    assert [sorted(cycle) for cycle in graph.cycles()] == [['CA', 'CB']]
+    try:
+        global_info.simulate_growth()
+        assert False, "A cycle between agents must raise an error"
+    except ValueError as e:
+        assert 'CA' in str(e) and 'CB' in str(e)
+
+    global_info.grow_global(cycle_safe=True)
+    structure = global_info.structures['CA']
+    assert list(global_info.structures) == ['CA'] and structure.node_id_list == ['CA', 'x', 'CB', 'CC']
+    assert sorted(structure.edges) == [('CB', 'CA'), ('CC', 'CB'), ('x', 'CA'), ('x', 'CC')]
+    assert global_info.all_visited() and global_info.growth.known.all()
+
+    # The default sequential growth raises instead of expanding the cycle forever
+    agent_list = [LocalKnowledge(structure=info.copy(), root=info.root) for info in infos]
+    global_info = GlobalInformation(init_nodes=[Node('CA'), Node('x', value=1)], agent_list=agent_list)
+    try:
+        global_info.grow_global()
+        assert False, "A cycle between agents must raise an error"
+    except ValueError as e:
+        assert 'CA' in str(e) and 'CB' in str(e)
+
+    # A cycle without a known input from outside stays unknown, and so do the nodes that only depend on it
+    nodes1 = [Node('P'), Node('Q')]
+    nodes2 = [Node('Q'), Node('P')]
+    nodes3 = [Node('R'), Node('P')]
+    infos = [InformationStructure(node_list=nodes1, edges=[('P', 'Q')], root=nodes1[0]),
+             InformationStructure(node_list=nodes2, edges=[('Q', 'P')], root=nodes2[0]),
+             InformationStructure(node_list=nodes3, edges=[('R', 'P')], root=nodes3[0])]
+    agent_list = [LocalKnowledge(structure=info, root=info.root) for info in infos]
+    global_info = GlobalInformation(init_nodes=[Node('R')], agent_list=agent_list)
+    graph = global_info.compile()
+    assert not graph.resolvable().any()
+    result = global_info.simulate_growth(cycle_safe=True)
+    assert not result.known.any()
+    assert result.structures['R'].node_id_list == ['R', 'P', 'Q'] and result.structures['R'].edges == []
+
+    # A cycle the default growth never enters, because P's own Node of Q is known, grows the same in both modes
+    infos = [InformationStructure(node_list=[Node('P'), Node('Q', value=1)], edges=[('P', 'Q')], root=Node('P')),
+             InformationStructure(node_list=[Node('Q'), Node('P')], edges=[('Q', 'P')], root=Node('Q'))]
+    expected = GlobalInformation([Node('P')], [LocalKnowledge(structure=info, root=info.root) for info in infos])
+    expected.grow_global()
+    global_info = GlobalInformation([Node('P')], [LocalKnowledge(structure=info.copy(), root=info.root) for info in infos])
+    global_info.grow_global(cycle_safe=True)
+    assert grown(global_info.structures) == grown(expected.structures) == {'P': (['P', 'Q'], [('Q', 'P')])}
+
+    # Without cycles grow_global gives the same structures in both modes, also when an id is known in some agents only
+    expected = GlobalInformation(*example_agents())
+    assert expected.compile().cycles() == []
+    expected.grow_global()
+    global_info = GlobalInformation(*example_agents())
+    global_info.grow_global(cycle_safe=True)
+    assert grown(global_info.structures) == grown(expected.structures)
+    for seed in range(50):
+        expected = GlobalInformation(*conflicting_agents(seed))
+        expected.grow_global()
+        global_info = GlobalInformation(*conflicting_agents(seed))
+        assert global_info.compile().cycles() == []
+        global_info.grow_global(cycle_safe=True)
+        assert grown(global_info.structures) == grown(expected.structures)
+
+def test_propagation():
+    """
+    Checks that values are computed level by level from the aggregations attached to roots, for one or many scenarios.
+    """
+    print("Testing value propagation")
+    # A is aggregated from B, C and D, B from H and I, D from E and F, and F from J and K
+    nodes1 = [Node('A'), Node('B'), Node('C', value=3), Node('D')]
+    nodes2 = [Node('D'), Node('E', value=5), Node('F')]
+    nodes3 = [Node('B'), Node('H', value=7), Node('I', value=8)]
+    nodes4 = [Node('F'), Node('J', value=9), Node('K', value=10)]
+    infos = [InformationStructure(node_list=nodes1, edges=[('A', 'B'), ('A', 'C'), ('A', 'D')], root=nodes1[0]),
+             InformationStructure(node_list=nodes2, edges=[('D', 'E'), ('D', 'F')], root=nodes2[0]),
+             InformationStructure(node_list=nodes3, edges=[('B', 'H'), ('B', 'I')], root=nodes3[0]),
+             InformationStructure(node_list=nodes4, edges=[('F', 'J'), ('F', 'K')], root=nodes4[0])]
+    local_info = LocalInformation(structure_list=infos)
+    local_info.set_aggregation(Node('A'), 'sum')
+    local_info.set_aggregation(Node('B'), 'sum')
+    local_info.set_aggregation(Node('D'), 'mean')
+    local_info.set_aggregation(Node('F'), lambda inputs: inputs.max(axis=0))
+    engine = local_info.compile_propagation()
+    rows = engine.table.rows(['A', 'B', 'D', 'F', 'K'])
+    assert engine.level_of[rows].tolist() == [3, 1, 2, 1, 0]
+
+    # The second scenario does not know K, so F, D and A can not be computed
+    values = np.stack([engine.current_values(), engine.current_values()], axis=1)
+    values[rows[4], 1] = np.nan
+    result = engine.evaluate(values)
+    assert result[rows, 0].tolist() == [25.5, 15, 7.5, 10, 10]
+    assert np.isnan(result[rows[[0, 2, 3]], 1]).all() and result[rows[1], 1] == 15
+    assert engine.evaluate(values[:, 1]).shape == (len(engine.table),)
+
+    assert local_info.propagate() == ['A', 'B', 'D', 'F']
+    assert nodes1[0].value == 25.5 and nodes1[3].value == 7.5 and nodes2[2].value == 10 and nodes4[0].data_status
+    try:
+        local_info.set_aggregation(Node('C'), 'sum')
+        assert False, "C is not the root of a structure"
+    except KeyError:
+        pass
+    # Editing a structure directly compiles the engine again
+    for node in [nodes4[0], nodes2[2]]:
+        node.value, node.data_status = None, False
+    infos[3].add_node(Node('L', value=20), edge=('F', 'L'))
+    assert local_info.compile_propagation() is not engine and local_info.propagate() == ['F']
+    assert nodes2[2].value == 20
+
+    # A root's inputs are known if any Node with their id is, whatever the order of the structures
+    for unknown_first in [False, True]:
+        nodes = [Node('R'), Node('x', value=2), Node('y', value=3)]
+        structures = [InformationStructure(node_list=nodes, edges=[('R', 'x'), ('R', 'y')], root=nodes[0])]
+        other = InformationStructure(node_list=[Node('S'), Node('x')], edges=[('S', 'x')], root=Node('S'))
+        layer = LocalInformation(structure_list=[other] + structures if unknown_first else structures + [other])
+        layer.set_aggregation(nodes[0], 'sum')
+        assert layer.propagate() == ['R'] and nodes[0].value == 5
+
+    # D aggregating A closes a cycle through the aggregations
+    local_info.add_structure(InformationStructure(node_list=[Node('G'), Node('A')], edges=[('G', 'A')], root=Node('G')))
+    infos[1].add_node(Node('G'), edge=('D', 'G'))
+    local_info.set_aggregation(Node('G'), 'max')
+    try:
+        local_info.compile_propagation()
+        assert False, "Cyclic aggregations must raise an error"
+    except ValueError:
+        pass
+
+def test_simulate_scenarios():
+    """
+    Checks the per-scenario statistics of simulate_scenarios against growing each scenario and adding knowledge edges.
+    """
+    print("Testing scenario statistics")
+    init_nodes, agent_list = example_agents()
+    global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agent_list)
+    scenarios = [['TK'], ['TK', 'T2'], ['TK', 'T1', 'TN'], ['TK']]
+    result = global_info.simulate_scenarios(scenarios)
+    # Once T2 is known, T1 no longer reaches the init node TK, which grows a structure of its own
+    assert result['structure_count'].tolist() == [2, 3, 3, 2]
+    assert result['node_count'].tolist() == [4, 4, 3, 4] and result['largest_structure'].tolist() == [3, 2, 1, 3]
+    assert [sizes.tolist() for sizes in result['structure_sizes']] == [[3, 1], [2, 1, 1], [1, 1, 1], [3, 1]]
+    for k, known in enumerate(scenarios):
+        growth = global_info.simulate_growth(known=known)
+        grown = GlobalInformation(init_nodes=init_nodes, agent_list=agent_list)
+        grown.structures = dict(growth.structures)
+        global_knowledge = GlobalKnowledge(init_nodes=init_nodes)
+        global_knowledge.add_edges(global_info=grown)
+        assert result['knowledge_edges'][k] == len(global_knowledge.structure.edges)
+        assert result['known_count'][k] == np.count_nonzero(growth.known)
+    assert result['knowledge_edges'].tolist() == [1, 0, 0, 1]
+
+    masks = np.array([global_info.compile().known_mask(known) for known in scenarios])
+    parallel = global_info.simulate_scenarios(masks, max_workers=2)
+    for key in ['structure_count', 'node_count', 'known_count', 'knowledge_edges']:
+        assert (parallel[key] == result[key]).all()
+
+def test_rendering():
+    """
+    Checks that layouts are cached per structure and only lay out new nodes, and that layers render to paginated files.
+    """
+    print("Testing cached layouts and rendering")
+    init_nodes, agent_list = example_agents()
+    structure = agent_list[1].structure
+    cache = rendering.LayoutCache()
+    pos = cache.positions(structure)
+    assert set(pos) == set(structure.node_id_list) and cache.positions(structure) is pos
+    structure.add_node(Node('h'), edge=('g', 'h'))
+    moved = cache.positions(structure)
+    assert 'h' in moved and all(np.array_equal(moved[n], pos[n]) for n in pos)
+    # A new structure with the same root starts from the previous layout
+    copy = structure.copy()
+    assert all(np.array_equal(cache.positions(copy)[n], moved[n]) for n in moved)
+
+    # Large graphs place new nodes next to their neighbours
+    nodes, edges = [Node(i) for i in range(600)], [(i, i + 1) for i in range(599)]
+    large = InformationStructure(node_list=nodes, edges=edges, root=nodes[0])
+    pos = dict(cache.positions(large))
+    large.add_node(Node(600), edge=(599, 600))
+    assert len(cache.positions(large)) == 601 and all(np.array_equal(cache.positions(large)[n], pos[n]) for n in pos)
+
+    local_info = LocalInformation(structure_list=[agent.structure for agent in agent_list])
+    with tempfile.TemporaryDirectory() as directory:
+        paths = local_info.render(directory, per_page=2)
+        assert [os.path.basename(path) for path in paths] == ['page_0000.png', 'page_0001.png']
+        assert all(os.path.getsize(path) > 0 for path in paths)
+        global_info = GlobalInformation(init_nodes=init_nodes, agent_list=agent_list)
+        global_info.grow_global()
+        paths = global_info.render(os.path.join(directory, 'svg'), fmt='svg', per_page=1, max_workers=2)
+        assert len(paths) == 2 and all(path.endswith('.svg') and os.path.exists(path) for path in paths)
+
+def test_benchmark_suite():
+    """
+    Checks the scaling exponent of the benchmark suite and the comparison of a report with a baseline.
+    """
+    print("Testing benchmark helpers")
+    assert abs(suite.scaling_exponent([10, 100, 1000], [0.01, 0.1, 1.0]) - 1.0) < 1e-9
+    assert abs(suite.scaling_exponent([10, 100], [0.01, 1.0]) - 2.0) < 1e-9
+    assert math.isnan(suite.scaling_exponent([10, 10], [0.1, 0.2]))
+
+    report = {'grow': {'results': {'100': {'seconds': 1.2, 'peak_mb': 10.0}, '1000': {'seconds': 14.0, 'peak_mb': 90.0}}}}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'baseline.json')
+        suite.save_baseline({'grow': {'results': {'100': {'seconds': 1.0, 'peak_mb': 10.0},
+                                                  '1000': {'seconds': 10.0, 'peak_mb': 100.0}}}}, path)
+        with open(path) as f:
+            baseline = json.load(f)
+    # Within tolerance at 100, slower but not larger at 1000, and sizes missing from the baseline are skipped
+    report['grow']['results']['5000'] = {'seconds': 99.0, 'peak_mb': 999.0}
+    regressions = suite.compare(report, baseline)
+    assert len(regressions) == 1 and regressions[0].startswith('grow at 1000: seconds')
+    assert suite.compare(report, baseline, tolerance=0.5) == []
+    try:
+        suite.compare(report, dict(baseline, config={}))
+        assert False, "A baseline with other generator settings must be rejected"
+    except ValueError:
+        pass
+
 def main():
     """
     Ask the user which test to run.